@@ -3,7 +3,7 @@
 from fastapi import APIRouter
 
 from app.config.settings import get_settings
-from app.api.v1 import auth, home, user, pages, file,folder
+from app.api.v1 import auth, home, user, pages, file,folder, indexing, search
 
 api_router = APIRouter(prefix=get_settings().api_root)
 
@@ -12,6 +12,8 @@ api_router.include_router(auth.router)
 api_router.include_router(pages.router)
 api_router.include_router(file.router)
 api_router.include_router(folder.folder)
+api_router.include_router(indexing.router)
+api_router.include_router(search.router)
 
 if not get_settings().no_root_route:
     api_router.include_router(home.router)
@@ -1,25 +1,274 @@
+import asyncio
 import os
+import re
+from collections import deque
+from itertools import islice
 from pathlib import Path
-from datetime import datetime
-from pprint import pprint
-from typing import List
+from typing import Any, Iterable, Iterator, Optional
 from fastapi import HTTPException
-from elasticsearch import AsyncElasticsearch
+from elasticsearch import AsyncElasticsearch, BadRequestError
+from elasticsearch.helpers import async_bulk, async_scan
 from app.api.utils.do_file import bucket_path
+from app.api.utils.index_metrics import get_index_metrics
 from app.config.settings import get_settings
-from app.file_processors.main_file import SearchContext
-from app.file_processors.archive_processor import ArchiveProcessor
-from app.file_processors.audio_processor import AudioProcessor
-from app.file_processors.code_processor import CodeProcessor
-from app.file_processors.excel_processor import ExcelProcessor
-from app.file_processors.image_processor import ImageProcessor
-from app.file_processors.pdf_processor import PDFProcessor
-from app.file_processors.presentation_processor import PresentationProcessor
-from app.file_processors.text_processor import TextProcessor
-from app.file_processors.word_processor import WordProcessor
+from app.managers.search import SearchManager
+from app.api.utils.search_backend import SearchBackend
 
 
-class ElasticsearchService:
+# Passages live in versioned indices (files_v1, files_v2, ...). Searches go
+# through FILES_READ and writes through FILES_WRITE, so `reindex` can build a
+# new version while the current one keeps serving, then swap the aliases.
+FILES_INDEX_PREFIX = "files_v"
+FILES_READ = "files_read"
+FILES_WRITE = "files_write"
+# Unversioned index of releases before the aliases, adopted by `ensure_index`.
+LEGACY_FILES_INDEX = "files_index"
+
+# Bump whenever files_template() changes; `ensure_index` then replaces the
+# installed template. Existing indices keep their mapping until rebuilt.
+FILES_TEMPLATE_NAME = "files"
+FILES_TEMPLATE_VERSION = 1
+
+# Stop words for the Ukrainian analyzer. Elasticsearch has no built-in
+# Ukrainian analyzer or stemmer (they come with the analysis-ukrainian plugin,
+# see `elastic_ukrainian_plugin`), so without the plugin Ukrainian text is only
+# lowercased and stripped of these.
+UKRAINIAN_STOPWORDS = [
+    "а", "аби", "але", "бо", "в", "від", "во", "всі", "де", "для", "до", "же",
+    "з", "за", "зі", "і", "із", "й", "к", "коли", "на", "над", "не", "ні",
+    "о", "об", "от", "по", "під", "при", "про", "так", "також", "та", "те",
+    "ти", "то", "у", "хоч", "це", "цей", "ця", "чи", "що", "щоб", "як", "якщо",
+]
+
+
+def files_template() -> dict[str, Any]:
+    """
+    Returns the index template applied to every files index.
+
+    Every document is one passage of a file (see `split_passages`).
+    `file_path` is an exact keyword so it can be matched and rewritten
+    precisely; its `tree` sub-field indexes every ancestor folder ("/a",
+    "/a/b", "/a/b/c.txt") so a whole subtree is selected with a single term
+    query. `content` is indexed once with a language-neutral analyzer, storing
+    offsets so the unified highlighter does not re-analyze passages, and once
+    per OCR language (uk/ru/en) for stemmed matches. Nothing is mapped
+    dynamically, so no stray `.keyword` sub-fields are created.
+    """
+    settings = get_settings()
+    if settings.elastic_ukrainian_plugin:
+        ukrainian = {"type": "ukrainian"}
+    else:
+        ukrainian = {"type": "custom", "tokenizer": "standard", "filter": ["lowercase", "ukrainian_stop"]}
+    return {
+        "index_patterns": [f"{FILES_INDEX_PREFIX}*"],
+        "priority": 100,
+        "version": FILES_TEMPLATE_VERSION,
+        "meta": {"description": "Passages of the indexed files"},
+        "template": {
+            "settings": {
+                "number_of_shards": settings.elastic_shards,
+                "number_of_replicas": settings.elastic_replicas,
+                "codec": "best_compression",
+                "analysis": {
+                    "tokenizer": {
+                        "path_tokenizer": {"type": "path_hierarchy", "delimiter": "/"},
+                    },
+                    "filter": {
+                        "ukrainian_stop": {"type": "stop", "stopwords": UKRAINIAN_STOPWORDS},
+                    },
+                    "analyzer": {
+                        "path_analyzer": {"type": "custom", "tokenizer": "path_tokenizer"},
+                        "content_analyzer": {"type": "custom", "tokenizer": "standard", "filter": ["lowercase"]},
+                        "uk_analyzer": ukrainian,
+                        "ru_analyzer": {"type": "russian"},
+                        "en_analyzer": {"type": "english"},
+                    },
+                },
+            },
+            "mappings": {
+                "dynamic": False,
+                "_meta": {"template_version": FILES_TEMPLATE_VERSION},
+                "properties": {
+                    "file_path": {
+                        "type": "keyword",
+                        "fields": {
+                            "tree": {"type": "text", "analyzer": "path_analyzer", "search_analyzer": "keyword"},
+                        },
+                    },
+                    "file_name": {"type": "keyword"},
+                    "file_type": {"type": "keyword"},
+                    # parent folder of the file, for facet counts
+                    "folder": {"type": "keyword"},
+                    "generation": {"type": "keyword"},
+                    "passage": {"type": "integer"},
+                    "passage_id": {"type": "keyword"},
+                    # where the passage starts/ends in the file, returned but not searched
+                    "locator": {"type": "object", "enabled": False},
+                    "locator_end": {"type": "object", "enabled": False},
+                    "content": {
+                        "type": "text",
+                        "analyzer": "content_analyzer",
+                        "index_options": "offsets",
+                        "fields": {
+                            "uk": {"type": "text", "analyzer": "uk_analyzer"},
+                            "ru": {"type": "text", "analyzer": "ru_analyzer"},
+                            "en": {"type": "text", "analyzer": "en_analyzer"},
+                        },
+                    },
+                    "indexed_at": {"type": "date"},
+                },
+            },
+        },
+    }
+
+
+# Types of the sort values of a page cursor: the score, then the passage id.
+CURSOR_TYPES = ((int, float), str)
+
+
+# Rewrites file_path (and file_name, folder, file_type) of every document
+# under params.old; file_type follows `iter_passages`, so a rename that changes
+# the extension moves the file to its new type filter.
+MOVE_PATH_SCRIPT = """
+String path = ctx._source.file_path;
+String moved = params.new_path + path.substring(params.old_path.length());
+ctx._source.file_path = moved;
+ctx._source.file_name = moved.substring(moved.lastIndexOf('/') + 1);
+ctx._source.folder = moved.substring(0, moved.lastIndexOf('/'));
+ctx._source.file_type = moved.substring(moved.lastIndexOf('.') + 1).toLowerCase();
+"""
+
+
+def next_index_name(existing: Iterable[str]) -> str:
+    """
+    Returns the name of the next files index version after `existing`.
+    """
+    pattern = re.compile(rf"^{FILES_INDEX_PREFIX}(\d+)$")
+    versions = [int(match.group(1)) for name in existing if (match := pattern.match(name))]
+    return f"{FILES_INDEX_PREFIX}{max(versions, default=0) + 1}"
+
+
+def swap_alias_actions(new_index: str, old_read: Iterable[str], old_write: Iterable[str],
+                       delete_old: bool = False) -> list[dict]:
+    """
+    Builds the `update_aliases` actions that make `new_index` the only files index.
+
+    All actions are applied atomically, so every search sees either the old
+    or the new index, never neither.
+
+    Args:
+        new_index (str): Freshly built index, already behind FILES_WRITE.
+        old_read (Iterable[str]): Indices currently behind FILES_READ.
+        old_write (Iterable[str]): Indices currently behind FILES_WRITE.
+        delete_old (bool): Delete the old indices instead of only unaliasing them.
+    """
+    actions = [{"add": {"index": new_index, "alias": FILES_READ}}]
+    old_read, old_write = set(old_read) - {new_index}, set(old_write) - {new_index}
+    if delete_old:
+        return actions + [{"remove_index": {"index": index}} for index in sorted(old_read | old_write)]
+    actions += [{"remove": {"index": index, "alias": FILES_READ}} for index in sorted(old_read)]
+    actions += [{"remove": {"index": index, "alias": FILES_WRITE}} for index in sorted(old_write)]
+    return actions
+
+
+def reconcile_generations(new: dict[str, dict[str, float]], live: dict[str, dict[str, float]],
+                          exists, from_index: bool = False) -> tuple[list[tuple[str, str]], list[tuple[str, str]]]:
+    """
+    Decides which passages to drop from and copy into a freshly built index so
+    it matches the live one, whatever the indexing worker did during the build.
+
+    The worker writes every change through FILES_WRITE to both indices with the
+    same generation, so the live index is authoritative for the files it
+    touched. When copying (`from_index`) the new index must mirror the live
+    one exactly. When re-extracting, for each path:
+
+    - a generation found in both indices was written by the worker, so the
+      loader's own generation of that path is dropped;
+    - otherwise the newest generation of the new index is kept if the file
+      still exists, so files deleted or moved away during the build go;
+    - a file missing from the new index (moved in, or failed to extract) is
+      copied from the live index if it still exists.
+
+    Args:
+        new (dict): Path -> {generation: newest `indexed_at`} of the new index.
+        live (dict): The same for the live indices.
+        exists (Callable[[str], bool]): Whether a path is still on disk.
+        from_index (bool): The new index was copied from the live one.
+
+    Returns:
+        tuple: (path, generation) pairs to delete from the new index, and
+        pairs to copy into it from the live indices.
+    """
+    drop, copy = [], []
+    for path in sorted(new.keys() | live.keys()):
+        built, current = new.get(path, {}), live.get(path, {})
+        if from_index:
+            keep = set(current)
+        elif built.keys() & current.keys():
+            keep = built.keys() & current.keys()
+        elif not exists(path):
+            keep = set()
+        elif built:
+            keep = {max(built, key=built.get)}
+        else:
+            keep = set(current)
+        drop += [(path, generation) for generation in sorted(built.keys() - keep)]
+        copy += [(path, generation) for generation in sorted(keep - built.keys())]
+    return drop, copy
+
+
+def generation_query(pairs: list[tuple[str, str]]) -> dict[str, Any]:
+    """
+    Returns a query matching the passages of the given (path, generation) pairs.
+    """
+    return {"bool": {"should": [
+        {"bool": {"filter": [{"term": {"file_path": path}}, {"term": {"generation": generation}}]}}
+        for path, generation in pairs
+    ], "minimum_should_match": 1}}
+
+
+_client: Optional[AsyncElasticsearch] = None
+
+
+def new_client() -> AsyncElasticsearch:
+    """
+    Creates an Elasticsearch client configured from `Settings`.
+    """
+    settings = get_settings()
+    return AsyncElasticsearch(
+        hosts=[settings.elastic_host],
+        basic_auth=(settings.elastic_user, settings.elastic_password),
+        request_timeout=30,  # Default is 10
+        max_retries=3,
+        retry_on_timeout=True
+    )
+
+
+def get_client() -> AsyncElasticsearch:
+    """
+    Returns the client shared by the request handlers, creating it on first use.
+
+    Unlike `ElasticsearchService`, which owns (and closes) a client per
+    operation, the shared client keeps its connection pool open for the life of
+    the process, so queries do not pay for a new connection each time.
+    """
+    global _client
+    if _client is None:
+        _client = new_client()
+    return _client
+
+
+async def close_client():
+    """
+    Closes the shared client, if it was ever created.
+    """
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+class ElasticsearchService(SearchBackend):
     """
     Service class for interacting with Elasticsearch, managing file indexing,
     and performing searches across various file types.
@@ -31,39 +280,249 @@ class ElasticsearchService:
     def __init__(self):
         """
         Initializes the Elasticsearch service and registers file processors.
+        The service's own client is only created when an indexing operation
+        needs it; searches go through the shared client.
+        """
+        super().__init__()
+        self._es: Optional[AsyncElasticsearch] = None
+
+    @property
+    def es(self) -> AsyncElasticsearch:
+        """
+        The client owned by this service, closed by `close`.
+        """
+        if self._es is None:
+            self._es = new_client()
+        return self._es
+
+    async def ensure_template(self):
+        """
+        Installs the files index template, replacing an older version of it.
+        """
+        response = await self.es.options(ignore_status=404).indices.get_index_template(name=FILES_TEMPLATE_NAME)
+        installed = [template["index_template"].get("version") for template in response.body.get("index_templates", [])]
+        if installed and installed[0] is not None and installed[0] >= FILES_TEMPLATE_VERSION:
+            return
+        await self.es.indices.put_index_template(name=FILES_TEMPLATE_NAME, **files_template())
+        print(f"[INFO] Index template {FILES_TEMPLATE_NAME} v{FILES_TEMPLATE_VERSION} installed")
+
+    async def ensure_index(self):
+        """
+        Installs the index template and makes sure the files aliases point at an index.
+
+        On a fresh cluster `files_v1` is created behind both aliases. An
+        unversioned `files_index` from an older release is put behind the
+        aliases as is; like any index built from an older template it keeps
+        its mapping, and a warning asks for `api-admin search reindex`.
+        """
+        await self.ensure_template()
+        if not await self.es.indices.exists_alias(name=FILES_READ):
+            if await self.es.indices.exists(index=LEGACY_FILES_INDEX):
+                await self.es.indices.update_aliases(actions=[
+                    {"add": {"index": LEGACY_FILES_INDEX, "alias": FILES_READ}},
+                    {"add": {"index": LEGACY_FILES_INDEX, "alias": FILES_WRITE}},
+                ])
+                print(f"[INFO] Index {LEGACY_FILES_INDEX} put behind the {FILES_READ}/{FILES_WRITE} aliases")
+            else:
+                index = next_index_name([])
+                try:
+                    await self.es.indices.create(index=index, aliases={FILES_READ: {}, FILES_WRITE: {}})
+                    print(f"[INFO] Index {index} created")
+                except BadRequestError as e:
+                    # another process created it first
+                    if e.error != "resource_already_exists_exception":
+                        raise
+                return
+
+        mappings = await self.es.indices.get_mapping(index=FILES_READ)
+        for index, mapping in mappings.items():
+            if mapping["mappings"].get("_meta", {}).get("template_version") != FILES_TEMPLATE_VERSION:
+                print(f"[WARN] Index {index} predates template v{FILES_TEMPLATE_VERSION}, "
+                      "run 'api-admin search reindex' to apply it")
+
+    async def _alias_indices(self, alias: str) -> list[str]:
+        """
+        Returns the indices behind `alias`, sorted by name.
+        """
+        response = await self.es.options(ignore_status=404).indices.get_alias(name=alias)
+        return sorted(name for name in response.body if name != "error" and name != "status")
+
+    def _passage_actions(self, file_path: str, indices: list[str]) -> Iterator[dict]:
         """
-        self.es = AsyncElasticsearch(
-            hosts=[get_settings().elastic_host],
-            basic_auth=(get_settings().elastic_user, get_settings().elastic_password),
-            request_timeout=30,  # Default is 10
-            max_retries=3,
-            retry_on_timeout=True
+        Yields one bulk action per passage of `file_path` and index in `indices`.
+        """
+        for passage in self.iter_passages(file_path):
+            for index in indices:
+                yield {"_index": index, "_id": passage["passage_id"], **passage}
+
+    def _extract(self, file_path: str) -> list[dict]:
+        """
+        Returns every passage of `file_path`, or none if it cannot be read.
+        """
+        try:
+            return list(self.iter_passages(file_path))
+        except Exception as e:
+            print(f"[WARN] Skipping {file_path}: {str(e)}")
+            return []
+
+    async def _load_files(self, index: str, paths: list[str]):
+        """
+        Bulk loads the passages of `paths` into `index`.
+
+        A few files are extracted in worker threads ahead of the bulk requests,
+        and the extraction cache spares re-reading documents whose content has
+        not changed since they were last indexed.
+        """
+        settings = get_settings()
+        paths = [path for path in paths if self.can_index(path)]
+        prefetch = max(1, settings.index_queue_concurrency)
+
+        async def actions():
+            queue = deque()
+            remaining = iter(paths)
+            for path in islice(remaining, prefetch):
+                queue.append(asyncio.ensure_future(asyncio.to_thread(self._extract, path)))
+            done = 0
+            while queue:
+                passages = await queue.popleft()
+                for path in islice(remaining, 1):
+                    queue.append(asyncio.ensure_future(asyncio.to_thread(self._extract, path)))
+                for passage in passages:
+                    yield {"_index": index, "_id": passage["passage_id"], **passage}
+                done += 1
+                if done % 100 == 0 or done == len(paths):
+                    print(f"[INFO] {done}/{len(paths)} files loaded into {index}")
+
+        await async_bulk(self.es, actions(), chunk_size=settings.index_bulk_size,
+                         max_chunk_bytes=settings.index_bulk_max_bytes)
+
+    async def _copy_index(self, sources: list[str], index: str):
+        """
+        Copies every passage of `sources` into `index` with the `_reindex` API.
+
+        Passages already written to `index` by the indexing worker while the
+        copy runs are newer, so they are kept; passages the worker deleted or
+        moved meanwhile are cleaned up by `_reconcile`.
+        """
+        response = await self.es.reindex(
+            source={"index": sources},
+            dest={"index": index, "op_type": "create"},
+            conflicts="proceed",
+            slices="auto",
+            wait_for_completion=False,
         )
-        self.context = SearchContext()
-        self._register_processors()
-
-    def _register_processors(self):
-        """
-        Registers file processors for various file types, allowing the
-        system to handle different file formats like audio, code, PDF, images, etc.
-        """
-        self.context.register_processor("mp3", AudioProcessor)
-        self.context.register_processor("py", CodeProcessor)
-        self.context.register_processor("pdf", PDFProcessor)
-        self.context.register_processor("xlsx", ExcelProcessor)
-        self.context.register_processor("pptx", PresentationProcessor)
-        self.context.register_processor("txt", TextProcessor)
-        self.context.register_processor("docx", WordProcessor)
-        self.context.register_processor("doc", WordProcessor)
-        self.context.register_processor("jpg", ImageProcessor)
-        self.context.register_processor("png", ImageProcessor)
-        self.context.register_processor("jpeg", ImageProcessor)
-        self.context.register_processor("zip", lambda path: ArchiveProcessor(path, self.context.processors))
-        self.context.register_processor("7z", lambda path: ArchiveProcessor(path, self.context.processors))
+        while not (task := await self.es.tasks.get(task_id=response["task"]))["completed"]:
+            status = task["task"].get("status", {})
+            print(f"[INFO] {status.get('created', 0)}/{status.get('total', 0)} passages copied into {index}")
+            await asyncio.sleep(2)
+        failures = task.get("response", {}).get("failures", [])
+        if failures or "error" in task:
+            raise RuntimeError(f"Copy into {index} failed: {failures or task['error']}")
+
+    async def _generations(self, indices: list[str]) -> dict[str, dict[str, float]]:
+        """
+        Returns path -> {generation: newest `indexed_at`} over `indices`.
+        """
+        generations: dict[str, dict[str, float]] = {}
+        after = None
+        while True:
+            composite = {"size": 5000, "sources": [
+                {"path": {"terms": {"field": "file_path"}}},
+                {"generation": {"terms": {"field": "generation"}}},
+            ]}
+            if after:
+                composite["after"] = after
+            response = await self.es.search(index=indices, size=0, aggs={"pairs": {
+                "composite": composite, "aggs": {"indexed_at": {"max": {"field": "indexed_at"}}},
+            }})
+            pairs = response["aggregations"]["pairs"]
+            for bucket in pairs["buckets"]:
+                key = bucket["key"]
+                generations.setdefault(key["path"], {})[key["generation"]] = bucket["indexed_at"]["value"] or 0.0
+            after = pairs.get("after_key")
+            if not pairs["buckets"] or not after:
+                return generations
+
+    async def _reconcile(self, index: str, live: list[str], from_index: bool):
+        """
+        Brings `index` in line with the changes the indexing worker made to
+        `live` while it was being filled, see `reconcile_generations`.
+        """
+        await self.es.indices.refresh(index=[index, *live])
+        drop, copy = reconcile_generations(await self._generations([index]), await self._generations(live),
+                                           os.path.isfile, from_index)
+        for start in range(0, len(drop), 500):
+            await self.es.delete_by_query(index=index, query=generation_query(drop[start:start + 500]),
+                                          conflicts="proceed", refresh=True)
+        for start in range(0, len(copy), 500):
+            await self.es.reindex(source={"index": live, "query": generation_query(copy[start:start + 500])},
+                                  dest={"index": index}, refresh=True)
+        if drop or copy:
+            print(f"[INFO] {len(drop)} stale and {len(copy)} missing file versions reconciled in {index}")
+
+    async def reindex(self, from_index: bool = False, delete_old: bool = False) -> str:
+        """
+        Builds a new files index version and atomically swaps the aliases to it.
+
+        The new index is created from the current template and, with refresh
+        and replicas disabled while it is bulk loaded, added behind
+        FILES_WRITE. From then on the indexing worker writes every change to
+        both the live and the new index. The loader can still overwrite or
+        resurrect what the worker changed (a file re-extracted after the worker
+        indexed it, a passage copied after the worker deleted it, a path moved
+        before the loader reached it), so once loaded the new index is
+        reconciled with the live one before the swap. Searches keep using the
+        live index until the final alias swap. If anything fails the new index
+        is dropped and the live one is left untouched.
+
+        Args:
+            from_index (bool): Copy the passages of the live index instead of
+                extracting them again from the files (only picks up mapping
+                changes, not processor changes).
+            delete_old (bool): Delete the previous index after the swap.
+
+        Returns:
+            str: Name of the new index.
+        """
+        settings = get_settings()
+        await self.ensure_index()
+        old_read = await self._alias_indices(FILES_READ)
+        old_write = await self._alias_indices(FILES_WRITE)
+        existing = await self.es.options(ignore_status=404).indices.get(index=f"{FILES_INDEX_PREFIX}*")
+        index = next_index_name(existing.body)
+
+        await self.es.indices.create(index=index, settings={"refresh_interval": "-1", "number_of_replicas": 0})
+        try:
+            await self.es.indices.put_alias(index=index, name=FILES_WRITE)
+            print(f"[INFO] Building {index}")
+            if from_index:
+                await self._copy_index(old_read, index)
+            else:
+                paths = sorted(str(file) for file in Path(bucket_path).rglob('*') if file.is_file())
+                await self._load_files(index, paths)
+            await self._reconcile(index, [name for name in old_write if name != index], from_index)
+            await self.es.indices.put_settings(
+                index=index,
+                settings={"refresh_interval": None, "number_of_replicas": settings.elastic_replicas},
+            )
+            await self.es.indices.refresh(index=index)
+        except BaseException:
+            await self.es.options(ignore_status=404).indices.delete(index=index)
+            raise
+
+        await self.es.indices.update_aliases(actions=swap_alias_actions(index, old_read, old_write, delete_old))
+        print(f"[SUCCESS] {FILES_READ} and {FILES_WRITE} now point at {index}")
+        return index
 
     async def index_file(self, file_path: str):
         """
-        Indexes a single file into Elasticsearch after processing its content.
+        Indexes a single file into Elasticsearch as a set of passage documents.
+
+        The extracted text is split into overlapping passages (see
+        `split_passages`) that carry page/sheet/slide locators where the
+        processor knows them, and is streamed to Elasticsearch in bulk batches,
+        so neither this process nor Elasticsearch ever holds a whole large
+        document in one request.
 
         Args:
             file_path (str): The file path to be indexed.
@@ -71,114 +530,294 @@ class ElasticsearchService:
         Raises:
             HTTPException: If there's an error while indexing the file.
         """
-        content = self.context.read_file(file_path)
-        if content == '':
-            content = 'empty'
-        if not content:
+        if not self.can_index(file_path):
             print(f"[WARN] No processor found for {file_path}")
+            await self.close()
             return
 
-        ext = file_path.split('.')[-1].lower()
-        doc = {
-            "file_path": file_path,
-            "file_name": os.path.basename(file_path),
-            "file_type": ext,
-            "content": content,
-            "indexed_at": datetime.utcnow(),
-        }
+        settings = get_settings()
+        metrics = get_index_metrics()
         try:
-            await self.es.index(index="files_index", document=doc)
-            print(f"[SUCCESS] File {file_path} indexed")
+            # while `reindex` builds a new version, FILES_WRITE covers it and the live index
+            indices = await self._alias_indices(FILES_WRITE)
+            if not indices:
+                await self.ensure_index()
+                indices = await self._alias_indices(FILES_WRITE)
+            actions = self._passage_actions(file_path, indices)
+            generation = None
+            indexed = 0
+            while True:
+                # extraction is CPU bound, pull each batch off the event loop
+                batch = await asyncio.to_thread(lambda: list(islice(actions, settings.index_bulk_size)))
+                if not batch:
+                    break
+                generation = batch[0]["generation"]
+                with metrics.timer("bulk", "elasticsearch"):
+                    success, _ = await async_bulk(self.es, batch, max_chunk_bytes=settings.index_bulk_max_bytes)
+                indexed += success
+
+            # the new passages are in, drop those of any earlier run; no forced
+            # refresh per file, both become visible with the index refresh interval
+            await self.es.delete_by_query(
+                index=FILES_WRITE,
+                query={"bool": {
+                    "filter": [{"term": {"file_path": file_path}}],
+                    "must_not": [{"term": {"generation": generation}}],
+                }},
+                conflicts="proceed",
+                refresh=False,
+            )
+            metrics.record_file(os.path.getsize(file_path), indexed // len(indices))
+            print(f"[SUCCESS] File {file_path} indexed ({indexed} passages)")
         except Exception as e:
+            metrics.record_error("index", type(e).__name__)
             print(f"[ERROR] Error indexing file {file_path}: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Error indexing file {file_path}: {str(e)}")
         finally:
             await self.close()
 
-    async def index_all_unindexed_files(self):
+    async def indexed_paths(self) -> set[str]:
         """
-        Indexes all unindexed files in the directory specified by `bucket_path`.
+        Returns the path of every indexed file.
 
-        The method first identifies all the physical files in the directory,
-        then checks Elasticsearch for already indexed files, and indexes those
-        that haven't been indexed yet.
+        Every passage is read with a scroll, so the result is correct beyond
+        the first page of search hits.
+        """
+        indexed_files = set()
+        async for hit in async_scan(
+            self.es,
+            index=FILES_READ,
+            query={"query": {"match_all": {}}, "_source": ["file_path"]},
+        ):
+            indexed_files.add(hit["_source"].get("file_path", ""))
+        return indexed_files
 
-        Raises:
-            HTTPException: If there's an error retrieving or indexing the files.
+    async def delete_file_index(self, file_path: str):
         """
-        try:
-            # Fetch all physical files from the bucket path
-            directory = Path(bucket_path)
-            physical_files = {str(file) for file in directory.rglob('*') if file.is_file()}
+        Deletes the index of a file from Elasticsearch.
 
-            # Fetch already indexed files from Elasticsearch
-            es_query = {"query": {"match_all": {}}}
-            es_response = await self.es.search(index="files_index", body=es_query)
+        The shards are not refreshed for every file, so the passages disappear
+        from searches with the next refresh of the index.
 
-            indexed_files = {hit["_source"].get("file_path", "") for hit in es_response["hits"]["hits"]}
-            # Identify unindexed files
-            unindexed_files = list(physical_files - indexed_files)
+        Args:
+            file_path (str): The path of the file to delete from the index.
+        """
+        try:
+            result = await self.es.delete_by_query(
+                index=FILES_WRITE, query={"term": {"file_path": file_path}}, conflicts="proceed", refresh=False
+            )
+            if result["deleted"]:
+                print(f"[SUCCESS] Index for file {file_path} deleted")
+            else:
+                print(f"[WARN] No index found for file {file_path}")
+        except Exception as e:
+            get_index_metrics().record_error("delete", type(e).__name__)
+            print(f"[ERROR] Error deleting index for file {file_path}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Error deleting index for file {file_path}: {str(e)}")
+        finally:
+            await self.close()
 
-            if not unindexed_files:
-                print("[INFO] No unindexed files found.")
-                return
+    async def move_path(self, old_path: str, new_path: str) -> str:
+        """
+        Re-points every indexed document at or under `old_path` to `new_path`.
 
-            print(f"[INFO] Found {len(unindexed_files)} unindexed files. Starting indexing process...")
+        Works for single files and whole folders alike: one `update_by_query`
+        selects the subtree through `file_path.tree` and rewrites the paths in
+        place, so nothing is re-extracted. The query runs as an Elasticsearch
+        task; poll its progress with `get_task`.
 
-            # Index all unindexed files
-            for file in unindexed_files:
-                print(f"[INFO] Indexing file {file}")
-                await self.index_file(file)
+        Args:
+            old_path (str): Previous path of the file or folder.
+            new_path (str): Path it was moved to.
 
+        Returns:
+            str: The Elasticsearch task id.
+
+        Raises:
+            HTTPException: If the task could not be started.
+        """
+        try:
+            response = await self.es.update_by_query(
+                index=FILES_WRITE,
+                query={"term": {"file_path.tree": old_path}},
+                script={
+                    "source": MOVE_PATH_SCRIPT,
+                    "lang": "painless",
+                    "params": {"old_path": old_path, "new_path": new_path},
+                },
+                conflicts="proceed",
+                refresh=True,
+                wait_for_completion=False,
+            )
+            print(f"[INFO] Moving index {old_path} -> {new_path} (task {response['task']})")
+            return response["task"]
         except Exception as e:
-            print(f"[ERROR] Error during indexing unindexed files: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Error indexing unindexed files: {str(e)}")
+            print(f"[ERROR] Error moving index {old_path} -> {new_path}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Error moving index for {old_path}: {str(e)}")
         finally:
             await self.close()
 
-    async def delete_file_index(self, file_path: str):
+    async def delete_path(self, path: str) -> str:
         """
-        Deletes the index of a file from Elasticsearch.
+        Deletes every indexed document at or under `path` as a background task.
 
         Args:
-            file_path (str): The path of the file to delete from the index.
+            path (str): File or folder whose documents should be removed.
+
+        Returns:
+            str: The Elasticsearch task id.
+
+        Raises:
+            HTTPException: If the task could not be started.
         """
         try:
-            search_result = await self.es.search(index="files_index", body={
-                "query": {"match": {"file_path": file_path}}
-            })
-            if search_result['hits']['total']['value'] > 0:
-                doc_id = search_result['hits']['hits'][0]['_id']
-                await self.es.delete(index="files_index", id=doc_id)
-                print(f"[SUCCESS] Index for file {file_path} deleted")
-            else:
-                print(f"[WARN] No index found for file {file_path}")
+            response = await self.es.delete_by_query(
+                index=FILES_WRITE,
+                query={"term": {"file_path.tree": path}},
+                conflicts="proceed",
+                refresh=True,
+                wait_for_completion=False,
+            )
+            print(f"[INFO] Deleting index under {path} (task {response['task']})")
+            return response["task"]
         except Exception as e:
-            print(f"[ERROR] Error deleting index for file {file_path}: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Error deleting index for file {file_path}: {str(e)}")
+            print(f"[ERROR] Error deleting index under {path}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Error deleting index under {path}: {str(e)}")
         finally:
             await self.close()
-    async def get_unindexed_files(self) -> List[str]:
-        """Отримати список файлів, які ще не проіндексовані в Elasticsearch"""
-        try:
 
-            directory = Path(bucket_path)
-            physical_files = {file.name for file in directory.rglob('*') if file.is_file()}
+    async def get_task(self, task_id: str) -> dict:
+        """
+        Returns the progress of a path move or delete task.
 
-            # Отримати всі індексовані файли
-            es_query = {"query": {"match_all": {}}}
-            es_response = await self.es.search(index="files_index", body=es_query)
-            indexed_files = {hit["_source"].get("file_name", "") for hit in es_response["hits"]["hits"]}
-            # Визначити непроіндексовані файли
-            unindexed_files = list(physical_files - indexed_files)
-            return unindexed_files
+        Args:
+            task_id (str): Id returned by `move_path` or `delete_path`.
 
+        Raises:
+            HTTPException: If the task is unknown or Elasticsearch is unreachable.
+        """
+        try:
+            response = await self.es.tasks.get(task_id=task_id)
         except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Помилка отримання даних: {str(e)}")
+            raise HTTPException(status_code=404, detail=f"Task {task_id} not found: {str(e)}")
         finally:
             await self.close()
+
+        status = response["task"].get("status", {})
+        result = response.get("response", {})
+        return {
+            "task_id": task_id,
+            "completed": response.get("completed", False),
+            "total": status.get("total", 0),
+            "updated": status.get("updated", 0),
+            "deleted": status.get("deleted", 0),
+            "failures": len(result.get("failures", [])),
+        }
+
+    @staticmethod
+    def build_search_body(query: str, folder: Optional[str] = None, file_types: Optional[list[str]] = None,
+                          size: int = 20, cursor: Optional[str] = None) -> dict[str, Any]:
+        """
+        Builds the search request body.
+
+        The user query goes through `simple_query_string`, which supports
+        quotes, `-` and `*` but never fails on malformed input. Filters run in
+        filter context so Elasticsearch can cache them, and pagination uses
+        `search_after` on (score, passage id) so deep pages stay cheap.
+        """
+        filters: list[dict[str, Any]] = []
+        if folder and folder.strip("/"):
+            filters.append({"term": {"file_path.tree": SearchManager.to_system_path(folder)}})
+        if file_types:
+            filters.append({"terms": {"file_type": SearchManager.normalize_types(file_types)}})
+
+        body: dict[str, Any] = {
+            "size": size,
+            "query": {
+                "bool": {
+                    "must": [{
+                        "simple_query_string": {
+                            "query": query,
+                            "fields": ["content", "content.uk", "content.ru", "content.en", "file_name^2"],
+                            "default_operator": "and",
+                        }
+                    }],
+                    "filter": filters,
+                }
+            },
+            "sort": [{"_score": "desc"}, {"passage_id": "asc"}],
+            "_source": {"excludes": ["content"]},
+            "track_total_hits": True,
+            "highlight": {
+                "pre_tags": [SearchManager.HIGHLIGHT_TAGS[0]],
+                "post_tags": [SearchManager.HIGHLIGHT_TAGS[1]],
+                "fields": {
+                    "content": {"fragment_size": 150, "number_of_fragments": 3, "no_match_size": 150},
+                },
+            },
+            "aggs": {
+                "file_types": {
+                    "terms": {"field": "file_type", "size": 20},
+                    "aggs": {"files": {"cardinality": {"field": "file_path"}}},
+                },
+                "folders": {
+                    "terms": {"field": "folder", "size": 20},
+                    "aggs": {"files": {"cardinality": {"field": "file_path"}}},
+                },
+                "files": {"cardinality": {"field": "file_path"}},
+            },
+        }
+        if cursor:
+            body["search_after"] = SearchManager.decode_cursor(cursor, CURSOR_TYPES)
+        return body
+
+    @staticmethod
+    def parse_search_response(response: dict[str, Any], size: int) -> dict[str, Any]:
+        """
+        Shapes a raw Elasticsearch response into a `SearchResponse`.
+        """
+        hits = response["hits"]["hits"]
+        results = [
+            SearchManager.make_hit(hit["_source"], hit.get("_score") or 0.0,
+                                   hit.get("highlight", {}).get("content", []))
+            for hit in hits
+        ]
+
+        aggregations = response.get("aggregations", {})
+
+        def buckets(name: str) -> list[tuple[str, int, int]]:
+            return [
+                (bucket["key"], bucket["doc_count"], bucket["files"]["value"])
+                for bucket in aggregations.get(name, {}).get("buckets", [])
+            ]
+
+        cursor = None
+        if hits and len(hits) == size:
+            cursor = SearchManager.encode_cursor(hits[-1]["sort"])
+
+        return SearchManager.make_response(
+            took_ms=response.get("took", 0),
+            total_passages=response["hits"]["total"]["value"],
+            total_files=aggregations.get("files", {}).get("value", 0),
+            results=results,
+            file_types=buckets("file_types"),
+            folders=buckets("folders"),
+            next_cursor=cursor,
+        )
+
+    async def search(self, query: str, folder: Optional[str] = None, file_types: Optional[list[str]] = None,
+                     size: int = 20, cursor: Optional[str] = None) -> dict:
+        """
+        Runs a search on the shared client and returns one page of passages plus facet counts.
+        """
+        body = self.build_search_body(query, folder, file_types, size, cursor)
+        response = await get_client().search(index=FILES_READ, **body)
+        return self.parse_search_response(response.body, size)
+
     async def close(self):
         """
         Closes the connection to Elasticsearch.
         """
-        await self.es.close()
+        if self._es is not None:
+            await self._es.close()
+            self._es = None
@@ -0,0 +1,322 @@
+import json
+import os
+import socket
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, TypeVar
+
+from app.config.settings import get_settings
+
+T = TypeVar("T")
+
+# Pipeline stages, in the order a file goes through them
+STAGES = ("queue_wait", "cache_lookup", "extract", "bulk")
+
+
+def process_name() -> str:
+    """
+    Returns the name identifying this process among the snapshot files.
+    """
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class IndexMetrics:
+    """
+    Counters and stage timings of the indexing pipeline in this process.
+
+    Every stage keeps the count, total and maximum of its durations, per
+    label (the file type for `cache_lookup` and `extract`). Indexed files are also
+    kept for the last `window` seconds to report current throughput. All
+    methods are thread-safe, extraction runs in worker threads.
+
+    Each worker process writes its `snapshot` to `index_metrics_dir` (see
+    `flush`), and `summarize` merges the snapshots of every process into the
+    fleet-wide view served by the API.
+    """
+
+    def __init__(self, window: float = 60.0):
+        """
+        Initialize empty metrics.
+        :param window: Seconds of recent activity used for throughput.
+        """
+        self.window = window
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._stages: dict[tuple[str, str], list[float]] = {}
+        self._errors: dict[tuple[str, str], int] = {}
+        self._files = 0
+        self._bytes = 0
+        self._passages = 0
+        self._recent: deque[tuple[float, int, int]] = deque()
+
+    def observe(self, stage: str, seconds: float, label: str = ""):
+        """
+        Record one duration of a pipeline stage.
+        :param stage: One of `STAGES`.
+        :param seconds: How long the stage took.
+        :param label: Sub-division of the stage, e.g. the file type.
+        """
+        with self._lock:
+            stat = self._stages.setdefault((stage, label), [0, 0.0, 0.0])
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2] = max(stat[2], seconds)
+
+    @contextmanager
+    def timer(self, stage: str, label: str = ""):
+        """
+        Time the body of a `with` block as one `observe` of `stage`.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, label)
+
+    def timed(self, items: Iterable[T], stage: str, label: str = "") -> Iterator[T]:
+        """
+        Yield from `items`, recording the time spent producing them as one `observe`.
+
+        Only the time inside the wrapped iterator counts, not the time the
+        consumer spends between items, so a lazily extracted document is
+        timed correctly even while its passages are being sent.
+        """
+        elapsed = 0.0
+        iterator = iter(items)
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - started
+                yield item
+        finally:
+            self.observe(stage, elapsed, label)
+
+    def record_file(self, size: int, passages: int):
+        """
+        Record a successfully indexed file.
+        :param size: File size in bytes.
+        :param passages: Number of passage documents written.
+        """
+        now = time.time()
+        with self._lock:
+            self._files += 1
+            self._bytes += size
+            self._passages += passages
+            self._recent.append((now, size, passages))
+            self._trim(now)
+
+    def record_error(self, stage: str, error_type: str):
+        """
+        Count a failure.
+        :param stage: Where it happened (`extract`, `index`, `delete`, `job`).
+        :param error_type: Exception class name or a short error code.
+        """
+        with self._lock:
+            self._errors[(stage, error_type)] = self._errors.get((stage, error_type), 0) + 1
+
+    def _trim(self, now: float):
+        while self._recent and self._recent[0][0] < now - self.window:
+            self._recent.popleft()
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Return the metrics as a JSON-serializable dict.
+        """
+        now = time.time()
+        with self._lock:
+            self._trim(now)
+            return {
+                "process": process_name(),
+                "started_at": self.started_at,
+                "updated_at": now,
+                "window": self.window,
+                "stages": [[stage, label, *stat] for (stage, label), stat in self._stages.items()],
+                "errors": [[stage, error_type, count] for (stage, error_type), count in self._errors.items()],
+                "files": self._files,
+                "bytes": self._bytes,
+                "passages": self._passages,
+                "recent": [list(entry) for entry in self._recent],
+            }
+
+    def flush(self, directory: Path, retention: Optional[float] = None):
+        """
+        Write the snapshot of this process to `directory`, replacing the previous one.
+        :param directory: Directory shared by the snapshots of all processes.
+        :param retention: If set, also delete snapshots not updated for this many
+                          seconds, left behind by processes that have exited.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{process_name()}.json"
+        temporary = path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(self.snapshot()), encoding="utf-8")
+        os.replace(temporary, path)
+        if retention is not None:
+            prune_snapshots(directory, retention)
+
+
+def prune_snapshots(directory: Path, retention: float):
+    """
+    Delete the snapshot files in `directory` not modified in the last `retention` seconds.
+    """
+    cutoff = time.time() - retention
+    for path in [*directory.glob("*.json"), *directory.glob("*.tmp")]:
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            continue  # removed by another process
+
+
+def load_snapshots(directory: Path, stale_after: float) -> list[dict[str, Any]]:
+    """
+    Return the snapshots flushed to `directory` in the last `stale_after` seconds.
+    """
+    if not directory.is_dir():
+        return []
+    snapshots = []
+    for path in directory.glob("*.json"):
+        try:
+            snapshot = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if snapshot.get("updated_at", 0) >= time.time() - stale_after:
+            snapshots.append(snapshot)
+    return snapshots
+
+
+def summarize(snapshots: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Merge process snapshots into totals, per-stage timings, throughput and errors.
+
+    Throughput is the volume indexed by all processes over the last `window`
+    seconds.
+    """
+    stages: dict[tuple[str, str], list[float]] = {}
+    errors: dict[tuple[str, str], int] = {}
+    totals = {"files": 0, "bytes": 0, "passages": 0}
+    window = max((snapshot["window"] for snapshot in snapshots), default=60.0)
+    recent_bytes = recent_passages = 0
+    since = time.time() - window
+    for snapshot in snapshots:
+        for stage, label, count, total, maximum in snapshot["stages"]:
+            stat = stages.setdefault((stage, label), [0, 0.0, 0.0])
+            stat[0] += count
+            stat[1] += total
+            stat[2] = max(stat[2], maximum)
+        for stage, error_type, count in snapshot["errors"]:
+            errors[(stage, error_type)] = errors.get((stage, error_type), 0) + count
+        for key in totals:
+            totals[key] += snapshot[key]
+        for finished_at, size, passages in snapshot["recent"]:
+            if finished_at >= since:
+                recent_bytes += size
+                recent_passages += passages
+
+    order = {stage: number for number, stage in enumerate(STAGES)}
+    return {
+        "processes": len(snapshots),
+        **totals,
+        "bytes_per_second": recent_bytes / window,
+        "passages_per_second": recent_passages / window,
+        "window_seconds": window,
+        "stages": [
+            {
+                "stage": stage,
+                "label": label,
+                "count": count,
+                "total_seconds": total,
+                "avg_seconds": total / count if count else 0.0,
+                "max_seconds": maximum,
+            }
+            for (stage, label), (count, total, maximum)
+            in sorted(stages.items(), key=lambda item: (order.get(item[0][0], len(order)), item[0][1]))
+        ],
+        "errors": [
+            {"stage": stage, "type": error_type, "count": count}
+            for (stage, error_type), count in sorted(errors.items())
+        ],
+    }
+
+
+def _labels(**labels: str) -> str:
+    def escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def to_prometheus(summary: dict[str, Any], queue: dict[str, Any]) -> str:
+    """
+    Render a `summarize` result and the queue stats in the Prometheus text format.
+    """
+    lines = [
+        "# HELP index_stage_seconds Time spent in each indexing stage.",
+        "# TYPE index_stage_seconds summary",
+    ]
+    for stat in summary["stages"]:
+        labels = _labels(stage=stat["stage"], file_type=stat["label"])
+        lines.append(f"index_stage_seconds_sum{labels} {stat['total_seconds']}")
+        lines.append(f"index_stage_seconds_count{labels} {stat['count']}")
+
+    counters: list[tuple[str, str, Any]] = [
+        ("index_files_total", "Files indexed.", summary["files"]),
+        ("index_bytes_total", "Bytes of indexed files.", summary["bytes"]),
+        ("index_passages_total", "Passage documents written.", summary["passages"]),
+    ]
+    for name, help_text, value in counters:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter", f"{name} {value}"]
+
+    lines += ["# HELP index_errors_total Indexing failures.", "# TYPE index_errors_total counter"]
+    for error in summary["errors"]:
+        lines.append(f"index_errors_total{_labels(stage=error['stage'], type=error['type'])} {error['count']}")
+
+    gauges: list[tuple[str, str, Any]] = [
+        ("index_bytes_per_second", "Bytes indexed per second, recent window.", summary["bytes_per_second"]),
+        ("index_passages_per_second", "Passages indexed per second, recent window.",
+         summary["passages_per_second"]),
+        ("index_queue_ready", "Jobs ready to run.", queue["ready"]),
+        ("index_queue_lag_seconds", "Age of the oldest ready job.", queue["lag_seconds"]),
+    ]
+    for name, help_text, value in gauges:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+    lines += ["# HELP index_queue_jobs Jobs in the queue by status.", "# TYPE index_queue_jobs gauge"]
+    for status, count in queue["depth"].items():
+        lines.append(f"index_queue_jobs{_labels(status=status)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+_metrics: Optional[IndexMetrics] = None
+
+
+def get_index_metrics() -> IndexMetrics:
+    """
+    Returns the metrics of this process, created on first use.
+    """
+    global _metrics
+    if _metrics is None:
+        _metrics = IndexMetrics(get_settings().index_metrics_window)
+    return _metrics
+
+
+def collect_snapshots() -> list[dict[str, Any]]:
+    """
+    Returns the recent snapshots of all processes, this one included.
+
+    The snapshot file of this process, if it flushes one, is replaced by its
+    live metrics.
+    """
+    settings = get_settings()
+    own = process_name()
+    snapshots = [
+        snapshot for snapshot in load_snapshots(settings.index_metrics_dir, settings.index_metrics_stale_after)
+        if snapshot.get("process") != own
+    ]
+    return snapshots + [get_index_metrics().snapshot()]
@@ -0,0 +1,347 @@
+import asyncio
+import logging
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import Iterator, List, Optional
+from uuid import uuid4
+
+from fastapi import HTTPException
+
+from app.api.utils.do_file import bucket_path
+from app.config.settings import get_settings
+from app.database.db import async_session
+from app.managers.index_queue import IndexQueue
+from app.models.enums import JobPriority
+from app.file_processors.main_file import SearchContext
+from app.file_processors.utils.extraction_cache import ExtractionCache
+from app.file_processors.utils.ocr import (
+    FolderLanguages,
+    configure_batching,
+    configure_language_detection,
+    preload_readers,
+    start_ocr_pool,
+)
+from app.file_processors.utils.ocr_cache import OCRCache
+from app.file_processors.utils.sheet_cache import SheetCache
+from app.file_processors.utils.passages import split_passages
+from app.file_processors.archive_processor import ArchiveProcessor
+from app.file_processors.audio_processor import AudioProcessor
+from app.file_processors.code_processor import CodeProcessor
+from app.file_processors.excel_processor import ExcelProcessor
+from app.file_processors.image_processor import ImageProcessor
+from app.file_processors.pdf_processor import PDFProcessor
+from app.file_processors.presentation_processor import PresentationProcessor
+from app.file_processors.text_processor import TextProcessor
+from app.file_processors.word_processor import WordProcessor
+
+logger = logging.getLogger(__name__)
+
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    """
+    Returns the extraction cache configured in `Settings`, or None if it is disabled.
+    """
+    settings = get_settings()
+    if not settings.extraction_cache_enabled:
+        return None
+    return ExtractionCache(settings.extraction_cache_dir, settings.extraction_cache_max_bytes)
+
+
+def get_ocr_cache() -> Optional[OCRCache]:
+    """
+    Returns the OCR cache configured in `Settings`, or None if it is disabled.
+    """
+    settings = get_settings()
+    if not settings.ocr_cache_enabled:
+        return None
+    return OCRCache(settings.ocr_cache_path, settings.ocr_cache_max_distance, settings.ocr_cache_max_entries)
+
+
+def get_sheet_cache() -> Optional[SheetCache]:
+    """
+    Returns the columnar spreadsheet cache configured in `Settings`, or None if it is disabled.
+    """
+    settings = get_settings()
+    if not settings.sheet_cache_enabled:
+        return None
+    return SheetCache(settings.sheet_cache_dir)
+
+
+def get_ocr_languages() -> FolderLanguages:
+    """
+    Returns the OCR languages per folder configured in `Settings`.
+    """
+    settings = get_settings()
+    folders = {str(bucket_path / Path("." + folder)): languages for folder, languages in settings.ocr_folder_languages.items()}
+    return FolderLanguages(folders, settings.ocr_languages)
+
+
+def build_search_context() -> SearchContext:
+    """
+    Returns a SearchContext with a processor registered for every supported file type.
+    """
+    context = SearchContext(cache=get_extraction_cache())
+    settings = get_settings()
+    ocr_languages, ocr_cache = get_ocr_languages(), get_ocr_cache()
+    image_processor = partial(ImageProcessor, languages=ocr_languages, ocr_cache=ocr_cache)
+    pdf_processor = partial(PDFProcessor, languages=ocr_languages, ocr_cache=ocr_cache,
+                            workers=settings.pdf_workers, chunk_pages=settings.pdf_chunk_pages)
+    excel_processor = partial(ExcelProcessor, sheet_cache=get_sheet_cache())
+    context.register_processor("mp3", AudioProcessor)
+    context.register_processor("py", CodeProcessor)
+    context.register_processor("pdf", pdf_processor)
+    context.register_processor("xlsx", excel_processor)
+    context.register_processor("xls", excel_processor)
+    context.register_processor("csv", excel_processor)
+    context.register_processor("ods", excel_processor)
+    context.register_processor("pptx", PresentationProcessor)
+    context.register_processor("txt", TextProcessor)
+    context.register_processor("docx", WordProcessor)
+    context.register_processor("doc", WordProcessor)
+    context.register_processor("jpg", image_processor)
+    context.register_processor("png", image_processor)
+    context.register_processor("jpeg", image_processor)
+    context.register_processor("zip", partial(ArchiveProcessor, processors=context.processors))
+    context.register_processor("7z", partial(ArchiveProcessor, processors=context.processors))
+    return context
+
+
+class SearchBackend(ABC):
+    """
+    Base class for the stores that hold the passages of indexed files.
+
+    The backend owns the file processors and turns files into passage
+    documents; subclasses only decide how those are stored, moved, deleted and
+    searched. Use `get_search_backend` to get the one selected in `Settings`.
+    """
+
+    def __init__(self):
+        """
+        Registers the file processors shared by every backend.
+        """
+        self.context = build_search_context()
+
+    def can_index(self, file_path: str) -> bool:
+        """
+        Returns True if a processor is registered for the file's extension.
+        """
+        return file_path.split('.')[-1].lower() in self.context.processors
+
+    def iter_passages(self, file_path: str) -> Iterator[dict]:
+        """
+        Yields one document per passage of `file_path`.
+
+        All passages of one indexing run share a `generation` id, so a backend
+        can drop the passages of the previous run once the new ones are in.
+        Files without any text still yield one empty passage, so they are not
+        reported as unindexed.
+        """
+        settings = get_settings()
+        generation = uuid4().hex
+        base = {
+            "file_path": file_path,
+            "file_name": os.path.basename(file_path),
+            "file_type": file_path.split('.')[-1].lower(),
+            "folder": os.path.dirname(file_path),
+            "generation": generation,
+            "indexed_at": datetime.utcnow(),
+        }
+
+        passages = split_passages(
+            self.context.iter_segments(file_path), settings.passage_size, settings.passage_overlap
+        )
+        number = -1
+        for number, passage in enumerate(passages):
+            yield {
+                **base,
+                "passage": number,
+                "passage_id": f"{generation}-{number}",
+                "locator": passage["locator"],
+                "locator_end": passage.get("locator_end"),
+                "content": passage["text"],
+            }
+        if number == -1:
+            yield {**base, "passage": 0, "passage_id": f"{generation}-0",
+                   "locator": {}, "locator_end": None, "content": ""}
+
+    @abstractmethod
+    async def ensure_index(self):
+        """
+        Creates the index if it does not exist yet.
+        """
+
+    @abstractmethod
+    async def index_file(self, file_path: str):
+        """
+        Replaces the passages of a single file with freshly extracted ones.
+
+        Raises:
+            HTTPException: If the file could not be indexed.
+        """
+
+    @abstractmethod
+    async def delete_file_index(self, file_path: str):
+        """
+        Removes the passages of a single file.
+        """
+
+    @abstractmethod
+    async def move_path(self, old_path: str, new_path: str) -> Optional[str]:
+        """
+        Re-points every passage at or under `old_path` to `new_path`.
+
+        Returns:
+            Optional[str]: Id of the background task doing the work, or None
+            if the move is already complete.
+        """
+
+    @abstractmethod
+    async def delete_path(self, path: str) -> Optional[str]:
+        """
+        Removes every passage at or under `path`.
+
+        Returns:
+            Optional[str]: Id of the background task doing the work, or None
+            if the delete is already complete.
+        """
+
+    @abstractmethod
+    async def get_task(self, task_id: str) -> dict:
+        """
+        Returns the progress of a task started by `move_path` or `delete_path`.
+
+        Raises:
+            HTTPException: If the task is unknown.
+        """
+
+    @abstractmethod
+    async def indexed_paths(self) -> set[str]:
+        """
+        Returns the path of every file with at least one passage in the index.
+        """
+
+    @abstractmethod
+    async def search(self, query: str, folder: Optional[str] = None, file_types: Optional[list[str]] = None,
+                     size: int = 20, cursor: Optional[str] = None) -> dict:
+        """
+        Returns one page of matching passages plus facet counts, shaped as a `SearchResponse`.
+
+        Args:
+            query (str): User query (quotes for phrases, `-` to exclude, `*` for prefixes).
+            folder (Optional[str]): Only search under this folder (API path).
+            file_types (Optional[list[str]]): Only search files with these extensions.
+            size (int): Number of passages per page.
+            cursor (Optional[str]): `next_cursor` of the previous page.
+        """
+
+    @abstractmethod
+    async def close(self):
+        """
+        Releases the backend's connections.
+        """
+
+    async def get_unindexed_paths(self) -> List[str]:
+        """
+        Returns the full paths of files under `bucket_path` that are not in the index.
+        """
+        directory = Path(bucket_path)
+        physical_files = {str(file) for file in directory.rglob('*') if file.is_file()}
+        return sorted(physical_files - await self.indexed_paths())
+
+    async def index_all_unindexed_files(self):
+        """
+        Queues all unindexed files in `bucket_path` for indexing.
+
+        The files are added to the durable indexing queue with backfill
+        priority, so interactive uploads are still served first and the work
+        survives restarts. Run `api-admin worker run` to process them.
+
+        Raises:
+            HTTPException: If there's an error retrieving or queueing the files.
+        """
+        try:
+            unindexed_files = await self.get_unindexed_paths()
+
+            if not unindexed_files:
+                print("[INFO] No unindexed files found.")
+                return
+
+            async with async_session() as session, session.begin():
+                for file in unindexed_files:
+                    await IndexQueue.enqueue(file, session, priority=JobPriority.backfill)
+            print(f"[INFO] Queued {len(unindexed_files)} unindexed files for indexing")
+
+        except Exception as e:
+            print(f"[ERROR] Error during indexing unindexed files: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Error indexing unindexed files: {str(e)}")
+        finally:
+            await self.close()
+
+    async def get_unindexed_files(self) -> List[str]:
+        """Отримати список імен файлів, які ще не проіндексовані"""
+        try:
+            return [Path(path).name for path in await self.get_unindexed_paths()]
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Помилка отримання даних: {str(e)}")
+        finally:
+            await self.close()
+
+
+def get_search_backend() -> SearchBackend:
+    """
+    Returns a new instance of the search backend selected by `Settings.search_backend`.
+    """
+    backend = get_settings().search_backend
+    if backend == "sqlite":
+        from app.api.utils.sqlite_search import SQLiteSearchBackend
+
+        return SQLiteSearchBackend()
+    from app.api.utils.elastic import ElasticsearchService
+
+    return ElasticsearchService()
+
+
+async def prepare_search_index() -> bool:
+    """
+    Makes sure the configured backend's index (and template) exists.
+
+    Failures are logged rather than raised, so an unreachable search cluster
+    does not stop the API or the indexing worker from starting.
+
+    Returns:
+        bool: True if the index is ready.
+    """
+    backend = get_search_backend()
+    try:
+        await backend.ensure_index()
+        return True
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Could not prepare the search index: %s", exc)
+        return False
+    finally:
+        await backend.close()
+
+
+async def prepare_ocr():
+    """
+    Sets up OCR for a process that is about to index many files.
+
+    Images are batched as configured in `Settings`, and the OCR models are
+    loaded now instead of on the first image: in `ocr_workers` pool processes
+    if set, otherwise in this process if `ocr_preload` is set. Failures are
+    logged, OCR then loads its models on first use.
+    """
+    settings = get_settings()
+    configure_batching(settings.ocr_batch_size, settings.ocr_batch_wait)
+    configure_language_detection(settings.ocr_detect_languages)
+    language_sets = get_ocr_languages().language_sets()
+    try:
+        if settings.ocr_workers > 0:
+            await asyncio.to_thread(start_ocr_pool, settings.ocr_workers, language_sets)
+        elif settings.ocr_preload:
+            await asyncio.to_thread(preload_readers, language_sets)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Could not load the OCR models: %s", exc)
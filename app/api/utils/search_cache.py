@@ -0,0 +1,204 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from app.config.settings import get_settings
+
+REDIS_PREFIX = "search:"
+
+
+def normalize_folder(folder: Optional[str]) -> str:
+    """
+    Returns a folder in the form used by the cache: "" for the root, "/a/b" otherwise.
+    """
+    parts = [part for part in (folder or "").split("/") if part]
+    return "/" + "/".join(parts) if parts else ""
+
+
+def affects(folder: str, path: str) -> bool:
+    """
+    Returns True if a change at `path` can change the results of a search under `folder`.
+
+    That is the case when the path is inside the folder, or when the path is a
+    folder that contains it (a moved or deleted parent).
+    """
+    return (not folder or path == folder or path.startswith(folder + "/")
+            or folder.startswith(path + "/"))
+
+
+class SearchCache:
+    """
+    Cache of search responses, keyed by the normalized query and filters.
+
+    Entries live in an in-process LRU and, if a Redis client is given, in
+    Redis so that every API process and the indexing workers share them. Every
+    entry expires after `ttl` seconds, and `invalidate` drops the entries whose
+    folder filter covers a changed path.
+
+    Local entries are stamped with a Redis counter that every invalidation
+    bumps, so an invalidation in any process also retires the LRU entries of
+    all the others. Without Redis, changes made by other processes (e.g. the
+    indexing worker) only show up once the entries expire.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, redis=None):
+        """
+        Initialize the cache.
+        :param max_entries: Number of responses kept in the in-process LRU.
+        :param ttl: Seconds an entry stays valid.
+        :param redis: Optional `redis.asyncio.Redis` client shared by all processes.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.redis = redis
+        self._entries: OrderedDict[str, tuple[float, str, int, Any]] = OrderedDict()
+
+    @staticmethod
+    def make_key(backend: str, query: str, folder: Optional[str], file_types: Optional[list[str]],
+                 size: int, cursor: Optional[str]) -> str:
+        """
+        Build the cache key of a search.
+        Whitespace and case of the query, slashes around the folder and the order
+        and case of the file types do not change the results, so they do not
+        change the key either.
+        """
+        normalized = {
+            "backend": backend,
+            "query": " ".join(query.lower().split()),
+            "folder": normalize_folder(folder),
+            "types": sorted({file_type.lower().lstrip(".") for file_type in file_types or []}),
+            "size": size,
+            "cursor": cursor,
+        }
+        raw = json.dumps(normalized, sort_keys=True, ensure_ascii=False).encode()
+        return hashlib.sha256(raw).hexdigest()
+
+    async def _stamp(self) -> int:
+        if self.redis is None:
+            return 0
+        return int(await self.redis.get(REDIS_PREFIX + "stamp") or 0)
+
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        Return the cached response for `key`, or None on a miss.
+        :param key: Key built with `make_key`.
+        """
+        stamp = await self._stamp()
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, _, entry_stamp, value = entry
+            if expires_at > time.monotonic() and entry_stamp == stamp:
+                self._entries.move_to_end(key)
+                return value
+            del self._entries[key]
+
+        if self.redis is None:
+            return None
+        raw = await self.redis.get(REDIS_PREFIX + "entry:" + key)
+        if raw is None:
+            return None
+        folder, value = json.loads(raw)
+        self._store(key, folder, stamp, value)
+        return value
+
+    def _store(self, key: str, folder: str, stamp: int, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, folder, stamp, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def put(self, key: str, folder: Optional[str], value: Any):
+        """
+        Store a response.
+        :param key: Key built with `make_key`.
+        :param folder: Folder filter of the search, used by `invalidate`.
+        :param value: JSON-serializable response.
+        """
+        folder = normalize_folder(folder)
+        self._store(key, folder, await self._stamp(), value)
+        if self.redis is None:
+            return
+        ttl = max(1, int(self.ttl))
+        folder_key = REDIS_PREFIX + "folder:" + folder
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(REDIS_PREFIX + "entry:" + key, json.dumps([folder, value], ensure_ascii=False), ex=ttl)
+            pipe.sadd(folder_key, key)
+            pipe.expire(folder_key, ttl)
+            await pipe.execute()
+
+    async def invalidate(self, path: str):
+        """
+        Drop every entry whose results a change at `path` could affect.
+        :param path: Changed file or folder, as seen by the API ("/a/b.txt").
+        """
+        path = normalize_folder(path)
+        for key in [key for key, entry in self._entries.items() if affects(entry[1], path)]:
+            del self._entries[key]
+        if self.redis is None:
+            return
+
+        # searches under the path's ancestors, the path itself and its subfolders
+        parts = path.split("/")
+        folders = {"/".join(parts[:end]) for end in range(1, len(parts) + 1)}
+        pattern = REDIS_PREFIX + "folder:" + _escape_glob(path) + "/*"
+        folder_keys = [REDIS_PREFIX + "folder:" + folder for folder in folders]
+        folder_keys += [key async for key in self.redis.scan_iter(match=pattern, count=500)]
+        for folder_key in folder_keys:
+            members = await self.redis.smembers(folder_key)
+            entry_keys = [REDIS_PREFIX + "entry:" + _text(member) for member in members]
+            await self.redis.delete(folder_key, *entry_keys)
+        await self.redis.incr(REDIS_PREFIX + "stamp")
+
+    async def clear(self):
+        """
+        Remove every entry.
+        """
+        self._entries.clear()
+        if self.redis is None:
+            return
+        keys = [key async for key in self.redis.scan_iter(match=REDIS_PREFIX + "*", count=500)]
+        if keys:
+            await self.redis.delete(*keys)
+        await self.redis.incr(REDIS_PREFIX + "stamp")
+
+
+def _escape_glob(text: str) -> str:
+    for char in "\\*?[]":
+        text = text.replace(char, "\\" + char)
+    return text
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+_cache: Optional[SearchCache] = None
+
+
+def get_search_cache() -> Optional[SearchCache]:
+    """
+    Returns the search cache configured in `Settings`, or None if it is disabled.
+
+    The cache is created on first use and shared by the whole process. Redis
+    is used when `search_cache_redis` is set; the `redis` package is only
+    needed then.
+    """
+    global _cache
+    settings = get_settings()
+    if not settings.search_cache_enabled:
+        return None
+    if _cache is None:
+        redis = None
+        if settings.search_cache_redis:
+            from redis.asyncio import Redis
+
+            redis = Redis(
+                host=settings.redis_host,
+                port=settings.redis_port,
+                db=settings.redis_db,
+                password=settings.redis_password,
+            )
+        _cache = SearchCache(settings.search_cache_size, settings.search_cache_ttl, redis)
+    return _cache
@@ -0,0 +1,381 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Any, Optional
+
+from fastapi import HTTPException
+
+from app.api.utils.index_metrics import get_index_metrics
+from app.api.utils.search_backend import SearchBackend
+from app.config.settings import get_settings
+from app.managers.search import SearchManager
+
+# `passages` holds what is returned with a hit, `passages_fts` the searchable
+# text; both share the rowid. unicode61 folds case and diacritics for Latin and
+# Cyrillic alike, and the prefix indexes keep `foo*` queries off a full scan.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS passages (
+    id INTEGER PRIMARY KEY,
+    passage_id TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    file_type TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    generation TEXT NOT NULL,
+    passage INTEGER NOT NULL,
+    locator TEXT,
+    locator_end TEXT,
+    indexed_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS passages_file_path ON passages (file_path, generation);
+CREATE VIRTUAL TABLE IF NOT EXISTS passages_fts USING fts5(
+    content, file_name, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+);
+"""
+
+# weights of the content and file_name columns in the BM25 score
+BM25 = "bm25(passages_fts, 1.0, 2.0)"
+# Types of the sort values of a page cursor: the BM25 rank, then the passage row id.
+CURSOR_TYPES = ((int, float), int)
+
+_schema_ready: set[str] = set()
+_schema_lock = threading.Lock()
+
+_QUERY_TOKEN = re.compile(r'(-?)"([^"]*)"?|(-?)(\S+)')
+
+
+def to_match_query(query: str) -> Optional[str]:
+    """
+    Translates a user query into an FTS5 MATCH expression.
+
+    Supports the same syntax as the Elasticsearch backend: terms must all
+    match, "quoted phrases" match in order, `-term` excludes and `term*` is a
+    prefix query. Everything else is quoted, so user input can never be a
+    syntax error.
+
+    :param query: The query as typed by the user.
+    :return: The MATCH expression, or None if nothing is left to search for.
+    """
+    required, excluded = [], []
+    for negated_phrase, phrase, negated_term, term in _QUERY_TOKEN.findall(query):
+        if term:
+            words = re.findall(r"\w+", term)
+            if not words:
+                continue
+            expression = '"' + " ".join(words) + '"'
+            if term.endswith("*"):
+                expression += "*"
+            (excluded if negated_term else required).append(expression)
+        else:
+            words = re.findall(r"\w+", phrase)
+            if words:
+                (excluded if negated_phrase else required).append('"' + " ".join(words) + '"')
+
+    if not required:
+        return None
+    expression = " AND ".join(required)
+    for term in excluded:
+        expression += f" NOT {term}"
+    return expression
+
+
+def _subtree(column: str, path: str) -> tuple[str, list[str]]:
+    """
+    Builds a condition selecting `path` and everything below it.
+    The range on `path/` .. `path0` ('0' follows '/') can use the index,
+    unlike LIKE.
+    """
+    return f"({column} = ? OR ({column} >= ? AND {column} < ?))", [path, path + "/", path + "0"]
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """
+    Search backend keeping the passages in an embedded SQLite FTS5 database.
+
+    Needs no server, so it serves small deployments, tests and benchmarks.
+    Passages are ranked with BM25 and highlighted with FTS5 snippets. Every
+    operation opens its own short-lived connection in a worker thread, and the
+    database runs in WAL mode so searches are not blocked by indexing.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Initializes the backend.
+        :param path: Database file, defaults to `Settings.sqlite_search_path`.
+        """
+        super().__init__()
+        self.path = Path(path or get_settings().sqlite_search_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        key = str(self.path.resolve())
+        if key not in _schema_ready:
+            with _schema_lock:
+                if key not in _schema_ready:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    connection.execute("PRAGMA journal_mode = WAL")
+                    connection.executescript(SCHEMA)
+                    _schema_ready.add(key)
+        connection.execute("PRAGMA synchronous = NORMAL")
+        return connection
+
+    def _run(self, write: bool, function, *args):
+        """
+        Runs `function(connection, *args)` in a transaction and returns its result.
+        """
+        connection = self._connect()
+        try:
+            with connection:
+                if write:
+                    connection.execute("BEGIN IMMEDIATE")
+                return function(connection, *args)
+        finally:
+            connection.close()
+
+    async def _call(self, write: bool, function, *args):
+        return await asyncio.to_thread(self._run, write, function, *args)
+
+    async def ensure_index(self):
+        """
+        Creates the database and its tables if they do not exist yet.
+        """
+        await self._call(False, lambda connection: None)
+
+    @staticmethod
+    def _insert(connection: sqlite3.Connection, passages: list[dict]):
+        for passage in passages:
+            cursor = connection.execute(
+                "INSERT INTO passages (passage_id, file_path, file_name, file_type, folder, generation,"
+                " passage, locator, locator_end, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    passage["passage_id"], passage["file_path"], passage["file_name"], passage["file_type"],
+                    passage["folder"], passage["generation"], passage["passage"],
+                    json.dumps(passage["locator"], ensure_ascii=False),
+                    json.dumps(passage["locator_end"], ensure_ascii=False) if passage["locator_end"] else None,
+                    passage["indexed_at"].isoformat(),
+                ),
+            )
+            connection.execute(
+                "INSERT INTO passages_fts (rowid, content, file_name) VALUES (?, ?, ?)",
+                (cursor.lastrowid, passage["content"], passage["file_name"]),
+            )
+
+    @staticmethod
+    def _delete(connection: sqlite3.Connection, condition: str, params: list) -> int:
+        ids = f"SELECT id FROM passages WHERE {condition}"
+        connection.execute(f"DELETE FROM passages_fts WHERE rowid IN ({ids})", params)
+        return connection.execute(f"DELETE FROM passages WHERE {condition}", params).rowcount
+
+    async def index_file(self, file_path: str):
+        """
+        Indexes a single file as a set of passages.
+
+        Passages are written in short transactions while the file is being
+        extracted, and the previous run's passages are removed at the end, so
+        a slow extraction never holds the database lock.
+
+        Args:
+            file_path (str): The file path to be indexed.
+
+        Raises:
+            HTTPException: If there's an error while indexing the file.
+        """
+        if not self.can_index(file_path):
+            print(f"[WARN] No processor found for {file_path}")
+            return
+
+        passages = self.iter_passages(file_path)
+        batch_size = get_settings().index_bulk_size
+        metrics = get_index_metrics()
+        try:
+            generation = None
+            indexed = 0
+            while True:
+                batch = await asyncio.to_thread(lambda: list(islice(passages, batch_size)))
+                if not batch:
+                    break
+                generation = batch[0]["generation"]
+                with metrics.timer("bulk", "sqlite"):
+                    await self._call(True, self._insert, batch)
+                indexed += len(batch)
+
+            await self._call(True, self._delete, "file_path = ? AND generation != ?", [file_path, generation])
+            metrics.record_file(os.path.getsize(file_path), indexed)
+            print(f"[SUCCESS] File {file_path} indexed ({indexed} passages)")
+        except Exception as e:
+            metrics.record_error("index", type(e).__name__)
+            print(f"[ERROR] Error indexing file {file_path}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Error indexing file {file_path}: {str(e)}")
+
+    async def delete_file_index(self, file_path: str):
+        """
+        Deletes the passages of a file.
+
+        Args:
+            file_path (str): The path of the file to delete from the index.
+        """
+        try:
+            deleted = await self._call(True, self._delete, "file_path = ?", [file_path])
+        except sqlite3.Error as e:
+            get_index_metrics().record_error("delete", type(e).__name__)
+            print(f"[ERROR] Error deleting index for file {file_path}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Error deleting index for file {file_path}: {str(e)}")
+        if deleted:
+            print(f"[SUCCESS] Index for file {file_path} deleted")
+        else:
+            print(f"[WARN] No index found for file {file_path}")
+
+    @staticmethod
+    def _move(connection: sqlite3.Connection, old_path: str, new_path: str) -> int:
+        # the file itself (if old_path is a file) gets a new name, folder and
+        # type, the extension may have changed
+        new_name = new_path.rsplit("/", 1)[-1]
+        connection.execute(
+            "UPDATE passages_fts SET file_name = ? WHERE rowid IN (SELECT id FROM passages WHERE file_path = ?)",
+            (new_name, old_path),
+        )
+        moved = connection.execute(
+            "UPDATE passages SET file_path = ?, file_name = ?, folder = ?, file_type = ? WHERE file_path = ?",
+            (new_path, new_name, new_path.rsplit("/", 1)[0], new_path.split('.')[-1].lower(), old_path),
+        ).rowcount
+        # everything below a folder keeps its name, only the prefix changes
+        cut = len(old_path) + 1
+        moved += connection.execute(
+            "UPDATE passages SET file_path = ? || substr(file_path, ?), folder = ? || substr(folder, ?)"
+            " WHERE file_path >= ? AND file_path < ?",
+            (new_path, cut, new_path, cut, old_path + "/", old_path + "0"),
+        ).rowcount
+        return moved
+
+    async def move_path(self, old_path: str, new_path: str) -> Optional[str]:
+        """
+        Re-points every passage at or under `old_path` to `new_path`.
+
+        The update runs in one transaction and is complete when this returns,
+        so there is no task to poll.
+
+        Raises:
+            HTTPException: If the database could not be updated.
+        """
+        try:
+            moved = await self._call(True, self._move, old_path, new_path)
+        except sqlite3.Error as e:
+            print(f"[ERROR] Error moving index {old_path} -> {new_path}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Error moving index for {old_path}: {str(e)}")
+        print(f"[INFO] Moved {moved} passages {old_path} -> {new_path}")
+        return None
+
+    async def delete_path(self, path: str) -> Optional[str]:
+        """
+        Deletes every passage at or under `path`, synchronously.
+
+        Raises:
+            HTTPException: If the database could not be updated.
+        """
+        condition, params = _subtree("file_path", path)
+        try:
+            deleted = await self._call(True, self._delete, condition, params)
+        except sqlite3.Error as e:
+            print(f"[ERROR] Error deleting index under {path}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Error deleting index under {path}: {str(e)}")
+        print(f"[INFO] Deleted {deleted} passages under {path}")
+        return None
+
+    async def get_task(self, task_id: str) -> dict:
+        """
+        The SQLite backend completes moves and deletes synchronously, so there are no tasks.
+        """
+        raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+
+    async def indexed_paths(self) -> set[str]:
+        """
+        Returns the path of every indexed file.
+        """
+        rows = await self._call(
+            False, lambda connection: connection.execute("SELECT DISTINCT file_path FROM passages").fetchall()
+        )
+        return {row[0] for row in rows}
+
+    @staticmethod
+    def _search(connection: sqlite3.Connection, match: str, folder: Optional[str], file_types: Optional[list[str]],
+                size: int, after: Optional[list]) -> dict[str, Any]:
+        where = ["passages_fts MATCH ?"]
+        params: list[Any] = [match]
+        if folder and folder.strip("/"):
+            condition, values = _subtree("p.file_path", SearchManager.to_system_path(folder))
+            where.append(condition)
+            params += values
+        if file_types:
+            types = SearchManager.normalize_types(file_types)
+            where.append(f"p.file_type IN ({', '.join('?' * len(types))})")
+            params += types
+        source = "FROM passages_fts JOIN passages p ON p.id = passages_fts.rowid WHERE " + " AND ".join(where)
+
+        page_where, page_params = "", []
+        if after:
+            page_where = f" AND ({BM25}, p.id) > (?, ?)"
+            page_params = after
+        tags = SearchManager.HIGHLIGHT_TAGS
+        rows = connection.execute(
+            f"SELECT p.*, {BM25} AS bm25_rank, snippet(passages_fts, 0, ?, ?, '…', 24) AS snippet "
+            f"{source}{page_where} ORDER BY bm25_rank, p.id LIMIT ?",
+            [tags[0], tags[1], *params, *page_params, size],
+        ).fetchall()
+
+        total_passages, total_files = connection.execute(
+            f"SELECT count(*), count(DISTINCT p.file_path) {source}", params
+        ).fetchone()
+
+        def facet(column: str) -> list[tuple[str, int, int]]:
+            return [tuple(row) for row in connection.execute(
+                f"SELECT p.{column}, count(*), count(DISTINCT p.file_path) {source} "
+                f"GROUP BY p.{column} ORDER BY 2 DESC LIMIT 20", params
+            ).fetchall()]
+
+        results = []
+        for row in rows:
+            passage = dict(row)
+            passage["locator"] = json.loads(passage["locator"] or "{}")
+            passage["locator_end"] = json.loads(passage["locator_end"]) if passage["locator_end"] else None
+            results.append(SearchManager.make_hit(passage, -row["bm25_rank"], [row["snippet"]]))
+
+        cursor = None
+        if rows and len(rows) == size:
+            cursor = SearchManager.encode_cursor([rows[-1]["bm25_rank"], rows[-1]["id"]])
+
+        return {
+            "total_passages": total_passages,
+            "total_files": total_files,
+            "results": results,
+            "file_types": facet("file_type"),
+            "folders": facet("folder"),
+            "next_cursor": cursor,
+        }
+
+    async def search(self, query: str, folder: Optional[str] = None, file_types: Optional[list[str]] = None,
+                     size: int = 20, cursor: Optional[str] = None) -> dict:
+        """
+        Returns one page of passages ranked by BM25, with snippets and facet counts.
+        """
+        started = time.perf_counter()
+        # checked before it reaches the (rank, id) row-value comparison of `_search`
+        after = SearchManager.decode_cursor(cursor, CURSOR_TYPES) if cursor else None
+        match = to_match_query(query)
+        if match is None:
+            page = {"total_passages": 0, "total_files": 0, "results": [], "file_types": [], "folders": [],
+                    "next_cursor": None}
+        else:
+            page = await self._call(False, self._search, match, folder, file_types, size, after)
+        return SearchManager.make_response(took_ms=int((time.perf_counter() - started) * 1000), **page)
+
+    async def close(self):
+        """
+        Connections are closed after every operation, nothing to release.
+        """
@@ -3,12 +3,19 @@ from fastapi.responses import FileResponse
 import pathlib
 
 from datetime import datetime
+from typing import Annotated
 
-from app.api.utils.elastic import ElasticsearchService
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.db import get_database
 from app.managers.auth import oauth2_schema
+from app.managers.index_queue import IndexQueue
+from app.managers.search import SearchManager
+from app.models.enums import JobAction, JobPriority
 from app.schemas.response.ffiles import SysFile
+from app.schemas.response.indexing import IndexTaskResponse
 from app.managers.archive import ArchiveService
-from fastapi import BackgroundTasks
+from app.api.utils.search_backend import get_search_backend
 from app.api.utils.do_file import syspath, check_name, write, get_mime, format_bytes_size, bucket_path, sanitize_path
 
 from app.schemas.request.ffiles import FileResponseSchema
@@ -17,6 +24,25 @@ archive_service = ArchiveService()  # Configure with your base path
 router = APIRouter(tags=["File"], prefix="/file")
 
 
+async def move_index(old_path: str, new_path: str, db: AsyncSession) -> IndexTaskResponse:
+    """Point the index and any queued jobs at a moved file or folder.
+
+    The filesystem change has already happened, so an unreachable index is
+    reported with an empty task id instead of failing the request. Cached
+    searches are dropped now and again once the index task has finished.
+    """
+    await IndexQueue.move_prefix(old_path, new_path, db)
+    await SearchManager.invalidate(old_path)
+    await SearchManager.invalidate(new_path)
+    try:
+        task_id = await get_search_backend().move_path(old_path, new_path)
+    except HTTPException as e:
+        print(f"[WARN] Index not updated for {old_path}: {e.detail}")
+        return IndexTaskResponse()
+    SearchManager.invalidate_after_task(task_id, old_path, new_path)
+    return IndexTaskResponse(task_id=task_id)
+
+
 
 
 @router.get("{url_path:path}", response_class=FileResponse, summary="download", dependencies=[Depends(oauth2_schema)])
@@ -29,11 +55,11 @@ async def download_file(path: pathlib.Path = Depends(syspath)):
 
 @router.post("{url_path:path}", response_model=SysFile, summary="upload", dependencies=[Depends(oauth2_schema)])
 async def upload_file(
-        background_tasks: BackgroundTasks,
+        db: Annotated[AsyncSession, Depends(get_database)],
         path: pathlib.Path = Depends(syspath),
         file: UploadFile = File(...),
 ):
-    """Upload file, trigger indexing in background"""
+    """Upload file, queue it for indexing"""
 
     if not path.is_dir():
         try:
@@ -55,9 +81,9 @@ async def upload_file(
     # Читаємо вміст файлу
     content = await file.read()
     await write(content, new_file)
-    es = ElasticsearchService()
-    # ✅ Додаємо задачу індексації у фон
-    background_tasks.add_task(es.index_file, str(new_file))
+    # Індексація виконується воркером черги (api-admin worker run)
+    await IndexQueue.enqueue(str(new_file), db, priority=JobPriority.interactive)
+    await SearchManager.invalidate(str(new_file))
 
     return SysFile(
         name=new_file.name,
@@ -67,28 +93,34 @@ async def upload_file(
         size=format_bytes_size(new_file),
     )
 
-@router.put("{url_path:path}", summary="mv", dependencies=[Depends(oauth2_schema)])
-def move_file(path: pathlib.Path = Depends(syspath), new_path: str = Form(...)):
-    """set new path(new name)"""
+@router.put("{url_path:path}", response_model=IndexTaskResponse, summary="mv", dependencies=[Depends(oauth2_schema)])
+async def move_file(
+        db: Annotated[AsyncSession, Depends(get_database)],
+        path: pathlib.Path = Depends(syspath),
+        new_path: str = Form(...),
+):
+    """set new path(new name), the index follows without re-extraction"""
     if not path.is_file():
         raise HTTPException(status_code=404)
+    target = bucket_path / pathlib.Path("." + new_path)
     try:
-        path.rename(bucket_path / pathlib.Path("." + new_path))
+        path.rename(target)
     except FileExistsError:
         raise HTTPException(status_code=412, detail="Name already exists")
     except OSError as e:
         raise HTTPException(status_code=412, detail=f"{e}")
+    return await move_index(str(path), str(target), db)
 
 
 @router.delete("{url_path:path}", summary="rm -f", dependencies=[Depends(oauth2_schema)])
-def remove_file(background_tasks: BackgroundTasks, path: pathlib.Path = Depends(syspath)):
+async def remove_file(db: Annotated[AsyncSession, Depends(get_database)], path: pathlib.Path = Depends(syspath)):
     """remove file"""
     if not path.is_file():
         raise HTTPException(status_code=404)
     try:
-        es = ElasticsearchService()
         pathlib.Path.unlink(path)
-        background_tasks.add_task(es.delete_file_index, str(path))
+        await IndexQueue.enqueue(str(path), db, action=JobAction.delete)
+        await SearchManager.invalidate(str(path))
     except FileNotFoundError:
         raise HTTPException(status_code=404)
     except OSError as e:
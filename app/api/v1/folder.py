@@ -1,13 +1,22 @@
+import asyncio
+
 from fastapi import APIRouter, Depends, Form, HTTPException
 import shutil
 
 
 import pathlib
 from datetime import datetime
-from typing import Union, List
+from typing import Annotated, Union, List
+
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.utils.do_file import syspath, get_mime, format_bytes_size, check_name, bucket_path
+from app.api.utils.search_backend import get_search_backend
+from app.api.v1.file import move_index
+from app.database.db import get_database
+from app.managers.search import SearchManager
 from app.schemas.response.ffiles import SysFile, SysFolder
+from app.schemas.response.indexing import IndexTaskResponse
 
 folder = APIRouter(tags=["Folder"], prefix="/folder")
 
@@ -63,21 +72,27 @@ def create_folder(path: pathlib.Path = Depends(syspath), dirname: str = Form(...
         raise HTTPException(status_code=412, detail=f"{e}")
 
 
-@folder.put("{url_path:path}", summary="mv")
-def move_folder(path: pathlib.Path = Depends(syspath), new_path: str = Form(...)):
-    """set new path(new name)"""
+@folder.put("{url_path:path}", response_model=IndexTaskResponse, summary="mv")
+async def move_folder(
+        db: Annotated[AsyncSession, Depends(get_database)],
+        path: pathlib.Path = Depends(syspath),
+        new_path: str = Form(...),
+):
+    """set new path(new name), the whole subtree is re-pointed in one index update"""
     if not path.is_dir():
         raise HTTPException(status_code=404)
+    target = bucket_path / pathlib.Path("." + new_path)
     try:
-        path.rename(bucket_path / pathlib.Path("." + new_path))
+        path.rename(target)
     except FileExistsError:
         raise HTTPException(status_code=412, detail="Name already exists")
     except OSError as e:
         raise HTTPException(status_code=412, detail=f"{e}")
+    return await move_index(str(path), str(target), db)
 
 
-@folder.delete("{url_path:path}", summary="rm -rf")
-def remove_folder(path: pathlib.Path = Depends(syspath)):
+@folder.delete("{url_path:path}", response_model=IndexTaskResponse, summary="rm -rf")
+async def remove_folder(path: pathlib.Path = Depends(syspath)):
     """remove empty folder and non-empty folder"""
     if path == bucket_path:
         raise HTTPException(status_code=422, detail="Cannot remove root folder")
@@ -90,8 +105,16 @@ def remove_folder(path: pathlib.Path = Depends(syspath)):
         raise HTTPException(status_code=412, detail="The folder is not empty")
     """
     try:
-        shutil.rmtree(path)  # rm -rf
+        await asyncio.to_thread(shutil.rmtree, path)  # rm -rf
     except FileNotFoundError:
         raise HTTPException(status_code=404)
     except OSError as e:
-        raise HTTPException(status_code=412, detail=f"{e}")
\ No newline at end of file
+        raise HTTPException(status_code=412, detail=f"{e}")
+    await SearchManager.invalidate(str(path))
+    try:
+        task_id = await get_search_backend().delete_path(str(path))
+    except HTTPException as e:
+        print(f"[WARN] Index not updated for {path}: {e.detail}")
+        return IndexTaskResponse()
+    SearchManager.invalidate_after_task(task_id, str(path))
+    return IndexTaskResponse(task_id=task_id)
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""Routes to inspect the indexing pipeline."""
+
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.utils.index_metrics import (
+    collect_snapshots,
+    summarize,
+    to_prometheus,
+)
+from app.api.utils.search_backend import get_search_backend
+from app.database.db import get_database
+from app.managers.auth import oauth2_schema
+from app.managers.index_queue import IndexQueue
+from app.schemas.response.indexing import (
+    IndexMetricsResponse,
+    IndexTaskStatusResponse,
+    QueueStatusResponse,
+)
+
+router = APIRouter(tags=["Indexing"], prefix="/index")
+
+
+@router.get(
+    "/queue",
+    dependencies=[Depends(oauth2_schema)],
+    response_model=QueueStatusResponse,
+    summary="Indexing queue depth and lag",
+)
+async def get_queue_status(
+    db: Annotated[AsyncSession, Depends(get_database)],
+) -> dict[str, Any]:
+    """Return the depth of the indexing queue and how far behind it is."""
+    return await IndexQueue.stats(db)
+
+
+@router.get(
+    "/metrics/summary",
+    dependencies=[Depends(oauth2_schema)],
+    response_model=IndexMetricsResponse,
+    summary="Indexing throughput, stage timings and errors",
+)
+async def get_metrics_summary(
+    db: Annotated[AsyncSession, Depends(get_database)],
+) -> dict[str, Any]:
+    """Return the indexing metrics of every worker process and the backlog.
+
+    Workers publish their metrics every `index_metrics_flush_interval`
+    seconds, so the figures may lag by that much.
+    """
+    summary = summarize(collect_snapshots())
+    return {**summary, "queue": await IndexQueue.stats(db)}
+
+
+@router.get(
+    "/metrics",
+    dependencies=[Depends(oauth2_schema)],
+    response_class=PlainTextResponse,
+    summary="Indexing metrics in the Prometheus text format",
+)
+async def get_metrics(
+    db: Annotated[AsyncSession, Depends(get_database)],
+) -> PlainTextResponse:
+    """Return the indexing metrics for a Prometheus scraper."""
+    summary = summarize(collect_snapshots())
+    return PlainTextResponse(
+        to_prometheus(summary, await IndexQueue.stats(db)),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+@router.get(
+    "/tasks/{task_id}",
+    dependencies=[Depends(oauth2_schema)],
+    response_model=IndexTaskStatusResponse,
+    summary="Progress of a background index update",
+)
+async def get_index_task(task_id: str) -> dict[str, Any]:
+    """Return the progress of a move or folder delete in the index."""
+    return await get_search_backend().get_task(task_id)
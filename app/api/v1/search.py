@@ -0,0 +1,142 @@
+"""Routes for full-text search over the indexed files."""
+
+import json
+from collections.abc import AsyncIterator
+from typing import Annotated, Any, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.config.settings import get_settings
+from app.managers.auth import oauth2_schema
+from app.managers.search import SearchManager
+from app.schemas.response.search import GrepResponse, SearchResponse
+
+router = APIRouter(tags=["Search"], prefix="/search")
+
+
+@router.get(
+    "",
+    dependencies=[Depends(oauth2_schema)],
+    response_model=SearchResponse,
+    summary="Full-text search",
+)
+async def search(
+    q: Annotated[str, Query(min_length=1, description="Search query")],
+    folder: Annotated[
+        Optional[str], Query(description="Only search under this folder")
+    ] = None,
+    file_type: Annotated[
+        Optional[list[str]], Query(description="Only these extensions")
+    ] = None,
+    size: Annotated[
+        Optional[int], Query(ge=1, description="Results per page")
+    ] = None,
+    cursor: Annotated[
+        Optional[str], Query(description="`next_cursor` of the previous page")
+    ] = None,
+) -> dict[str, Any]:
+    """Search the content of indexed files.
+
+    Returns the best matching passages with highlighted fragments and where
+    they are in the file, plus counts by file type and folder.
+    """
+    settings = get_settings()
+    size = min(size or settings.search_page_size, settings.search_max_page_size)
+    try:
+        return await SearchManager.search(q, folder, file_type, size, cursor)
+    except HTTPException:
+        raise
+    except Exception as e:  # noqa: BLE001
+        print(f"[ERROR] Search failed: {e}")
+        raise HTTPException(status_code=503, detail="Search is unavailable")
+
+
+@router.get(
+    "/grep",
+    dependencies=[Depends(oauth2_schema)],
+    response_model=GrepResponse,
+    summary="Search files directly, without the index",
+)
+async def grep(
+    request: Request,
+    q: Annotated[str, Query(min_length=1, description="Keyword to find")],
+    folder: Annotated[str, Query(description="Folder to search")] = "/",
+    exact: Annotated[bool, Query(description="Match whole words only")] = False,
+    limit: Annotated[
+        Optional[int], Query(ge=1, description="Stop after this many files")
+    ] = None,
+    timeout: Annotated[
+        Optional[float], Query(gt=0, description="Stop after this many seconds")
+    ] = None,
+    max_hits: Annotated[
+        Optional[int], Query(ge=1, description="Matching lines to return per file")
+    ] = None,
+) -> dict[str, Any]:
+    """Search the files under a folder by reading them, like grep.
+
+    Useful for files that are not indexed yet. Cheap files are searched first
+    and the search stops at `limit` matching files or after `timeout` seconds;
+    it is cancelled if the client disconnects. Each file is read only until
+    `max_hits` lines matched, and PDF hits carry their page numbers.
+    """
+    settings = get_settings()
+    return await SearchManager.grep(
+        SearchManager.grep_root(folder),
+        q,
+        exact,
+        min(limit or settings.grep_limit, settings.grep_limit),
+        min(timeout or settings.grep_timeout, settings.grep_timeout),
+        request.is_disconnected,
+        min(max_hits or settings.grep_max_hits, settings.grep_max_hits),
+    )
+
+
+@router.get(
+    "/grep/stream",
+    dependencies=[Depends(oauth2_schema)],
+    response_class=StreamingResponse,
+    summary="Stream a direct search as Server-Sent Events",
+)
+async def grep_stream(
+    q: Annotated[str, Query(min_length=1, description="Keyword to find")],
+    folder: Annotated[str, Query(description="Folder to search")] = "/",
+    exact: Annotated[bool, Query(description="Match whole words only")] = False,
+    limit: Annotated[
+        Optional[int], Query(ge=1, description="Stop after this many files")
+    ] = None,
+    timeout: Annotated[
+        Optional[float], Query(gt=0, description="Stop after this many seconds")
+    ] = None,
+    max_hits: Annotated[
+        Optional[int], Query(ge=1, description="Matching lines to return per file")
+    ] = None,
+) -> StreamingResponse:
+    """Search the files under a folder, sending each match as soon as it is found.
+
+    The stream is made of `start` (number of files to search), `result` (one
+    matching file, same shape as in `/search/grep`), `progress` (files
+    searched and matched so far) and a final `done` event with the summary.
+    Closing the connection cancels the search.
+    """
+    settings = get_settings()
+    events = SearchManager.stream_grep(
+        SearchManager.grep_root(folder),
+        q,
+        exact,
+        min(limit or settings.grep_limit, settings.grep_limit),
+        min(timeout or settings.grep_timeout, settings.grep_timeout),
+        max_hits=min(max_hits or settings.grep_max_hits, settings.grep_max_hits),
+    )
+
+    async def server_sent_events() -> AsyncIterator[str]:
+        async for event, data in events:
+            payload = json.dumps(data, ensure_ascii=False)
+            yield f"event: {event}\ndata: {payload}\n\n"
+
+    return StreamingResponse(
+        server_sent_events(),
+        media_type="text/event-stream",
+        # keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -5,7 +5,7 @@ from typing import Annotated, Optional, Union
 
 from fastapi import APIRouter, Depends, Request, status, Response, HTTPException, BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.api.utils.elastic import ElasticsearchService
+from app.api.utils.search_backend import get_search_backend
 from app.api.v1.file import archive_service
 from app.database.db import get_database
 from app.managers.auth import can_edit_user, is_admin, oauth2_schema
@@ -207,7 +207,7 @@ async def create_archive(
 async def get_unindexed_files() -> FileResponseSchema:
     """Retrun lis fo unindexed files"""
     try:
-        es_service = ElasticsearchService()
+        es_service = get_search_backend()
         unindexed_files = await es_service.get_unindexed_files()
         return FileResponseSchema(unindexed_files=unindexed_files)
     except Exception as e:
@@ -223,11 +223,11 @@ async def get_unindexed_files() -> FileResponseSchema:
 async def index_all_unindexed_files(background_tasks: BackgroundTasks) -> FileResponseSchema:
     """Запускає індексацію всіх непроіндексованих файлів у фоновому режимі."""
     try:
-        es_service = ElasticsearchService()
+        es_service = get_search_backend()
         # Запускаємо індексацію файлів у фоновому режимі
         background_tasks.add_task(es_service.index_all_unindexed_files)
         # Отримуємо список непроіндексованих файлів
-        es_service = ElasticsearchService()
+        es_service = get_search_backend()
         unindexed_files = await es_service.get_unindexed_files()
         return FileResponseSchema(unindexed_files=unindexed_files)
 
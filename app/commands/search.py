@@ -0,0 +1,74 @@
+"""CLI commands to set up and rebuild the search index."""
+
+from __future__ import annotations
+
+from asyncio import run as aiorun
+
+import typer
+from rich import print as rprint
+
+from app.api.utils.search_backend import get_search_backend, prepare_ocr
+from app.config.settings import get_settings
+from app.file_processors.utils.ocr import stop_ocr_pool
+
+app = typer.Typer(no_args_is_help=True)
+
+
+def _elasticsearch():
+    """Return the Elasticsearch backend, or exit if another one is configured."""
+    if get_settings().search_backend != "elasticsearch":
+        rprint("[red]Index versions are only used by the Elasticsearch backend.")
+        raise typer.Exit(1)
+    return get_search_backend()
+
+
+@app.command()
+def setup() -> None:
+    """Install the index template and create the files index if needed."""
+    backend = get_search_backend()
+
+    async def _setup() -> None:
+        try:
+            await backend.ensure_index()
+        finally:
+            await backend.close()
+
+    aiorun(_setup())
+    rprint("[green]Search index ready.")
+
+
+@app.command()
+def reindex(
+    from_index: bool = typer.Option(
+        False,
+        "--from-index",
+        help="Copy the passages of the live index instead of re-reading the "
+        "files (enough for mapping or analyzer changes).",
+    ),
+    delete_old: bool = typer.Option(
+        False,
+        "--delete-old",
+        help="Delete the previous index once the aliases are swapped.",
+    ),
+) -> None:
+    """Build a new version of the files index and switch searches to it.
+
+    Searches keep using the current index until the new one is complete, and
+    changes made by the indexing worker meanwhile go to both. Unchanged
+    documents are served from the extraction cache.
+    """
+    backend = _elasticsearch()
+
+    async def _reindex() -> str:
+        if not from_index:
+            await prepare_ocr()
+        try:
+            return await backend.reindex(
+                from_index=from_index, delete_old=delete_old
+            )
+        finally:
+            await backend.close()
+            stop_ocr_pool()
+
+    index = aiorun(_reindex())
+    rprint(f"[green]Searches now use {index}.")
@@ -0,0 +1,83 @@
+"""CLI commands to run and manage the indexing queue worker."""
+
+from __future__ import annotations
+
+import asyncio
+import signal
+from asyncio import run as aiorun
+from typing import Optional
+
+import typer
+from rich import print as rprint
+
+from app.database.db import async_session
+from app.managers.index_queue import IndexQueue, IndexWorker
+
+app = typer.Typer(no_args_is_help=True)
+
+
+@app.command()
+def run(
+    concurrency: Optional[int] = typer.Option(
+        None,
+        "--concurrency",
+        "-c",
+        help="Number of jobs to process at once (default from settings).",
+        show_default=False,
+    ),
+    poll_interval: Optional[float] = typer.Option(
+        None,
+        "--poll-interval",
+        help="Seconds to wait when the queue is empty (default from settings).",
+        show_default=False,
+    ),
+) -> None:
+    """Process the durable indexing queue until interrupted.
+
+    Several workers may run at the same time, on one host or many; jobs are
+    claimed with SKIP LOCKED so each is handled by exactly one of them.
+    """
+    worker = IndexWorker(concurrency=concurrency, poll_interval=poll_interval)
+
+    async def _run() -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, worker.stop)
+            except NotImplementedError:  # pragma: no cover - Windows
+                pass
+        await worker.run()
+
+    rprint(
+        f"\n[cyan] -> Indexing worker started with {worker.concurrency} "
+        "slot(s). Press CTRL+C to stop.\n"
+    )
+    aiorun(_run())
+    rprint("[green]Worker stopped.")
+
+
+@app.command()
+def status() -> None:
+    """Show the depth and lag of the indexing queue."""
+
+    async def _stats() -> dict:
+        async with async_session() as session:
+            return await IndexQueue.stats(session)
+
+    stats = aiorun(_stats())
+    for name, count in stats["depth"].items():
+        rprint(f"[green]{name.capitalize():<10}: [/green]{count}")
+    rprint(f"[green]Ready     : [/green]{stats['ready']}")
+    rprint(f"[green]Lag       : [/green]{stats['lag_seconds']:.1f}s")
+
+
+@app.command()
+def requeue() -> None:
+    """Move every dead-lettered job back onto the queue."""
+
+    async def _requeue() -> int:
+        async with async_session() as session, session.begin():
+            return await IndexQueue.requeue_dead(session)
+
+    count = aiorun(_requeue())
+    rprint(f"[green]Requeued {count} job(s).")
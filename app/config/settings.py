@@ -5,6 +5,7 @@ from __future__ import annotations
 import sys
 from functools import lru_cache
 from pathlib import Path  # noqa: TC003
+from typing import Literal, Optional
 
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -90,6 +91,97 @@ class Settings(BaseSettings):
     elastic_host:str = 'http://192.168.0.158:9200'
     elastic_user:str = 'elastic'
     elastic_password:str
+    # Files index template: shard/replica counts and whether the
+    # analysis-ukrainian plugin (Ukrainian stemming) is installed on the cluster
+    elastic_shards: int = 1
+    elastic_replicas: int = 1
+    elastic_ukrainian_plugin: bool = False
+
+    # Durable indexing queue (served by 'api-admin worker run')
+    index_queue_concurrency: int = 4
+    index_queue_max_attempts: int = 5
+    index_queue_retry_base_seconds: float = 10.0
+    index_queue_retry_max_seconds: float = 3600.0
+    index_queue_poll_interval: float = 1.0
+    index_queue_visibility_timeout: int = 900
+
+    # Indexing metrics. Worker processes write snapshots to index_metrics_dir
+    # every index_metrics_flush_interval seconds; the API merges those updated
+    # in the last index_metrics_stale_after seconds, and delete those not
+    # updated for index_metrics_retention seconds. Throughput covers the
+    # last index_metrics_window seconds.
+    index_metrics_dir: Path = project_root / ".cache" / "metrics"
+    index_metrics_flush_interval: float = 10.0
+    index_metrics_stale_after: float = 600.0
+    index_metrics_retention: float = 86400.0
+    index_metrics_window: float = 60.0
+
+    # OCR in the indexing worker: with ocr_workers > 0 images are recognized
+    # by that many processes with their models loaded at startup; otherwise
+    # the worker itself loads them, at startup if ocr_preload is set
+    ocr_workers: int = 0
+    ocr_preload: bool = True
+    # images recognized together (and text boxes per recognizer batch), and
+    # how long a batch waits for images from other indexing jobs
+    ocr_batch_size: int = 8
+    ocr_batch_wait: float = 0.05
+    # OCR languages (EasyOCR codes), and overrides per folder as seen by the
+    # API, e.g. {"/scans/en": ["en"]}; subfolders inherit them. With
+    # ocr_detect_languages a quick pass over a few text boxes picks the
+    # Cyrillic or Latin languages of each image before recognizing the rest
+    ocr_languages: list[str] = ["ru", "rs_cyrillic", "be", "bg", "uk", "mn", "en"]
+    ocr_folder_languages: dict[str, list[str]] = {}
+    ocr_detect_languages: bool = True
+    # OCR results keyed by a perceptual hash of the image, so re-saved,
+    # re-compressed or resized copies of a scan are not recognized again;
+    # hashes up to ocr_cache_max_distance bits apart (of 256) count as a match;
+    # the oldest entries beyond ocr_cache_max_entries are dropped
+    ocr_cache_enabled: bool = True
+    ocr_cache_path: Path = project_root / ".cache" / "ocr.sqlite3"
+    ocr_cache_max_distance: int = 10
+    ocr_cache_max_entries: int = 50_000
+
+    # PDFs longer than pdf_chunk_pages are extracted by pdf_workers processes
+    # (0 extracts them in the calling process), pdf_chunk_pages at a time
+    pdf_workers: int = 0
+    pdf_chunk_pages: int = 32
+
+    # Columnar copies of spreadsheets for repeated cell searches, rebuilt
+    # when the file's mtime or size changes
+    sheet_cache_enabled: bool = True
+    sheet_cache_dir: Path = project_root / ".cache" / "sheets"
+
+    # On-disk cache of extracted text, keyed by content hash
+    extraction_cache_enabled: bool = True
+    extraction_cache_dir: Path = project_root / ".cache" / "extraction"
+    extraction_cache_max_bytes: int = 2 * 1024**3
+
+    # Passage indexing: documents are split into overlapping passages
+    passage_size: int = 2000
+    passage_overlap: int = 200
+    index_bulk_size: int = 200
+    index_bulk_max_bytes: int = 10 * 1024**2
+
+    # Search API. The backend holding the passages is either an Elasticsearch
+    # cluster or an embedded SQLite FTS5 database at sqlite_search_path
+    search_backend: Literal["elasticsearch", "sqlite"] = "elasticsearch"
+    sqlite_search_path: Path = project_root / ".cache" / "search.db"
+    search_page_size: int = 20
+    search_max_page_size: int = 100
+    # install the index template / create the index when the API starts
+    search_setup_on_startup: bool = True
+
+    # Search result cache, shared through Redis (redis_* above) if enabled
+    search_cache_enabled: bool = True
+    search_cache_size: int = 1000
+    search_cache_ttl: int = 60
+    search_cache_redis: bool = False
+
+    # Direct filesystem search ('grep mode'), None workers means one per CPU
+    grep_workers: Optional[int] = None
+    grep_limit: int = 100
+    grep_timeout: float = 30.0
+    grep_max_hits: int = 20
 
     # gatekeeper settings!
     # this is to ensure that people read the damn instructions and changelogs
@@ -1,6 +1,8 @@
 import zipfile
 import os
 import tempfile
+from functools import partial
+from typing import Iterator
 
 import py7zr
 
@@ -20,7 +22,23 @@ class ArchiveProcessor(FileProcessor):
         :param exact_match: Whether to search for an exact match (default is partial).
         """
         self.file_path = file_path
-        self.processors = processors
+        # OCR languages chosen per folder follow the archive, not the temporary
+        # folder its files are extracted to
+        bound = {}
+        self.processors = {}
+        for ext, processor_class in processors.items():
+            if id(processor_class) not in bound:
+                bound[id(processor_class)] = self._bind_languages(processor_class)
+            self.processors[ext] = bound[id(processor_class)]
+
+    def _bind_languages(self, processor_class):
+        """
+        Resolve the OCR languages of a processor factory for the archive's path.
+        """
+        languages = getattr(processor_class, "keywords", {}).get("languages")
+        if callable(languages):
+            return partial(processor_class, languages=tuple(languages(self.file_path)))
+        return processor_class
 
     def search(self, keyword: str, exact_match: bool = False) -> list[str]:
         """
@@ -78,4 +96,45 @@ class ArchiveProcessor(FileProcessor):
                     if processor_class:
                         processor = processor_class(os.path.join(root, file))
                         content.append(processor.read())
-            return "\n".join(content)  # Об'єднуємо всі файли в єдиний текстовий блок
\ No newline at end of file
+            return "\n".join(content)  # Об'єднуємо всі файли в єдиний текстовий блок
+
+    def iter_segments(self) -> Iterator[tuple[dict, str]]:
+        """
+        Yield the segments of every supported file inside the archive.
+        Locators carry the entry path inside the archive plus the inner
+        processor's own locator, e.g. {"entry": "docs/a.pdf", "page": 2}.
+        :return: Iterator of (locator, text) pairs.
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            if self.file_path.endswith('.zip'):
+                with zipfile.ZipFile(self.file_path, 'r') as archive:
+                    archive.extractall(temp_dir)
+            elif self.file_path.endswith('.7z'):
+                with py7zr.SevenZipFile(self.file_path, mode='r') as archive:
+                    archive.extractall(temp_dir)
+            else:
+                raise ValueError("Unsupported archive format")
+
+            entries = []
+            for root, _, files in os.walk(temp_dir):
+                for file in sorted(files):
+                    processor_class = self.processors.get(file.split('.')[-1].lower())
+                    if processor_class:
+                        entries.append((os.path.join(root, file), processor_class))
+
+            # processors that can read many files at once (OCR) get all of theirs in one call
+            batched = {}
+            for processor_class in {processor_class for _, processor_class in entries}:
+                # factories registered with functools.partial keep their options
+                target = getattr(processor_class, "func", processor_class)
+                if hasattr(target, "read_many"):
+                    paths = [path for path, entry_class in entries if entry_class is processor_class]
+                    batched.update(target.read_many(paths, **getattr(processor_class, "keywords", {})))
+
+            for path, processor_class in entries:
+                entry = os.path.relpath(path, temp_dir).replace(os.sep, '/')
+                if path in batched:
+                    yield {"entry": entry}, batched[path]
+                    continue
+                for locator, text in processor_class(path).iter_segments():
+                    yield {"entry": entry, **locator}, text
@@ -1,13 +1,19 @@
 import re
 from abc import ABC, abstractmethod
+from typing import Iterable, Iterator
 
 
 class FileProcessor(ABC):
     """
     Abstract base class for file processors.
     Each processor must implement the `search` method.
+
+    `version` identifies the extraction logic. Bump it whenever `read` starts
+    producing different text, so cached extractions are not reused.
     """
 
+    version: str = "1"
+
     @abstractmethod
     def search(self, keyword: str, exact_match: bool) -> list[str]:
         """
@@ -26,6 +32,22 @@ class FileProcessor(ABC):
         """
         pass
 
+    def iter_segments(self) -> Iterator[tuple[dict, str]]:
+        """
+        Yield the content of the file as (locator, text) pairs in document order.
+        Processors that know where text comes from override this and yield
+        locators such as {"page": 3} or {"sheet": "Q1"}; the default yields the
+        whole `read()` result with an empty locator.
+        Failures are yielded with {"error": True} in the locator and the message
+        as text, so callers can tell them from extracted content.
+        :return: Iterator of (locator, text) pairs.
+        """
+        text = self.read()
+        if isinstance(text, str) and text.startswith("Error"):
+            yield {"error": True}, text
+        else:
+            yield {}, text
+
 class TextSearcher:
     """
     Utility class for searching keywords in extracted text.
@@ -48,14 +70,37 @@ class TextSearcher:
         text = ' '.join(text.split())  # Заміна кількох пробілів одним
         keyword = keyword.strip()  # Видаляємо зайві пробіли з ключового слова
 
-        print('TextSearcher:', text)
-
         if exact_match:
             # Використовуємо регулярний вираз для пошуку точного збігу слова
             # \b - межа слова, re.IGNORECASE - не враховує регістр
             pattern = fr'\b{re.escape(keyword)}\b'
             return [line for line in text.splitlines() if re.search(pattern, line, re.IGNORECASE)]
         else:
-            print([line for line in text.splitlines() if keyword.lower() in line.lower()])
             # Частковий збіг: перевіряємо, чи входить слово як підрядок
-            return [line for line in text.splitlines() if keyword.lower() in line.lower()]
\ No newline at end of file
+            return [line for line in text.splitlines() if keyword.lower() in line.lower()]
+
+    @staticmethod
+    def iter_matches(lines: Iterable[str], keyword: str, exact_match: bool) -> Iterator[str]:
+        """
+        Lazily yield the lines containing a keyword, so callers can stop at the first hits.
+        Matching follows `search_text`: whole words for an exact match,
+        a case-insensitive substring otherwise. Whitespace runs in the
+        yielded lines are collapsed.
+        :param lines: Lines to search, e.g. `text.splitlines()`.
+        :param keyword: Keyword to search for.
+        :param exact_match: Whether to search for an exact match.
+        :return: Iterator of matching lines.
+        """
+        keyword = keyword.strip()
+        if exact_match:
+            pattern = re.compile(fr'\b{re.escape(keyword)}\b', re.IGNORECASE)
+            matches = pattern.search
+        else:
+            keyword = keyword.lower()
+
+            def matches(line: str) -> bool:
+                return keyword in line.lower()
+
+        for line in lines:
+            if matches(line):
+                yield ' '.join(line.split())
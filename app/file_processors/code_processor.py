@@ -1,35 +1,35 @@
 from app.file_processors.base_processor import FileProcessor
+from app.file_processors.utils.text_stream import iter_matching_lines, read_text
 import os
 
 
 class CodeProcessor(FileProcessor):
     """
     Processor for code files (e.g., .py, .js, .java, etc.).
+    Files are read in their detected encoding, see `utils.text_stream`.
     """
 
+    version = "2"
+
     def __init__(self, file_path: str):
         self.file_path = file_path
 
     def search(self, keyword: str, exact_match: bool) -> list[str]:
         """
         Search for a keyword in code files.
+        The file is memory-mapped and scanned as bytes; only matching lines are decoded.
         :param keyword: The keyword to search for in the code file.
+        :param exact_match: Whether to match whole words only.
         :return: A list of lines containing the keyword.
         """
-        results = []
         if not os.path.exists(self.file_path):  # Check if the file exists
             return [f"Error: File not found at {self.file_path}"]
 
         try:
-            with open(self.file_path, 'r', encoding='utf-8') as file:
-                for line in file:
-                    if keyword in line:
-                        results.append(line.strip())
+            return list(iter_matching_lines(self.file_path, keyword, exact_match))
         except Exception as e:
             return [f"Error reading file: {str(e)}"]
 
-        return results
-
     def read(self) -> str:
         """
         Read the entire content of the code file and return it as a string.
@@ -39,8 +39,6 @@ class CodeProcessor(FileProcessor):
             return f"Error: File not found at {self.file_path}"
 
         try:
-            with open(self.file_path, 'r', encoding='utf-8') as file:
-                content = file.read()  # Read the entire file content
-            return content.strip()  # Return the content as a string
+            return read_text(self.file_path).strip()  # Return the content as a string
         except Exception as e:
             return f"Error reading file: {str(e)}"
@@ -1,44 +1,91 @@
-import openpyxl
-from .base_processor import FileProcessor
+from typing import Iterator, Optional, Union
+
+from .base_processor import FileProcessor, TextSearcher
+from .utils.sheet_cache import SheetCache, build_sheets, find_cells
+from .utils.spreadsheet import Row, cell_text, iter_rows
+
 
 class ExcelProcessor(FileProcessor):
     """
-    Processor for Excel files to perform text searches.
+    Processor for spreadsheets (.xlsx, .xlsm, .xls, .csv and .ods) to perform text searches.
+    Rows are streamed (see `utils.spreadsheet`), so memory does not grow with the sheet.
     """
-    def __init__(self, file_path: str):
+
+    version = "2"
+
+    def __init__(self, file_path: str, sheet_cache: Optional[SheetCache] = None):
         """
         Initialize the Excel processor with the file path.
-        :param file_path: Path to the Excel file.
+        :param file_path: Path to the spreadsheet file.
+        :param sheet_cache: Optional columnar cache used by `search` and `find`,
+                            so repeated queries do not parse the file again.
         """
         self.file_path = file_path
+        self.sheet_cache = sheet_cache
+
+    def iter_rows(self) -> Iterator[Row]:
+        """
+        Stream the non-empty rows of every sheet.
+        :return: Iterator of (sheet name, 1-based row number, cell values).
+        """
+        return iter_rows(self.file_path)
 
-    def search(self, keyword: str) -> list[str]:
+    def search(self, keyword: str, exact_match: bool = False) -> list[str]:
         """
-        Search for a keyword in the Excel file text.
+        Search for a keyword in the cells of the spreadsheet.
         :param keyword: The keyword to search for.
-        :return: A list of lines containing the keyword.
+        :param exact_match: Whether to match whole words only.
+        :return: A list of the cell values containing the keyword.
         """
-        workbook = openpyxl.load_workbook(self.file_path)
-        results = []
-        for sheet in workbook.worksheets:
-            for row in sheet.iter_rows():
-                for cell in row:
-                    if keyword in str(cell.value):
-                        results.append(str(cell.value))
-        return results
+        if self.sheet_cache is not None:
+            cells = (text for *_, text in self.sheet_cache.find(
+                self.file_path, matches=lambda text: any(TextSearcher.iter_matches([text], keyword, exact_match))))
+        else:
+            cells = (cell_text(value) for _, _, values in self.iter_rows() for value in values)
+        return list(TextSearcher.iter_matches(cells, keyword, exact_match))
 
-    def read(self) -> str:
+    def find(self, equals: Optional[str] = None, contains: Optional[str] = None, between: Optional[tuple] = None,
+             column: Union[int, str, None] = None) -> list[dict]:
         """
-        Reads the entire content of the Excel file as a string.
-        :return: A string representing the content of the Excel file.
+        Find the cells matching structured conditions, e.g. the amounts between
+        100 and 500 in the "Total" column. Runs as vectorized scans over the
+        columnar form of the file (see `utils.sheet_cache`).
+        :param equals: Cell text equal to this (ignoring case).
+        :param contains: Cell text containing this (ignoring case).
+        :param between: (low, high) numeric range, inclusive; either bound may be None.
+        :param column: Only search this column, by 0-based index or by its first-row text.
+        :return: Matching cells as {"sheet", "row", "column", "value"} dicts, in row order.
         """
-        workbook = openpyxl.load_workbook(self.file_path)
-        results = ""
+        if self.sheet_cache is not None:
+            sheets = self.sheet_cache.sheets(self.file_path)
+        else:
+            sheets = build_sheets(self.file_path)
+        return [
+            {"sheet": sheet, "row": row, "column": position, "value": text}
+            for sheet, row, position, text in find_cells(sheets, equals=equals, contains=contains,
+                                                          between=between, column=column)
+        ]
 
-        for sheet in workbook.worksheets:
-            results += f"Sheet: {sheet.title}\n"
-            for row in sheet.iter_rows():
-                row_values = [str(cell.value) if cell.value is not None else "" for cell in row]
-                results += "\t".join(row_values) + "\n"
+    def read(self) -> str:
+        """
+        Reads the entire content of the spreadsheet as a string.
+        :return: A string representing the content of the spreadsheet.
+        """
+        parts = []
+        current = None
+        for sheet, _, values in self.iter_rows():
+            if sheet is not None and sheet != current:
+                parts.append(f"Sheet: {sheet}\n")
+                current = sheet
+            parts.append("\t".join(cell_text(value) for value in values) + "\n")
+        return "".join(parts)
 
-        return results
+    def iter_segments(self) -> Iterator[tuple[dict, str]]:
+        """
+        Yield each row of each sheet with the sheet name and 1-based row number.
+        :return: Iterator of ({"sheet": title, "row": n}, text) pairs; CSV rows
+                 have no sheet.
+        """
+        for sheet, number, values in self.iter_rows():
+            locator = {"row": number} if sheet is None else {"sheet": sheet, "row": number}
+            yield locator, "\t".join(cell_text(value) for value in values)
@@ -1,10 +1,13 @@
-import easyocr
+from typing import Callable, Iterable, Optional, Union
+
 import numpy as np
-from PIL import Image
 from app.file_processors.base_processor import FileProcessor, TextSearcher
-import sys
-import os
-import contextlib
+from app.file_processors.utils.image_prep import MIN_EDGE_DENSITY, downscale, edge_density, load_image, tile
+from app.file_processors.utils.ocr import DEFAULT_LANGUAGES, get_reader, recognize, recognize_batch
+from app.file_processors.utils.ocr_cache import OCRCache, dhash
+
+# EasyOCR language codes, or a function returning them for a file path (see `utils.ocr.FolderLanguages`)
+Languages = Union[Iterable[str], Callable[[str], Iterable[str]]]
 
 
 class ImageProcessor(FileProcessor):
@@ -12,47 +15,144 @@ class ImageProcessor(FileProcessor):
     Processor for image files, performing text extraction using EasyOCR.
     """
 
-    def __init__(self, file_path: str):
+    version = "3"
+
+    def __init__(self, file_path: str, languages: Optional[Languages] = None,
+                 ocr_cache: Optional[OCRCache] = None):
         """
-        Initialize the image processor with the file path and configuration for exact match.
+        Initialize the image processor with the file path and the OCR languages.
+        The EasyOCR reader is shared by every image of the process (see
+        `utils.ocr`), so creating a processor is cheap. Unless disabled, OCR
+        narrows the languages down to the script found on each image.
         :param file_path: Path to the image file.
-        :param exact_match: Whether to search for an exact match (default is partial).
+        :param languages: EasyOCR language codes, or a function returning them for
+                          the file path (default: Cyrillic alphabets and English).
+        :param ocr_cache: Optional cache of OCR results, reused for near-identical images.
         """
         self.file_path = file_path
+        self.ocr_cache = ocr_cache
+        if callable(languages):
+            languages = languages(file_path)
+        self.languages = tuple(languages or DEFAULT_LANGUAGES)
 
-        # Suppress the EasyOCR GPU warning message by redirecting stderr
-        with open(os.devnull, 'w') as devnull:
-            with contextlib.redirect_stderr(devnull):
-                # Initialize EasyOCR Reader for the required languages (Cyrillic and Latin-based)
-                self.reader = easyocr.Reader(
-                    ["ru", "rs_cyrillic", "be", "bg", "uk", "mn", "en"], gpu=False  # Disable GPU explicitly
-                )
+    @property
+    def reader(self):
+        """
+        The shared EasyOCR reader for this processor's languages.
+        """
+        return get_reader(self.languages)
 
     def preprocess_image(self, image_path: str) -> np.ndarray:
         """
         Preprocess the image before performing OCR to enhance text recognition accuracy.
+        The image is turned upright from its EXIF orientation, converted to
+        grayscale and scaled down to the resolution OCR needs (see `utils.image_prep`).
         :param image_path: Path to the image file.
         :return: Preprocessed image in numpy array format.
         """
-        image = Image.open(image_path)
-        image = image.convert("L")  # Convert to grayscale
-        return np.array(image)
+        image, dpi = load_image(image_path)
+        return np.array(downscale(image, dpi))
 
-        # Perform further preprocessing steps if necessary (e.g., resizing, etc.)
-        # Example: image_np = cv2.resize(image_np, (new_width, new_height))
+    def prepare_tiles(self, image: np.ndarray) -> list[np.ndarray]:
+        """
+        Cut a preprocessed image into the tiles to recognize.
+        :param image: Image returned by `preprocess_image`.
+        :return: Tiles in reading order, none if the image shows no sign of text.
+        """
+        if edge_density(image) < MIN_EDGE_DENSITY:
+            return []
+        return tile(image)
+
+    def cached_text(self, image: np.ndarray) -> tuple[Optional[str], Optional[tuple[int, str]]]:
+        """
+        Look a preprocessed image up in the OCR cache.
+        :param image: Image returned by `preprocess_image`.
+        :return: The text of a near-identical image (None on a miss), and the
+                 key to store this image's text under (None without a cache).
+        """
+        if self.ocr_cache is None:
+            return None, None
+        key = (dhash(image), self.ocr_cache.namespace(image, self.version, self.languages))
+        return self.ocr_cache.get(*key), key
+
+    def recognize_images(self, images: list[np.ndarray]) -> list[str]:
+        """
+        Recognize several preprocessed images with one batched OCR call.
+        Textless images (see `prepare_tiles`) are skipped without running OCR,
+        and near-identical copies of an image already recognized get its text
+        from the OCR cache.
+        :param images: Images returned by `preprocess_image` (or prepared the same way).
+        :return: Extracted text of each image.
+        """
+        texts = [""] * len(images)
+        tiles, owners, keys = [], [], {}
+        for number, image in enumerate(images):
+            image_tiles = self.prepare_tiles(image)
+            if not image_tiles:
+                continue
+            text, keys[number] = self.cached_text(image)
+            if text is not None:
+                texts[number] = text
+                continue
+            tiles.extend(image_tiles)
+            owners.extend([number] * len(image_tiles))
+
+        if len(tiles) == 1:
+            results = [recognize(tiles[0], self.languages)]
+        else:
+            results = recognize_batch(tiles, self.languages)
+        lines = {number: [] for number in owners}
+        for number, tile_lines in zip(owners, results):
+            lines[number].extend(tile_lines)
+        for number, image_lines in lines.items():
+            texts[number] = "\n".join(image_lines)
+            if keys[number] is not None:
+                self.ocr_cache.put(*keys[number], texts[number])
+        return texts
 
     def extract_text(self) -> str:
         """
-        Extract text from the image using EasyOCR.
+        Extract text from the image using EasyOCR (see `recognize_images`).
         :return: Extracted text as a string.
         """
         try:
-            image_np = self.preprocess_image(self.file_path)
-            results = self.reader.readtext(image_np)
-            return "\n".join([result[1] for result in results if result[1]])
+            return self.recognize_images([self.preprocess_image(self.file_path)])[0]
         except Exception as e:
             print(f"Error processing image: {e}")
             return ""
+
+    @classmethod
+    def read_many(cls, file_paths: list[str], languages: Optional[Languages] = None,
+                  ocr_cache: Optional[OCRCache] = None) -> dict[str, str]:
+        """
+        Extract the text of several images with one batched OCR call per language set.
+        Images that cannot be opened get an empty text, like in `extract_text`.
+        :param file_paths: Paths to the image files.
+        :param languages: EasyOCR language codes, or a function returning them for
+                          a file path (default: Cyrillic alphabets and English).
+        :param ocr_cache: Optional cache of OCR results, reused for near-identical images.
+        :return: Extracted text per file path.
+        """
+        by_languages = {}
+        for file_path in file_paths:
+            processor = cls(file_path, languages, ocr_cache)
+            by_languages.setdefault(processor.languages, []).append(processor)
+
+        texts = {file_path: "" for file_path in file_paths}
+        for processors in by_languages.values():
+            images, owners = [], []
+            for processor in processors:
+                try:
+                    images.append(processor.preprocess_image(processor.file_path))
+                    owners.append(processor.file_path)
+                except Exception as e:
+                    print(f"Error processing image: {e}")
+            try:
+                texts.update(zip(owners, processors[0].recognize_images(images)))
+            except Exception as e:
+                print(f"Error processing image: {e}")
+        return texts
+
     def search(self, keyword: str, exact_match: bool = False) -> list[str]:
         """
         Search for a keyword in text extracted from the image using EasyOCR.
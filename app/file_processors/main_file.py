@@ -1,4 +1,15 @@
+import hashlib
+import json
+import multiprocessing
+import pickle
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from itertools import islice
 from pprint import pprint
+from typing import Iterator, Optional
 
 from app.file_processors.audio_processor import AudioProcessor
 from app.file_processors.code_processor import CodeProcessor
@@ -11,19 +22,91 @@ from app.file_processors.utils.logger import logger
 from app.file_processors.word_processor import WordProcessor
 from app.file_processors.excel_processor import ExcelProcessor
 from app.file_processors.archive_processor import ArchiveProcessor
+from app.file_processors.utils.extraction_cache import ExtractionCache, file_digest
+from app.api.utils.index_metrics import get_index_metrics
 # from utils.logger import logger
 #
 
 
 import os
 
+# Rough relative cost of searching one byte of each file type, so that
+# `search_in_folder` gets through cheap files before OCR and speech recognition.
+SEARCH_COST = {
+    "txt": 1, "py": 1,
+    "csv": 1,
+    "docx": 2, "doc": 2, "pptx": 2, "xlsx": 3, "xls": 3, "ods": 3,
+    "pdf": 4, "zip": 5, "7z": 8,
+    "jpg": 50, "jpeg": 50, "png": 50,
+    "mp3": 100,
+}
+DEFAULT_SEARCH_COST = 5
+
+# SearchContext of a `search_in_folder` worker process, set by `_init_worker`
+_worker_context = None
+
+# Process pool of `search_in_folder`, shared by every search of this process:
+# the process owning it, its size and the processor registry it was started with
+_search_executor: Optional[ProcessPoolExecutor] = None
+_search_executor_key: Optional[tuple] = None
+_search_executor_lock = threading.Lock()
+
+
+def _init_worker(processors: dict):
+    """
+    Build the SearchContext of a worker process once, instead of per file.
+    """
+    global _worker_context
+    _worker_context = SearchContext()
+    _worker_context.processors = processors
+
+
+def _search_in_worker(file_path: str, keyword: str, exact_match: bool, max_hits: Optional[int] = None) -> dict:
+    return _worker_context.search_in_file(file_path, keyword, exact_match, max_hits)
+
+
+def _get_search_executor(workers: int, processors: dict) -> ProcessPoolExecutor:
+    """
+    Return the folder search pool of this process, starting it on first use.
+    Processes are spawned rather than forked, like the OCR and PDF pools: the
+    API process runs threads and an event loop and may have loaded torch.
+    The pool lives across searches so its workers keep their OCR readers warm;
+    it is only restarted when the size or the processor registry changes.
+    """
+    global _search_executor, _search_executor_key
+    key = (os.getpid(), workers, hashlib.sha256(pickle.dumps(processors)).hexdigest())
+    with _search_executor_lock:
+        if _search_executor is None or _search_executor_key != key:
+            if _search_executor is not None and _search_executor_key[0] == os.getpid():
+                _search_executor.shutdown(wait=False, cancel_futures=True)
+            _search_executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                                                   initializer=_init_worker, initargs=(processors,))
+            _search_executor_key = key
+        return _search_executor
+
+
+def stop_search_pool():
+    """
+    Stop the folder search pool of this process, if it started one.
+    """
+    global _search_executor, _search_executor_key
+    with _search_executor_lock:
+        if _search_executor is not None and _search_executor_key[0] == os.getpid():
+            _search_executor.shutdown(wait=True, cancel_futures=True)
+        _search_executor = _search_executor_key = None
+
+
 class SearchContext:
     """
     Context for managing file search operations and registered processors.
     """
 
-    def __init__(self):
+    def __init__(self, cache: Optional[ExtractionCache] = None):
+        """
+        :param cache: Optional extraction cache consulted by `read_file`.
+        """
         self.processors = {}
+        self.cache = cache
 
     def register_processor(self, file_extension: str, processor_class):
         """
@@ -33,6 +116,51 @@ class SearchContext:
         """
         self.processors[file_extension] = processor_class
 
+    @staticmethod
+    def processor_version(processor_class) -> str:
+        """
+        Return the extraction version of a registered processor.
+        Factories built with `functools.partial` report the wrapped class's version;
+        container processors (archives) also include the versions of the processors
+        they delegate to, so their cache entries expire when any of those change.
+        :param processor_class: Processor class or factory.
+        """
+        if not isinstance(processor_class, partial):
+            return str(getattr(processor_class, "version", "0"))
+
+        version = str(getattr(processor_class.func, "version", "0"))
+        nested = processor_class.keywords.get("processors")
+        if nested:
+            parts = []
+            for ext, inner in sorted(nested.items()):
+                if isinstance(inner, partial) and inner.keywords.get("processors") is nested:
+                    inner = inner.func  # another container sharing this registry
+                parts.append(f"{ext}={SearchContext.processor_version(inner)}")
+            version += "+" + ",".join(parts)
+        return version
+
+    def cache_version(self, ext: str, file_path: str) -> str:
+        """
+        Return the version under which the extraction of a file is cached: the
+        processor version (see `processor_version`), plus the OCR languages the
+        file is read with when its processor, or one an archive delegates to,
+        does OCR. Those depend on the file's folder and on the settings.
+        :param ext: Extension of the file.
+        :param file_path: Path to the file.
+        """
+        processor_class = self.processors[ext]
+        version = self.processor_version(processor_class)
+        nested = getattr(processor_class, "keywords", {}).get("processors") or {}
+        language_sets = set()
+        for candidate in [processor_class, *nested.values()]:
+            languages = getattr(candidate, "keywords", {}).get("languages")
+            if languages is not None:
+                languages = languages(file_path) if callable(languages) else languages
+                language_sets.add(",".join(sorted(languages)))
+        if language_sets:
+            version += ":ocr=" + ";".join(sorted(language_sets))
+        return version
+
     def read_file(self, file_path: str) -> dict:
         """
         Read the content of a file using the appropriate processor.
@@ -44,9 +172,19 @@ class SearchContext:
             return {"status": "error", "message": f"No processor found for {ext} files"}
 
         try:
+            key = None
+            if self.cache is not None:
+                key = self.cache.make_key(file_digest(file_path), ext, self.cache_version(ext, file_path))
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return cached
 
             processor = self.processors[ext](file_path)
-            return  processor.read()  # Виклик read() у процесора
+            content = processor.read()  # Виклик read() у процесора
+            # processors report failures as "Error ..." strings, never cache those
+            if key is not None and isinstance(content, str) and not content.startswith("Error"):
+                self.cache.put(key, content)
+            return content
         except Exception as e:
             print(e)
             return {
@@ -57,12 +195,60 @@ class SearchContext:
                 "status": "error"
             }
 
-    def search_in_file(self, file_path: str, keyword: str, exact_match: bool) -> dict:
+    def iter_segments(self, file_path: str) -> Iterator[tuple[dict, str]]:
+        """
+        Yield the content of a file as (locator, text) pairs using the appropriate processor.
+        Segments are cached like `read_file` results, so re-indexing an unchanged
+        file replays them without running the processor. Segments the processor
+        marks with {"error": True} are dropped, and a file with any of them is not cached.
+        :param file_path: Path to the file.
+        :return: Iterator of (locator, text) pairs.
+        :raises ValueError: If no processor is registered for the file type.
+        """
+        ext = file_path.split('.')[-1].lower()
+        if ext not in self.processors:
+            raise ValueError(f"No processor found for {ext} files")
+
+        metrics = get_index_metrics()
+        key = None
+        if self.cache is not None:
+            with metrics.timer("cache_lookup", ext):
+                version = self.cache_version(ext, file_path)
+                key = self.cache.make_key(file_digest(file_path), f"{ext}:segments", version)
+                cached = self.cache.get(key)
+            if cached is not None:
+                for locator, text in json.loads(cached):
+                    yield locator, text
+                return
+
+        segments = []
+        failed = False
+        processor = self.processors[ext](file_path)
+        for locator, text in metrics.timed(processor.iter_segments(), "extract", ext):
+            # failed segments are neither indexed nor cached, so the file is
+            # extracted again next time
+            if locator.get("error"):
+                failed = True
+                print(f"{file_path}: {text}")
+                continue
+            if key is not None:
+                segments.append((locator, text))
+            yield locator, text
+        if failed:
+            metrics.record_error("extract", f"{ext}_processor")
+        elif key is not None:
+            self.cache.put(key, json.dumps(segments, ensure_ascii=False))
+
+    def search_in_file(self, file_path: str, keyword: str, exact_match: bool,
+                       max_hits: Optional[int] = None) -> dict:
         """
         Search for a keyword in a specified file and return detailed info.
+        Processors that find hits lazily (`iter_hits`, e.g. PDFs) stop reading
+        the file once `max_hits` lines matched, and report the page of each.
         :param file_path: Path to the file.
         :param keyword: The keyword to search for.
         :param exact_match: Whether to search for an exact match.
+        :param max_hits: Return at most this many matching lines.
         :return: Dictionary with file info and matches (if any).
         """
         ext = file_path.split('.')[-1].lower()
@@ -75,14 +261,23 @@ class SearchContext:
             return {"status": "error", "message": str(e)}
 
         try:
-            matches = processor.search(keyword, exact_match)
-            return {
+            pages = None
+            if hasattr(processor, "iter_hits"):
+                hits = list(islice(processor.iter_hits(keyword, exact_match), max_hits))
+                pages = [page for page, _ in hits]
+                matches = [line for _, line in hits]
+            else:
+                matches = processor.search(keyword, exact_match)[:max_hits]
+            result = {
                 "file_path": file_path,
                 "file_name": os.path.basename(file_path),
                 "file_type": ext,
                 "matches": matches,
                 "status": "success" if matches else "no matches"
             }
+            if pages is not None:
+                result["pages"] = pages
+            return result
         except Exception as e:
             return {
                 "file_path": file_path,
@@ -92,28 +287,118 @@ class SearchContext:
                 "status": "error"
             }
 
-    def search_in_folder(self, folder_path: str, keyword: str, recursive: bool = True) -> list:
+    def search_candidates(self, folder_path: str, recursive: bool) -> list[str]:
+        """
+        List the supported files in a folder, cheapest to search first.
+        :param folder_path: Path to the folder.
+        :param recursive: Whether to include subfolders.
+        :return: File paths ordered by estimated search cost.
+        """
+        candidates = []
+        folders = [folder_path]
+        while folders:
+            with os.scandir(folders.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            folders.append(entry.path)
+                        continue
+                    ext = entry.name.split('.')[-1].lower()
+                    if ext not in self.processors or not entry.is_file():
+                        continue
+                    try:
+                        size = entry.stat().st_size
+                    except OSError:
+                        continue
+                    candidates.append((SEARCH_COST.get(ext, DEFAULT_SEARCH_COST) * size, entry.path))
+        candidates.sort()
+        return [file_path for _, file_path in candidates]
+
+    def search_in_folder(self, folder_path: str, keyword: str, recursive: bool = True, exact_match: bool = False,
+                         limit: Optional[int] = None, timeout: Optional[float] = None,
+                         workers: Optional[int] = None,
+                         cancel: Optional[threading.Event] = None,
+                         files: Optional[list[str]] = None,
+                         max_hits: Optional[int] = None) -> Iterator[dict]:
         """
-        Search for a keyword in all supported files within a folder and return detailed results.
+        Search for a keyword in all supported files within a folder, streaming results as they complete.
+        Files are searched cheapest first by the process pool shared by all searches
+        (see `_get_search_executor`). The search stops once `limit` files matched,
+        `timeout` seconds passed or `cancel` is set; closing the generator early stops
+        it too, and the result of any file still being searched is dropped.
         :param folder_path: Path to the folder.
         :param keyword: The keyword to search for.
         :param recursive: Whether to search in subfolders recursively.
-        :return: List of dictionaries with file paths, names, types, matches, or errors.
+        :param exact_match: Whether to search for an exact match.
+        :param limit: Stop after this many files with matches.
+        :param timeout: Stop after this many seconds.
+        :param workers: Number of worker processes, defaults to the CPU count;
+                        1 searches in this process.
+        :param cancel: Event that stops the search when set, e.g. on client disconnect.
+        :param files: Result of `search_candidates` if the caller already listed the folder.
+        :param max_hits: Stop reading a file after this many matching lines.
+        :return: Iterator of dictionaries with file paths, names, types, matches, or errors.
         """
-        results = []
-        for root, _, files in os.walk(folder_path):
-            for file_name in files:
-                file_path = os.path.join(root, file_name)
-                ext = file_name.split('.')[-1]
-                if ext in self.processors:
-                    file_result = self.search_in_file(file_path, keyword, exact_match=False)
-                    results.append(file_result)
-                    yield file_result
-            if not recursive:
-                break
-        return results
+        if files is None:
+            files = self.search_candidates(folder_path, recursive)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        found = 0
 
+        def stopped() -> bool:
+            return ((limit is not None and found >= limit)
+                    or (deadline is not None and time.monotonic() >= deadline)
+                    or (cancel is not None and cancel.is_set()))
 
+        workers = min(workers or os.cpu_count() or 1, len(files))
+        if workers <= 1:
+            for file_path in files:
+                if stopped():
+                    return
+                result = self.search_in_file(file_path, keyword, exact_match, max_hits)
+                found += bool(result.get("matches"))
+                yield result
+            return
+
+        completed = queue.SimpleQueue()
+        pending = iter(files)
+        in_flight: set[Future] = set()
+        executor = _get_search_executor(workers, self.processors)
+
+        def done(future: Future, file_path: str) -> None:
+            if future.cancelled():
+                return
+            try:
+                completed.put((future, future.result()))
+            except Exception as e:
+                completed.put((future, {"file_path": file_path, "status": "error", "message": str(e)}))
+
+        def submit() -> None:
+            file_path = next(pending, None)
+            if file_path is None:
+                return
+            future = executor.submit(_search_in_worker, file_path, keyword, exact_match, max_hits)
+            in_flight.add(future)
+            future.add_done_callback(partial(done, file_path=file_path))
+
+        try:
+            # keep the pool busy, but hand out files in cost order as workers free up
+            for _ in range(workers * 2):
+                submit()
+            while in_flight and not stopped():
+                wait = 0.1 if deadline is None else max(0.0, min(0.1, deadline - time.monotonic()))
+                try:
+                    future, result = completed.get(timeout=wait)
+                except queue.Empty:
+                    continue
+                in_flight.discard(future)
+                submit()
+                found += bool(result.get("matches"))
+                yield result
+        finally:
+            # the pool is shared: drop the files not started yet, and let a
+            # worker still busy with a file we no longer need finish it
+            for future in in_flight:
+                future.cancel()
 
 if __name__ == "__main__":
     context = SearchContext()
@@ -124,6 +409,9 @@ if __name__ == "__main__":
     context.register_processor("py", CodeProcessor)
     context.register_processor("pdf", PDFProcessor)
     context.register_processor("xlsx", ExcelProcessor)
+    context.register_processor("xls", ExcelProcessor)
+    context.register_processor("csv", ExcelProcessor)
+    context.register_processor("ods", ExcelProcessor)
     context.register_processor("pptx", PresentationProcessor)
 
     context.register_processor("txt", TextProcessor)
@@ -134,8 +422,8 @@ if __name__ == "__main__":
     context.register_processor("png", ImageProcessor)
     context.register_processor("jpeg", ImageProcessor)
 
-    context.register_processor("zip", lambda path: ArchiveProcessor(path, context.processors))
-    context.register_processor("7z", lambda path: ArchiveProcessor(path, context.processors))
+    context.register_processor("zip", partial(ArchiveProcessor, processors=context.processors))
+    context.register_processor("7z", partial(ArchiveProcessor, processors=context.processors))
 
     # Example usage
     file_path = "files\\1 (1).7z"
@@ -1,6 +1,81 @@
+import io
+import multiprocessing
+import os
+import threading
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional
+
+import numpy as np
 import PyPDF2
+from PIL import Image
+
+from app.file_processors.base_processor import FileProcessor, TextSearcher
+from app.file_processors.image_processor import ImageProcessor, Languages
+from app.file_processors.utils.image_prep import downscale, load_image
+from app.file_processors.utils.ocr_cache import OCRCache
+
+# Pages extracted per task of the page pool
+CHUNK_PAGES = 32
+
+# Process pool shared by every PDF of this process, and the process owning it
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(workers: int) -> ProcessPoolExecutor:
+    """
+    Return the page pool of this process, starting it on first use.
+    Processes are spawned rather than forked, like the OCR pool: the indexing
+    worker may already have loaded torch.
+    """
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def stop_page_pool():
+    """
+    Stop the page pool of this process, if it started one.
+    """
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is not None and _executor_pid == os.getpid():
+            _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = _executor_pid = None
+
+
+def _iter_read_pages(reader: PyPDF2.PdfReader, start: int, stop: int,
+                     with_images: bool) -> Iterator[tuple[int, str, list[bytes]]]:
+    """
+    Extract the text of pages `start` to `stop` (0-based, exclusive), one page at a time.
+    :return: Iterator of (1-based page number, text, images) per page; the
+             embedded images are only returned for pages without a text layer.
+    """
+    for number in range(start, stop):
+        page = reader.pages[number]
+        text = page.extract_text() or ""
+        images = []
+        if with_images and not text.strip():
+            try:
+                images = [image.data for image in page.images]
+            except Exception as e:
+                print(f"Error reading images of page {number + 1}: {e}")
+        yield number + 1, text, images
+
+
+def _read_range(file_path: str, start: int, stop: int, with_images: bool) -> list[tuple[int, str, list[bytes]]]:
+    """
+    Open the PDF and extract a range of its pages; runs in the page pool.
+    """
+    with open(file_path, 'rb') as file:
+        return list(_iter_read_pages(PyPDF2.PdfReader(file), start, stop, with_images))
 
-from app.file_processors.base_processor import FileProcessor
 
 class PDFProcessor(FileProcessor):
     """
@@ -8,44 +83,145 @@ class PDFProcessor(FileProcessor):
     This class provides functionality to search for keywords and read the entire text from a PDF file.
     """
 
-    def __init__(self, file_path: str):
+    version = "2"
+
+    def __init__(self, file_path: str, languages: Optional[Languages] = None,
+                 ocr_cache: Optional[OCRCache] = None, workers: int = 0, chunk_pages: int = CHUNK_PAGES):
         """
         Initialize the PDF processor with the file path.
         :param file_path: Path to the PDF file.
+        :param languages: OCR languages for scanned pages (see `ImageProcessor`).
+        :param ocr_cache: Optional cache of OCR results for scanned pages.
+        :param workers: Processes extracting the pages of large PDFs in parallel;
+                        0 or 1 extracts them in this process.
+        :param chunk_pages: Pages per task sent to those processes.
         """
         self.file_path = file_path
+        self.languages = languages
+        self.ocr_cache = ocr_cache
+        self.workers = workers
+        self.chunk_pages = max(1, chunk_pages)
 
-    def search(self, keyword: str, exact_match: bool = True) -> list[str]:
+    def iter_pages(self, ocr: bool = True) -> Iterator[tuple[int, str]]:
+        """
+        Yield the text of every page with text, in page order, as it is extracted.
+        With `workers` set, page ranges of PDFs longer than one chunk are
+        extracted by the page pool, at most two chunks per process ahead of
+        the consumer; otherwise pages are read lazily, so a consumer that
+        stops early never reads the rest. Pages without a text layer are read
+        with OCR from their embedded images, a chunk at a time.
+        :param ocr: Whether to OCR pages without a text layer.
+        :return: Iterator of (1-based page number, text) pairs.
+        """
+        with open(self.file_path, 'rb') as file:
+            reader = PyPDF2.PdfReader(file)
+            count = len(reader.pages)
+            # processes of a folder search pool are daemons and cannot start a pool of their own
+            if self.workers <= 1 or count <= self.chunk_pages or multiprocessing.current_process().daemon:
+                # text pages are yielded as soon as they are read, scanned ones
+                # (and the pages after them) wait until a chunk is ready for OCR
+                buffered = []
+                for page in _iter_read_pages(reader, 0, count, ocr):
+                    buffered.append(page)
+                    if len(buffered) >= self.chunk_pages or not any(images for _, _, images in buffered):
+                        yield from self._finish(buffered)
+                        buffered = []
+                yield from self._finish(buffered)
+                return
+
+        starts = iter(range(0, count, self.chunk_pages))
+        executor = _get_executor(self.workers)
+        pending = deque()
+
+        def submit():
+            start = next(starts, None)
+            if start is not None:
+                stop = min(start + self.chunk_pages, count)
+                pending.append(executor.submit(_read_range, self.file_path, start, stop, ocr))
+
+        try:
+            for _ in range(self.workers * 2):
+                submit()
+            while pending:
+                pages = pending.popleft().result()
+                submit()
+                yield from self._finish(pages)
+        finally:
+            # the consumer may stop early, e.g. a search that found enough hits
+            for future in pending:
+                future.cancel()
+
+    def _finish(self, pages: list[tuple[int, str, list[bytes]]]) -> Iterator[tuple[int, str]]:
+        """
+        OCR the scanned pages of a chunk together, then yield the chunk's pages with text.
+        """
+        scanned = [(number, images) for number, text, images in pages if images]
+        ocr_texts = self.recognize_pages(scanned) if scanned else {}
+        for number, text, _ in pages:
+            text = ocr_texts.get(number) or text
+            if text.strip():
+                yield number, text
+
+    def recognize_pages(self, pages: list[tuple[int, list[bytes]]]) -> dict[int, str]:
+        """
+        Recognize the embedded images of scanned pages with one batched OCR call.
+        :param pages: (page number, encoded images) pairs.
+        :return: Recognized text per page number.
+        """
+        images, owners = [], []
+        for number, page_images in pages:
+            for data in page_images:
+                try:
+                    image, dpi = load_image(io.BytesIO(data))
+                    images.append(np.array(downscale(image, dpi)))
+                    owners.append(number)
+                except (OSError, Image.DecompressionBombError) as e:
+                    print(f"Error decoding an image of page {number}: {e}")
+        texts: dict[int, list[str]] = {}
+        try:
+            recognizer = ImageProcessor(self.file_path, self.languages, self.ocr_cache)
+            for number, text in zip(owners, recognizer.recognize_images(images)):
+                if text:
+                    texts.setdefault(number, []).append(text)
+        except Exception as e:
+            print(f"Error processing image: {e}")
+        return {number: "\n".join(page_texts) for number, page_texts in texts.items()}
+
+    def iter_hits(self, keyword: str, exact_match: bool = False, ocr: bool = False) -> Iterator[tuple[int, str]]:
+        """
+        Lazily yield the lines containing a keyword with their page numbers.
+        Pages are only extracted as the consumer asks for more hits, so taking
+        the first few hits of a large PDF reads just the pages before them.
+        :param keyword: The keyword to search for.
+        :param exact_match: Whether to match whole words only (see `TextSearcher`).
+        :param ocr: Whether to OCR pages without a text layer.
+        :return: Iterator of (1-based page number, line) pairs.
+        """
+        for number, text in self.iter_pages(ocr=ocr):
+            for line in TextSearcher.iter_matches(text.splitlines(), keyword, exact_match):
+                yield number, line
+
+    def search(self, keyword: str, exact_match: bool = False, max_hits: Optional[int] = None) -> list[str]:
         """
         Search for a keyword in the PDF file and return a list of lines containing the keyword.
         :param keyword: The keyword to search for in the PDF file.
-        :param exact_match: _
+        :param exact_match: Whether to match whole words only.
+        :param max_hits: Stop after this many lines (default: all of them).
         :return: A list of lines containing the keyword.
         """
-        results = []
-        with open(self.file_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            # Iterate through each page of the PDF
-            for page in reader.pages:
-                text = page.extract_text()  # Extract text from the page
-                if text:  # Check if the page contains text
-                    # Split text into lines and check if the keyword exists in each line
-                    results.extend([line for line in text.splitlines() if keyword in line])
-        return results
+        return [line for _, line in islice(self.iter_hits(keyword, exact_match), max_hits)]
 
     def read(self) -> str:
         """
         Read the entire content of the PDF file and return it as a single string.
         :return: The text content of the entire PDF file.
         """
-        full_text = ""
-        with open(self.file_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            # Iterate through each page of the PDF and extract the text
-            for page in reader.pages:
-                text = page.extract_text()
-                if text:  # Only append if text is found on the page
-                    full_text += text + "\n"  # Append extracted text, separated by newlines
-        return full_text
-
+        return "".join(text + "\n" for _, text in self.iter_pages())
 
+    def iter_segments(self) -> Iterator[tuple[dict, str]]:
+        """
+        Yield the text of each page with its 1-based page number.
+        :return: Iterator of ({"page": n}, text) pairs.
+        """
+        for number, text in self.iter_pages():
+            yield {"page": number}, text
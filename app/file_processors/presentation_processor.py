@@ -1,5 +1,27 @@
+from typing import Iterator
+
 from pptx import Presentation
-from app.file_processors.base_processor import FileProcessor
+from pptx.shapes.group import GroupShape
+from app.file_processors.base_processor import FileProcessor, TextSearcher
+
+
+def _shape_lines(shapes) -> Iterator[str]:
+    """
+    Yield the text lines of shapes in slide order: one per text frame
+    paragraph and one per table row (cells separated by tabs), looking inside
+    grouped shapes.
+    """
+    for shape in shapes:
+        if isinstance(shape, GroupShape):
+            yield from _shape_lines(shape.shapes)
+        elif shape.has_text_frame:
+            for paragraph in shape.text_frame.paragraphs:
+                yield paragraph.text
+        elif shape.has_table:
+            for row in shape.table.rows:
+                cells = [" ".join(paragraph.text for paragraph in cell.text_frame.paragraphs).strip()
+                         for cell in row.cells]
+                yield "\t".join(cells)
 
 
 class PresentationProcessor(FileProcessor):
@@ -8,45 +30,71 @@ class PresentationProcessor(FileProcessor):
     Supports both `.pptx` files for text extraction and search functionality.
     """
 
+    version = "2"
+
     def __init__(self, file_path: str):
         """
         Initialize the PowerPoint processor with the file path.
         :param file_path: Path to the PowerPoint presentation file.
         """
         self.file_path = file_path
+        self._presentation = None
+
+    @property
+    def presentation(self):
+        """
+        The parsed presentation, shared by `read`, `search` and `iter_segments`.
+        """
+        if self._presentation is None:
+            self._presentation = Presentation(self.file_path)
+        return self._presentation
 
-    def search(self, keyword: str, exact_match: bool) -> list[str]:
+    def iter_lines(self) -> Iterator[tuple[int, bool, str]]:
+        """
+        Yield the text of every slide, shape by shape: text frames, table
+        rows and grouped shapes first, then the speaker notes.
+        :return: Iterator of (1-based slide number, is a notes line, text) triples.
+        """
+        for number, slide in enumerate(self.presentation.slides, start=1):
+            for line in _shape_lines(slide.shapes):
+                yield number, False, line
+            if slide.has_notes_slide and slide.notes_slide.notes_text_frame is not None:
+                for paragraph in slide.notes_slide.notes_text_frame.paragraphs:
+                    yield number, True, paragraph.text
+
+    def search(self, keyword: str, exact_match: bool = False) -> list[str]:
         """
         Search for a keyword in a PowerPoint presentation.
         :param keyword: The keyword to search for within the presentation.
-        :return: A list of paragraphs containing the keyword.
+        :param exact_match: Whether to match whole words only.
+        :return: A list of paragraphs (or table rows) containing the keyword.
         """
-        results = []
-        presentation = Presentation(self.file_path)
-
-        # Iterate through each slide in the presentation
-        for slide in presentation.slides:
-            for shape in slide.shapes:
-                # If the shape has a text frame, check its paragraphs
-                if shape.has_text_frame:
-                    for paragraph in shape.text_frame.paragraphs:
-                        if keyword in paragraph.text:
-                            results.append(paragraph.text)  # Add paragraph text if keyword is found
-        return results
+        return list(TextSearcher.iter_matches((line for _, _, line in self.iter_lines()), keyword, exact_match))
 
     def read(self) -> str:
         """
         Read the entire content of the PowerPoint presentation and return it as a single string.
         :return: The text content of the entire PowerPoint presentation.
         """
-        full_text = ""
-        presentation = Presentation(self.file_path)
-
-        # Iterate through each slide and each shape in the slide
-        for slide in presentation.slides:
-            for shape in slide.shapes:
-                # If the shape has a text frame, extract its paragraphs
-                if shape.has_text_frame:
-                    for paragraph in shape.text_frame.paragraphs:
-                        full_text += paragraph.text + "\n"  # Append paragraph text to the full_text
-        return full_text.strip()  # Return the content as a single string
+        return "\n".join(line for _, _, line in self.iter_lines()).strip()
+
+    def iter_segments(self) -> Iterator[tuple[dict, str]]:
+        """
+        Yield the text of each slide, and then of its speaker notes, with the 1-based slide number.
+        :return: Iterator of ({"slide": n}, text) and ({"slide": n, "notes": True}, text) pairs.
+        """
+        current, lines = None, []
+
+        def flush():
+            text = "\n".join(lines).strip()
+            if text:
+                number, notes = current
+                yield ({"slide": number, "notes": True} if notes else {"slide": number}), text
+
+        for number, notes, line in self.iter_lines():
+            if (number, notes) != current:
+                yield from flush()
+                current, lines = (number, notes), []
+            lines.append(line)
+        if current is not None:
+            yield from flush()
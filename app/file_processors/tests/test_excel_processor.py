@@ -0,0 +1,150 @@
+"""Test the streaming spreadsheet readers and the columnar cache used by ExcelProcessor."""
+
+import os
+import time
+import zipfile
+
+import openpyxl
+import pytest
+
+from app.file_processors.excel_processor import ExcelProcessor
+from app.file_processors.main_file import SearchContext
+from app.file_processors.utils import sheet_cache
+from app.file_processors.utils.sheet_cache import SheetCache
+from app.file_processors.utils.spreadsheet import iter_rows
+
+ODS_CONTENT = """<?xml version="1.0" encoding="UTF-8"?>
+<office:document-content
+    xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+    xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+    xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0">
+  <office:body><office:spreadsheet>
+    <table:table table:name="Звіт">
+      <table:table-row>
+        <table:table-cell><text:p>Name</text:p></table:table-cell>
+        <table:table-cell table:number-columns-repeated="2"/>
+        <table:table-cell><text:p>Total</text:p></table:table-cell>
+        <table:table-cell table:number-columns-repeated="16000"/>
+      </table:table-row>
+      <table:table-row table:number-rows-repeated="3"><table:table-cell/></table:table-row>
+      <table:table-row>
+        <table:table-cell><text:p>Коваль</text:p></table:table-cell>
+        <table:table-cell><text:p>12.5</text:p></table:table-cell>
+      </table:table-row>
+      <table:table-row table:number-rows-repeated="1048570"><table:table-cell/></table:table-row>
+    </table:table>
+  </office:spreadsheet></office:body>
+</office:document-content>
+"""
+
+
+def write_xlsx(path):
+    workbook = openpyxl.Workbook()
+    first = workbook.active
+    first.title = "Q1"
+    first.append(["invoice", 120, None])
+    first.append([])
+    first.append(["refund", None, "late invoice"])
+    second = workbook.create_sheet("Q2")
+    second["B2"] = "Київ"
+    workbook.save(path)
+    return str(path)
+
+
+class TestSpreadsheetRows:
+
+    def test_xlsx_rows_keep_sheet_and_row_numbers(self, tmp_path):
+        path = write_xlsx(tmp_path / "a.xlsx")
+        assert list(iter_rows(path)) == [
+            ("Q1", 1, ["invoice", 120]),
+            ("Q1", 3, ["refund", None, "late invoice"]),
+            ("Q2", 2, [None, "Київ"]),
+        ]
+
+    def test_csv_delimiter_is_detected(self, tmp_path):
+        path = tmp_path / "a.csv"
+        path.write_text("name;total\nКоваль;12,5\n\nШевченко;3\n", encoding="utf-8-sig")
+        assert list(iter_rows(str(path))) == [
+            (None, 1, ["name", "total"]),
+            (None, 2, ["Коваль", "12,5"]),
+            (None, 4, ["Шевченко", "3"]),
+        ]
+
+    def test_csv_encoding_is_detected(self, tmp_path):
+        for encoding in ("cp1251", "utf-16"):
+            path = tmp_path / f"{encoding}.csv"
+            path.write_text("Прізвище;Місто\nКоваль;Київ\n", encoding=encoding)
+            assert list(iter_rows(str(path))) == [
+                (None, 1, ["Прізвище", "Місто"]),
+                (None, 2, ["Коваль", "Київ"]),
+            ]
+            assert ExcelProcessor(str(path)).search("київ") == ["Київ"]
+
+    def test_ods_repeats_are_expanded_but_bounded(self, tmp_path):
+        path = tmp_path / "a.ods"
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("mimetype", "application/vnd.oasis.opendocument.spreadsheet")
+            archive.writestr("content.xml", ODS_CONTENT)
+        assert list(iter_rows(str(path))) == [
+            ("Звіт", 1, ["Name", "", "", "Total"]),
+            ("Звіт", 5, ["Коваль", "12.5"]),
+        ]
+
+    def test_unknown_format(self, tmp_path):
+        with pytest.raises(ValueError):
+            iter_rows(str(tmp_path / "a.numbers"))
+
+
+class TestExcelProcessor:
+
+    def test_read_and_segments(self, tmp_path):
+        processor = ExcelProcessor(write_xlsx(tmp_path / "a.xlsx"))
+        assert processor.read() == "Sheet: Q1\ninvoice\t120\nrefund\t\tlate invoice\nSheet: Q2\n\tКиїв\n"
+        assert list(processor.iter_segments())[1] == ({"sheet": "Q1", "row": 3}, "refund\t\tlate invoice")
+
+    def test_search_from_the_search_context(self, tmp_path):
+        path = write_xlsx(tmp_path / "a.xlsx")
+        context = SearchContext()
+        context.register_processor("xlsx", ExcelProcessor)
+
+        assert context.search_in_file(path, "INVOICE", False)["matches"] == ["invoice", "late invoice"]
+        assert context.search_in_file(path, "voice", True)["status"] == "no matches"
+
+
+class TestSheetCache:
+
+    def write_ledger(self, path, rows):
+        workbook = openpyxl.Workbook()
+        workbook.active.append(["Client", "Total"])
+        for row in rows:
+            workbook.active.append(row)
+        workbook.save(path)
+        return str(path)
+
+    def test_structured_queries(self, tmp_path):
+        path = self.write_ledger(tmp_path / "a.xlsx", [["Коваль", 120], ["Шевчук", "95,5"], ["Коваленко", 600]])
+        processor = ExcelProcessor(path, SheetCache(tmp_path / "cache"))
+
+        assert [cell["row"] for cell in processor.find(contains="КОВАЛ")] == [2, 4]
+        assert [cell["value"] for cell in processor.find(equals="коваль")] == ["Коваль"]
+        assert processor.find(between=(90, 200), column="total") == [
+            {"sheet": "Sheet", "row": 2, "column": 1, "value": "120"},
+            {"sheet": "Sheet", "row": 3, "column": 1, "value": "95,5"},
+        ]
+        assert processor.find(between=(90, 200), column=0) == []
+
+    def test_cache_is_reused_until_the_file_changes(self, tmp_path, monkeypatch):
+        path = self.write_ledger(tmp_path / "a.xlsx", [["Коваль", 120]])
+        built = []
+        build = sheet_cache.build_sheets
+        monkeypatch.setattr(sheet_cache, "build_sheets", lambda file_path: built.append(file_path) or build(file_path))
+
+        assert ExcelProcessor(path, SheetCache(tmp_path / "cache")).search("коваль") == ["Коваль"]
+        # a new cache object (another process) loads the stored arrays
+        assert ExcelProcessor(path, SheetCache(tmp_path / "cache")).search("коваль", True) == ["Коваль"]
+        assert len(built) == 1
+
+        self.write_ledger(path, [["Шевчук", 1]])
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+        assert ExcelProcessor(path, SheetCache(tmp_path / "cache")).search("коваль") == []
+        assert len(built) == 2
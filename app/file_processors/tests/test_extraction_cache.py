@@ -0,0 +1,169 @@
+"""Test the on-disk extraction cache and its use by SearchContext."""
+
+import os
+import time
+from functools import partial
+
+from app.file_processors.archive_processor import ArchiveProcessor
+from app.file_processors.base_processor import FileProcessor
+from app.file_processors.main_file import SearchContext
+from app.file_processors.utils.extraction_cache import ExtractionCache, file_digest
+
+
+class CountingProcessor(FileProcessor):
+    """Processor returning the file content and counting its reads."""
+
+    reads = 0
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    def search(self, keyword: str, exact_match: bool) -> list[str]:
+        return []
+
+    def read(self) -> str:
+        CountingProcessor.reads += 1
+        with open(self.file_path, encoding='utf-8') as file:
+            return file.read()
+
+
+class TestExtractionCache:
+    """Test the ExtractionCache class."""
+
+    def test_round_trip(self, tmp_path) -> None:
+        """Ensure stored text comes back unchanged."""
+        cache = ExtractionCache(tmp_path, max_bytes=1024 * 1024)
+        key = cache.make_key("abc", "txt", "1")
+
+        assert cache.get(key) is None
+        cache.put(key, "Привіт, світ")
+        assert cache.get(key) == "Привіт, світ"
+
+    def test_key_depends_on_version(self) -> None:
+        """Ensure a processor version bump invalidates entries."""
+        assert ExtractionCache.make_key("abc", "pdf", "1") != ExtractionCache.make_key("abc", "pdf", "2")
+
+    def test_entries_are_compressed(self, tmp_path) -> None:
+        """Ensure repetitive text takes far less space on disk."""
+        cache = ExtractionCache(tmp_path, max_bytes=1024 * 1024)
+        cache.put("ab" * 32, "lorem ipsum " * 10_000)
+
+        assert cache.size() < 10_000
+
+    def test_evicts_least_recently_used(self, tmp_path) -> None:
+        """Ensure the oldest untouched entry is evicted first."""
+        payload = os.urandom(3000).hex()  # barely compressible
+        cache = ExtractionCache(tmp_path, max_bytes=1024 * 1024)
+        keys = [f"{i:02d}" * 32 for i in range(3)]
+        cache.put(keys[0], payload)
+        # room for three entries, so a fourth forces an eviction
+        cache.max_bytes = int(cache.size() * 3.5)
+        for key in keys[1:]:
+            time.sleep(0.01)
+            cache.put(key, payload)
+
+        # touch the oldest entry so the second one becomes least recently used
+        time.sleep(0.01)
+        assert cache.get(keys[0]) is not None
+        cache.put("99" * 32, payload)
+
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) is not None
+        assert cache.size() <= cache.max_bytes
+
+    def test_corrupt_entry_is_a_miss(self, tmp_path) -> None:
+        """Ensure a damaged entry is dropped instead of raising."""
+        cache = ExtractionCache(tmp_path, max_bytes=1024 * 1024)
+        key = "cd" * 32
+        cache.put(key, "text")
+        cache._path(key).write_bytes(b"not zstd")
+
+        assert cache.get(key) is None
+        assert not cache._path(key).exists()
+
+
+class TestSearchContextCache:
+    """Test that SearchContext.read_file consults the cache."""
+
+    def test_second_read_is_served_from_cache(self, tmp_path) -> None:
+        """Ensure an unchanged file is extracted only once."""
+        source = tmp_path / "doc.txt"
+        source.write_text("cached content", encoding='utf-8')
+        context = SearchContext(cache=ExtractionCache(tmp_path / "cache", max_bytes=1024 * 1024))
+        context.register_processor("txt", CountingProcessor)
+        CountingProcessor.reads = 0
+
+        assert context.read_file(str(source)) == "cached content"
+        assert context.read_file(str(source)) == "cached content"
+        assert CountingProcessor.reads == 1
+
+    def test_duplicate_content_shares_entry(self, tmp_path) -> None:
+        """Ensure a copy of a file under another name reuses the extraction."""
+        first = tmp_path / "a.txt"
+        second = tmp_path / "b.txt"
+        first.write_text("same bytes", encoding='utf-8')
+        second.write_text("same bytes", encoding='utf-8')
+        context = SearchContext(cache=ExtractionCache(tmp_path / "cache", max_bytes=1024 * 1024))
+        context.register_processor("txt", CountingProcessor)
+        CountingProcessor.reads = 0
+
+        context.read_file(str(first))
+        context.read_file(str(second))
+
+        assert file_digest(first) == file_digest(second)
+        assert CountingProcessor.reads == 1
+
+    def test_archive_version_tracks_inner_processors(self) -> None:
+        """Ensure archives are re-extracted when a nested processor changes."""
+        context = SearchContext()
+        context.register_processor("txt", CountingProcessor)
+        context.register_processor("zip", partial(ArchiveProcessor, processors=context.processors))
+        before = context.processor_version(context.processors["zip"])
+
+        CountingProcessor.version = "2"
+        try:
+            after = context.processor_version(context.processors["zip"])
+        finally:
+            del CountingProcessor.version
+
+        assert before != after
+
+    def test_ocr_languages_are_part_of_the_cache_version(self, tmp_path) -> None:
+        """Ensure files read with other OCR languages do not share an entry."""
+        from app.file_processors.image_processor import ImageProcessor
+        from app.file_processors.utils.ocr import FolderLanguages
+
+        languages = FolderLanguages({str(tmp_path / "en"): ["en"]}, default=["uk", "en"])
+        context = SearchContext()
+        context.register_processor("png", partial(ImageProcessor, languages=languages))
+        context.register_processor("txt", CountingProcessor)
+        context.register_processor("zip", partial(ArchiveProcessor, processors=context.processors))
+
+        english = context.cache_version("png", str(tmp_path / "en" / "a.png"))
+        default = context.cache_version("png", str(tmp_path / "a.png"))
+        assert english != default
+        assert english.endswith(":ocr=en")
+        assert context.cache_version("zip", str(tmp_path / "en" / "a.zip")).endswith(":ocr=en")
+        assert context.cache_version("txt", str(tmp_path / "a.txt")) == context.processor_version(CountingProcessor)
+
+        archive = ArchiveProcessor(str(tmp_path / "en" / "a.zip"), context.processors)
+        assert archive.processors["png"].keywords["languages"] == ("en",)
+
+    def test_segments_are_not_cached_after_an_error(self, tmp_path) -> None:
+        """Ensure a file failing after some segments is neither indexed with the error nor cached."""
+
+        class FailingProcessor(CountingProcessor):
+            def iter_segments(self):
+                CountingProcessor.reads += 1
+                yield {"paragraph": 1}, "first"
+                yield {"error": True}, "Error processing file: truncated"
+
+        source = tmp_path / "doc.txt"
+        source.write_text("content", encoding='utf-8')
+        context = SearchContext(cache=ExtractionCache(tmp_path / "cache", max_bytes=1024 * 1024))
+        context.register_processor("txt", FailingProcessor)
+        CountingProcessor.reads = 0
+
+        assert list(context.iter_segments(str(source))) == [({"paragraph": 1}, "first")]
+        assert list(context.iter_segments(str(source))) == [({"paragraph": 1}, "first")]
+        assert CountingProcessor.reads == 2
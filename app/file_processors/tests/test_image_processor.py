@@ -0,0 +1,270 @@
+"""Test the shared OCR readers used by ImageProcessor."""
+
+import sys
+import threading
+import types
+import zipfile
+from functools import partial
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.file_processors.archive_processor import ArchiveProcessor
+from app.file_processors.image_processor import ImageProcessor
+from app.file_processors.utils import image_prep, ocr
+from app.file_processors.utils.ocr_cache import BKTree, OCRCache, dhash, hamming
+
+
+class FakeReader:
+    """Stand-in for easyocr.Reader that records how often it is built and what it reads."""
+
+    created = []
+    batches = []
+    recognized = []
+    # text found in every box, by default the image's top-left pixel value
+    text = None
+
+    def __init__(self, languages, gpu=True, detector=True, verbose=True):
+        self.languages = tuple(languages)
+        self.detector = detector
+        FakeReader.created.append(self.languages)
+
+    def detect(self, images, reformat=True):
+        FakeReader.batches.append(len(images))
+        return [["box"] for _ in images], [[] for _ in images]
+
+    def recognize(self, grey, horizontal_list, free_list, batch_size=1, detail=1, reformat=True):
+        FakeReader.recognized.append((self.languages, len(horizontal_list)))
+        return [FakeReader.text or f"{grey[0, 0]:.0f}", ""]
+
+
+def reformat_input(image):
+    return image[None], image
+
+
+def reformat_input_batched(images):
+    return np.stack(images), list(images)
+
+
+def save_image(path, marker=0, size=(40, 30)):
+    """Save a striped (so not textless) image whose top-left pixel is `marker`."""
+    pixels = np.zeros((size[1], size[0]), dtype=np.uint8)
+    pixels[:, ::4] = 255
+    pixels[0, 0] = marker
+    Image.fromarray(pixels).save(path)
+
+
+@pytest.fixture
+def fake_easyocr(monkeypatch):
+    """Replace easyocr with FakeReader and start from an empty reader cache."""
+    FakeReader.created = []
+    FakeReader.batches = []
+    FakeReader.recognized = []
+    FakeReader.text = None
+    utils = types.SimpleNamespace(reformat_input=reformat_input, reformat_input_batched=reformat_input_batched)
+    monkeypatch.setitem(sys.modules, "easyocr", types.SimpleNamespace(Reader=FakeReader, utils=utils))
+    monkeypatch.setitem(sys.modules, "easyocr.utils", utils)
+    monkeypatch.setattr(ocr, "_readers", {})
+    monkeypatch.setattr(ocr, "_detect_languages", False)
+    monkeypatch.setattr(ocr, "_batcher", None)
+    monkeypatch.setattr(ocr, "_batch_size", 1)
+    return FakeReader
+
+
+class TestOCRReaders:
+
+    def test_reader_is_loaded_once_per_language_set(self, fake_easyocr):
+        first = ocr.get_reader(["uk", "en"])
+        assert ocr.get_reader(["en", "uk"]) is first
+        ocr.get_reader(["en"])
+        assert fake_easyocr.created == [("en", "uk"), ("en",)]
+
+    def test_processor_does_not_load_a_reader(self, fake_easyocr, tmp_path):
+        ImageProcessor(str(tmp_path / "a.png"))
+        assert fake_easyocr.created == []
+
+    def test_images_share_the_reader(self, fake_easyocr, tmp_path):
+        for name in ("a.png", "b.png"):
+            save_image(tmp_path / name)
+            assert ImageProcessor(str(tmp_path / name)).read() == "0"
+        assert len(fake_easyocr.created) == 1
+
+    def test_recognize_skips_empty_lines(self, fake_easyocr):
+        assert ocr.recognize(np.full((2, 2), 7.0), ["en"]) == ["7"]
+
+
+class TestBatchedOCR:
+
+    def test_same_size_images_are_detected_together(self, fake_easyocr):
+        images = [np.full((2, 2), 1.0), np.zeros((3, 3)), np.full((2, 2), 2.0)]
+        assert ocr.recognize_batch(images, ["en"]) == [["1"], ["0"], ["2"]]
+        assert sorted(fake_easyocr.batches) == [1, 2]
+
+    def test_concurrent_images_share_a_batch(self, fake_easyocr):
+        ocr.configure_batching(3, wait=5)
+        results = {}
+
+        def run(value):
+            results[value] = ocr.recognize(np.full((2, 2), float(value)), ["en"])
+
+        threads = [threading.Thread(target=run, args=(value,)) for value in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == {0: ["0"], 1: ["1"], 2: ["2"]}
+        assert fake_easyocr.batches == [3]
+
+    def test_reconfiguring_stops_the_previous_batcher(self, fake_easyocr):
+        ocr.configure_batching(2, wait=0)
+        assert ocr.recognize(np.full((2, 2), 4.0), ["en"]) == ["4"]
+        previous = ocr._batcher
+
+        ocr.configure_batching(1)
+        assert ocr._batcher is None
+        assert not previous._thread.is_alive()
+        assert ocr.recognize(np.full((2, 2), 5.0), ["en"]) == ["5"]
+
+    def test_archive_images_are_read_in_one_batch(self, fake_easyocr, tmp_path):
+        for name, value in (("a.png", 10), ("b.png", 20)):
+            save_image(tmp_path / name, value)
+        archive_path = tmp_path / "images.zip"
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            archive.write(tmp_path / "a.png", "scans/a.png")
+            archive.write(tmp_path / "b.png", "scans/b.png")
+
+        processor = ArchiveProcessor(str(archive_path), {"png": partial(ImageProcessor, languages=["en"])})
+        assert list(processor.iter_segments()) == [
+            ({"entry": "scans/a.png"}, "10"),
+            ({"entry": "scans/b.png"}, "20"),
+        ]
+        assert fake_easyocr.batches == [2]
+        assert fake_easyocr.created == [("en",)]
+
+
+class TestLanguageSelection:
+
+    @pytest.mark.parametrize("sample, expected", [
+        ("Привіт світ", ("be", "bg", "mn", "rs_cyrillic", "ru", "uk")),
+        ("Hello world", ("en",)),
+        ("Hello світ", ocr.DEFAULT_LANGUAGES),
+        ("12 345", ocr.DEFAULT_LANGUAGES),
+    ])
+    def test_select_languages(self, sample, expected):
+        assert set(ocr.select_languages(ocr.DEFAULT_LANGUAGES, sample)) == set(expected)
+
+    def test_probe_has_one_language_per_script(self):
+        assert ocr.probe_languages(ocr.DEFAULT_LANGUAGES) == ("en", "ru")
+        assert ocr.probe_languages(["uk", "be"]) == ("be", "uk")
+
+    def test_cyrillic_image_is_read_without_latin_languages(self, fake_easyocr, monkeypatch):
+        monkeypatch.setattr(ocr, "_detect_languages", True)
+        fake_easyocr.text = "Привіт"
+        assert ocr.recognize(np.zeros((2, 2)), ocr.DEFAULT_LANGUAGES) == ["Привіт"]
+
+        cyrillic = ("be", "bg", "mn", "rs_cyrillic", "ru", "uk")
+        assert fake_easyocr.created == [("en", "ru"), cyrillic]
+        assert [languages for languages, _ in fake_easyocr.recognized] == [("en", "ru"), cyrillic]
+        assert ocr.get_reader(cyrillic, detector=False).detector is False
+
+    def test_folder_languages(self, fake_easyocr, tmp_path):
+        languages = ocr.FolderLanguages({str(tmp_path / "en"): ["en"]}, ["uk"])
+        assert languages(str(tmp_path / "en" / "deep" / "a.png")) == ("en",)
+        assert languages(str(tmp_path / "other" / "a.png")) == ("uk",)
+        assert ImageProcessor(str(tmp_path / "en" / "a.png"), languages).languages == ("en",)
+
+
+def page(seed, size=(600, 800)):
+    """A white page with random dark "words", different for every seed."""
+    random = np.random.default_rng(seed)
+    pixels = np.full((size[1], size[0]), 255, dtype=np.uint8)
+    for _ in range(60):
+        x, y = random.integers(0, size[0] - 80), random.integers(0, size[1] - 20)
+        pixels[y:y + 12, x:x + random.integers(20, 80)] = 0
+    return pixels
+
+
+class TestOCRCache:
+
+    def test_copies_hash_close_and_other_pages_far(self, tmp_path):
+        original = page(1)
+        Image.fromarray(original).resize((450, 600)).save(tmp_path / "copy.jpg", quality=60)
+        copy = np.array(Image.open(tmp_path / "copy.jpg"))
+
+        assert hamming(dhash(original), dhash(copy)) <= 10
+        assert hamming(dhash(original), dhash(page(2))) > 40
+
+    def test_bk_tree_finds_what_a_full_scan_finds(self):
+        random = np.random.default_rng(0)
+        hashes = [int(random.integers(0, 2**16)) for _ in range(300)]
+        tree = BKTree()
+        for image_hash in hashes:
+            tree.add(image_hash, image_hash)
+
+        for query in hashes[:20] + [12345]:
+            expected = {image_hash for image_hash in hashes if hamming(query, image_hash) <= 3}
+            assert {value for _, value in tree.search(query, 3)} == expected
+        assert len(tree) == len(set(hashes))
+
+    def test_near_identical_images_are_not_recognized_again(self, fake_easyocr, tmp_path):
+        cache = OCRCache(tmp_path / "ocr.sqlite3")
+        Image.fromarray(page(1)).save(tmp_path / "a.png")
+        Image.fromarray(page(1)).resize((300, 400)).save(tmp_path / "b.jpg", quality=70)
+        Image.fromarray(page(2)).save(tmp_path / "c.png")
+
+        texts = [ImageProcessor(str(tmp_path / name), ["en"], cache).read() for name in ("a.png", "b.jpg", "c.png")]
+        assert texts[0] == texts[1] == "255"
+        assert fake_easyocr.batches == [1, 1]
+
+        # another process sharing the file sees the entries
+        batched = ImageProcessor.read_many([str(tmp_path / "b.jpg")], ["en"], OCRCache(tmp_path / "ocr.sqlite3"))
+        assert batched == {str(tmp_path / "b.jpg"): "255"}
+        assert fake_easyocr.batches == [1, 1]
+
+    def test_entries_are_bounded(self, tmp_path):
+        cache = OCRCache(tmp_path / "ocr.sqlite3", max_distance=0, max_entries=4)
+        for number in range(10):
+            cache.put(number, "ns", f"text {number}")
+
+        assert [cache.get(number, "ns") for number in range(10)] == [None] * 6 + [f"text {n}" for n in range(6, 10)]
+        assert cache._connect().execute("SELECT COUNT(*) FROM ocr").fetchone()[0] == 4
+
+        # past the limit, the trees are reloaded with the newest half
+        cache.put(10, "ns", "text 10")
+        assert cache.get(10, "ns") == "text 10"
+        assert cache.get(7, "ns") is None
+        assert sum(len(tree) for tree in cache._trees.values()) == 2
+
+
+class TestPreprocessing:
+
+    def test_exif_rotation_and_downscale(self, tmp_path):
+        image = Image.new("L", (400, 200))
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotated 90 degrees clockwise
+        image.save(tmp_path / "a.jpg", exif=exif, dpi=(600, 600))
+
+        prepared = ImageProcessor(str(tmp_path / "a.jpg")).preprocess_image(str(tmp_path / "a.jpg"))
+        assert prepared.shape == (200, 100)
+
+    def test_large_photos_are_capped(self):
+        image = Image.new("L", (4000, 3000))
+        assert image_prep.downscale(image, max_pixels=3_000_000).size == (2000, 1500)
+        assert image_prep.downscale(image, dpi=(72, 72)) is image
+
+    def test_textless_images_skip_ocr(self, fake_easyocr, tmp_path):
+        Image.new("RGB", (400, 300), "skyblue").save(tmp_path / "sky.png")
+        assert ImageProcessor(str(tmp_path / "sky.png")).read() == ""
+        assert fake_easyocr.created == []
+
+    def test_small_text_region_is_not_skipped(self):
+        pixels = np.full((3000, 4000), 200, dtype=np.uint8)
+        pixels[100:160, 100:400:6] = 0
+        assert image_prep.edge_density(pixels) >= image_prep.MIN_EDGE_DENSITY
+
+    def test_tiles_cover_the_image_with_overlap(self):
+        pixels = np.zeros((100, 250))
+        tiles = image_prep.tile(pixels, size=100, overlap=10)
+        assert [part.shape for part in tiles] == [(100, 100)] * 3
+        assert image_prep.tile(np.zeros((50, 50)), size=100)[0].shape == (50, 50)
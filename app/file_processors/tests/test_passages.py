@@ -0,0 +1,76 @@
+"""Test splitting extracted segments into passages."""
+
+from app.file_processors.base_processor import FileProcessor
+from app.file_processors.main_file import SearchContext
+from app.file_processors.utils.extraction_cache import ExtractionCache
+from app.file_processors.utils.passages import split_passages
+
+
+class PagedProcessor(FileProcessor):
+    """Processor yielding one segment per line, located by page."""
+
+    runs = 0
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    def search(self, keyword: str, exact_match: bool) -> list[str]:
+        return []
+
+    def read(self) -> str:
+        with open(self.file_path, encoding='utf-8') as file:
+            return file.read()
+
+    def iter_segments(self):
+        PagedProcessor.runs += 1
+        for number, line in enumerate(self.read().splitlines(), start=1):
+            yield {"page": number}, line
+
+
+class TestSplitPassages:
+    """Test the split_passages function."""
+
+    def test_small_segments_are_merged(self) -> None:
+        """Ensure short segments share a passage and keep both locators."""
+        passages = list(split_passages([({"page": 1}, "alpha"), ({"page": 2}, "beta")], size=100))
+
+        assert passages == [{"text": "alpha\nbeta", "locator": {"page": 1}, "locator_end": {"page": 2}}]
+
+    def test_passages_respect_size_and_overlap(self) -> None:
+        """Ensure passages stay bounded and repeat the end of the previous one."""
+        segments = [({"page": n}, f"page {n} " + "word " * 20) for n in range(1, 11)]
+        passages = list(split_passages(segments, size=300, overlap=40))
+
+        assert len(passages) > 1
+        assert all(len(p["text"]) <= 300 + 40 for p in passages)
+        for previous, current in zip(passages, passages[1:]):
+            assert current["text"].startswith(previous["text"][-40:])
+
+    def test_long_segment_is_windowed(self) -> None:
+        """Ensure a segment longer than the passage size is split at whitespace."""
+        text = " ".join(f"w{i}" for i in range(1000))
+        passages = list(split_passages([({"sheet": "A"}, text)], size=500, overlap=50))
+
+        assert len(passages) > 1
+        assert all(len(p["text"]) <= 500 for p in passages)
+        assert all(p["locator"] == {"sheet": "A"} for p in passages)
+        assert passages[-1]["text"].endswith("w999")
+
+    def test_empty_segments_are_skipped(self) -> None:
+        """Ensure blank segments produce no passages."""
+        assert list(split_passages([({}, ""), ({}, "   ")])) == []
+
+
+def test_segments_are_cached(tmp_path) -> None:
+    """Ensure re-reading an unchanged file replays cached segments."""
+    source = tmp_path / "doc.pages"
+    source.write_text("one\ntwo", encoding='utf-8')
+    context = SearchContext(cache=ExtractionCache(tmp_path / "cache", max_bytes=1024 * 1024))
+    context.register_processor("pages", PagedProcessor)
+    PagedProcessor.runs = 0
+
+    first = list(context.iter_segments(str(source)))
+    second = list(context.iter_segments(str(source)))
+
+    assert first == second == [({"page": 1}, "one"), ({"page": 2}, "two")]
+    assert PagedProcessor.runs == 1
@@ -0,0 +1,125 @@
+"""Test page streaming and OCR of scanned pages in PDFProcessor."""
+
+import io
+
+import numpy as np
+import PyPDF2
+from PIL import Image
+
+from app.file_processors import pdf_processor
+from app.file_processors.main_file import SearchContext
+from app.file_processors.pdf_processor import PDFProcessor
+
+
+def text_pdf(pages: list[str]) -> bytes:
+    """Build a PDF with one line of Helvetica text per page ("" for a blank page)."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode() if text else b""
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    pdf, offsets = b"%PDF-1.4\n", []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return pdf
+
+
+def scanned_page() -> PyPDF2.PageObject:
+    """A page holding a single striped (so not textless) image and no text."""
+    pixels = np.full((300, 200), 255, dtype=np.uint8)
+    pixels[::6, 20:180] = 0
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, "PDF")
+    return PyPDF2.PdfReader(buffer).pages[0]
+
+
+def write_pdf(path, pages: list) -> str:
+    """Write a PDF mixing text pages (str) and scanned pages (None)."""
+    writer = PyPDF2.PdfWriter()
+    text_pages = PyPDF2.PdfReader(io.BytesIO(text_pdf([page or "" for page in pages]))).pages
+    for text, page in zip(pages, text_pages):
+        writer.add_page(page if text is not None else scanned_page())
+    with open(path, "wb") as file:
+        writer.write(file)
+    return str(path)
+
+
+class TestPDFPages:
+
+    def test_pages_stream_in_order_with_numbers(self, tmp_path):
+        path = write_pdf(tmp_path / "a.pdf", [f"Page {number}" for number in range(1, 8)])
+        processor = PDFProcessor(path, chunk_pages=3)
+
+        assert [number for number, _ in processor.iter_pages()] == list(range(1, 8))
+        assert list(processor.iter_segments())[4] == ({"page": 5}, "Page 5")
+        assert processor.read() == "".join(f"Page {number}\n" for number in range(1, 8))
+
+    def test_blank_pages_are_skipped(self, tmp_path):
+        path = write_pdf(tmp_path / "a.pdf", ["First", "", "Third"])
+        assert list(PDFProcessor(path).iter_pages()) == [(1, "First"), (3, "Third")]
+
+    def test_scanned_pages_are_read_with_ocr(self, tmp_path, monkeypatch):
+        path = write_pdf(tmp_path / "a.pdf", ["Typed", None, None, "Typed again"])
+        batches = []
+
+        def recognize_images(self, images):
+            batches.append(len(images))
+            return [f"scanned {image.shape}" for image in images]
+
+        monkeypatch.setattr(pdf_processor.ImageProcessor, "recognize_images", recognize_images)
+        assert list(PDFProcessor(path).iter_pages()) == [
+            (1, "Typed"), (2, "scanned (300, 200)"), (3, "scanned (300, 200)"), (4, "Typed again"),
+        ]
+        assert batches == [2]
+
+    def test_page_pool_matches_serial_extraction(self, tmp_path):
+        path = write_pdf(tmp_path / "a.pdf", [f"Page {number}" for number in range(1, 12)])
+        parallel = PDFProcessor(path, workers=2, chunk_pages=2)
+        try:
+            assert list(parallel.iter_pages()) == list(PDFProcessor(path).iter_pages())
+        finally:
+            pdf_processor._executor.shutdown()
+            pdf_processor._executor = None
+
+
+class TestPDFSearch:
+
+    def test_hits_carry_page_numbers(self, tmp_path):
+        path = write_pdf(tmp_path / "a.pdf", ["Invoice 12", "nothing", "INVOICES due"])
+        processor = PDFProcessor(path)
+
+        assert list(processor.iter_hits("invoice")) == [(1, "Invoice 12"), (3, "INVOICES due")]
+        assert list(processor.iter_hits("invoice", exact_match=True)) == [(1, "Invoice 12")]
+        assert processor.search("invoice", max_hits=1) == ["Invoice 12"]
+
+    def test_search_stops_reading_at_the_hit_limit(self, tmp_path, monkeypatch):
+        path = write_pdf(tmp_path / "a.pdf", ["needle"] + ["hay"] * 20)
+        read = []
+        extract_text = PyPDF2.PageObject.extract_text
+
+        def counting_extract_text(page, *args, **kwargs):
+            read.append(page)
+            return extract_text(page, *args, **kwargs)
+
+        monkeypatch.setattr(PyPDF2.PageObject, "extract_text", counting_extract_text)
+        assert PDFProcessor(path).search("needle", max_hits=1) == ["needle"]
+        assert len(read) == 1
+
+    def test_search_in_file_reports_pages(self, tmp_path):
+        path = write_pdf(tmp_path / "a.pdf", ["hay", "needle one", "needle two"])
+        context = SearchContext()
+        context.register_processor("pdf", PDFProcessor)
+
+        result = context.search_in_file(path, "needle", False, max_hits=1)
+        assert (result["matches"], result["pages"]) == (["needle one"], [2])
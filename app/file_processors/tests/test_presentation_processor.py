@@ -0,0 +1,46 @@
+"""Test the slide-by-slide extraction of PresentationProcessor."""
+
+from pptx import Presentation
+from pptx.util import Inches
+
+from app.file_processors.presentation_processor import PresentationProcessor
+
+
+def write_deck(path):
+    """A deck with a text box, a table and a group on slide 1, notes on slide 2."""
+    deck = Presentation()
+    layout = deck.slide_layouts[6]  # blank
+
+    first = deck.slides.add_slide(layout)
+    first.shapes.add_textbox(Inches(1), Inches(1), Inches(4), Inches(1)).text_frame.text = "Quarterly report"
+    table = first.shapes.add_table(2, 2, Inches(1), Inches(2), Inches(4), Inches(1)).table
+    for row, values in enumerate((("Region", "Total"), ("Київ", "120"))):
+        for column, value in enumerate(values):
+            table.cell(row, column).text = value
+    group = first.shapes.add_group_shape()
+    group.shapes.add_textbox(Inches(1), Inches(4), Inches(2), Inches(1)).text_frame.text = "Grouped note"
+
+    second = deck.slides.add_slide(layout)
+    second.shapes.add_textbox(Inches(1), Inches(1), Inches(4), Inches(1)).text_frame.text = "Next steps"
+    second.notes_slide.notes_text_frame.text = "Mention the budget"
+    deck.save(path)
+    return str(path)
+
+
+class TestPresentationProcessor:
+
+    def test_segments_cover_tables_groups_and_notes(self, tmp_path):
+        processor = PresentationProcessor(write_deck(tmp_path / "a.pptx"))
+        assert list(processor.iter_segments()) == [
+            ({"slide": 1}, "Quarterly report\nRegion\tTotal\nКиїв\t120\nGrouped note"),
+            ({"slide": 2}, "Next steps"),
+            ({"slide": 2, "notes": True}, "Mention the budget"),
+        ]
+
+    def test_search_and_read_share_one_parse(self, tmp_path, monkeypatch):
+        processor = PresentationProcessor(write_deck(tmp_path / "a.pptx"))
+        assert processor.search("київ", False) == ["Київ 120"]
+        assert processor.search("budget", True) == ["Mention the budget"]
+
+        monkeypatch.setattr("app.file_processors.presentation_processor.Presentation", None)
+        assert processor.read().endswith("Next steps\nMention the budget")
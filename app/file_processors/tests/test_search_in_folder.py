@@ -0,0 +1,83 @@
+"""Test the parallel, early-terminating SearchContext.search_in_folder."""
+
+import threading
+
+from app.file_processors import main_file
+from app.file_processors.main_file import SearchContext, stop_search_pool
+from app.file_processors.text_processor import TextProcessor
+
+
+def make_context() -> SearchContext:
+    context = SearchContext()
+    context.register_processor("txt", TextProcessor)
+    return context
+
+
+def make_tree(root, files: int = 6) -> None:
+    """Create `files` text files, half of them in a subfolder, all matching."""
+    (root / "sub").mkdir()
+    for number in range(files):
+        folder = root / "sub" if number % 2 else root
+        folder.joinpath(f"{number}.txt").write_text("needle\n" + "hay\n" * number, encoding='utf-8')
+    (root / "skip.bin").write_bytes(b"needle")
+
+
+class TestSearchInFolder:
+    """Test the search_in_folder method."""
+
+    def test_serial_search_finds_every_match(self, tmp_path) -> None:
+        """Ensure every supported file is searched, cheapest first."""
+        make_tree(tmp_path)
+
+        results = list(make_context().search_in_folder(str(tmp_path), "needle", workers=1))
+
+        assert [r["file_name"] for r in results] == [f"{n}.txt" for n in range(6)]
+        assert all(r["matches"] == ["needle"] for r in results)
+
+    def test_non_recursive(self, tmp_path) -> None:
+        """Ensure subfolders are skipped when not recursive."""
+        make_tree(tmp_path)
+
+        results = list(make_context().search_in_folder(str(tmp_path), "needle", recursive=False, workers=1))
+
+        assert {r["file_name"] for r in results} == {"0.txt", "2.txt", "4.txt"}
+
+    def test_parallel_search_finds_every_match(self, tmp_path) -> None:
+        """Ensure the process pool returns the same files."""
+        make_tree(tmp_path)
+
+        results = list(make_context().search_in_folder(str(tmp_path), "needle", workers=2))
+
+        assert sorted(r["file_name"] for r in results) == [f"{n}.txt" for n in range(6)]
+
+    def test_stops_at_limit(self, tmp_path) -> None:
+        """Ensure the search ends once enough files matched."""
+        make_tree(tmp_path)
+
+        serial = list(make_context().search_in_folder(str(tmp_path), "needle", limit=2, workers=1))
+        parallel = list(make_context().search_in_folder(str(tmp_path), "needle", limit=2, workers=2))
+
+        assert len(serial) == 2
+        assert len(parallel) == 2
+
+    def test_cancel_and_timeout(self, tmp_path) -> None:
+        """Ensure a set cancel event or an elapsed timeout yields nothing more."""
+        make_tree(tmp_path)
+        cancel = threading.Event()
+        cancel.set()
+
+        assert list(make_context().search_in_folder(str(tmp_path), "needle", cancel=cancel, workers=2)) == []
+        assert list(make_context().search_in_folder(str(tmp_path), "needle", timeout=0, workers=1)) == []
+
+    def test_pool_is_shared_between_searches(self, tmp_path) -> None:
+        """Ensure searches reuse one spawned pool until it is stopped."""
+        make_tree(tmp_path)
+
+        list(make_context().search_in_folder(str(tmp_path), "needle", workers=2))
+        executor = main_file._search_executor
+        list(make_context().search_in_folder(str(tmp_path), "needle", workers=2))
+
+        assert main_file._search_executor is executor
+        assert executor._mp_context.get_start_method() == "spawn"
+        stop_search_pool()
+        assert main_file._search_executor is None
@@ -0,0 +1,66 @@
+"""Test encoding detection and the memory-mapped search of text and code files."""
+
+from app.file_processors.base_processor import TextSearcher
+from app.file_processors.code_processor import CodeProcessor
+from app.file_processors.text_processor import TextProcessor
+from app.file_processors.utils import text_stream
+from app.file_processors.utils.text_stream import detect_encoding, iter_matching_lines
+
+TEXT = "Звіт за квартал\nINFO   договір підписано\nДОГОВІР 12\nдоговірний процес\n"
+
+
+class TestEncoding:
+
+    def test_detects_common_encodings(self, tmp_path):
+        for encoding, expected in [("utf-8", "utf-8"), ("utf-8-sig", "utf-8-sig"), ("utf-16", "utf-16"),
+                                   ("cp1251", "cp1251"), ("koi8-u", "koi8-u"), ("cp1125", "cp1125")]:
+            path = tmp_path / f"{encoding}.txt"
+            path.write_text(TEXT, encoding=encoding)
+            assert detect_encoding(str(path)) == expected
+
+    def test_detection_is_cached_until_the_file_changes(self, tmp_path, monkeypatch):
+        path = tmp_path / "a.txt"
+        path.write_text(TEXT, encoding="cp1251")
+        sniffed = []
+        sniff = text_stream._sniff
+        monkeypatch.setattr(text_stream, "_sniff", lambda sample: sniffed.append(1) or sniff(sample))
+
+        assert detect_encoding(str(path)) == detect_encoding(str(path)) == "cp1251"
+        assert len(sniffed) == 1
+        path.write_text(TEXT + "ще рядок\n", encoding="utf-8")
+        assert detect_encoding(str(path)) == "utf-8"
+        assert len(sniffed) == 2
+
+
+class TestSearch:
+
+    def test_matches_ignore_case_in_every_encoding(self, tmp_path):
+        for encoding in ("utf-8", "utf-8-sig", "utf-16", "cp1251"):
+            path = tmp_path / f"{encoding}.txt"
+            path.write_text(TEXT, encoding=encoding)
+            assert list(iter_matching_lines(str(path), "договір", True)) == [
+                "INFO договір підписано", "ДОГОВІР 12"]
+            assert len(list(iter_matching_lines(str(path), "Договір", False))) == 3
+            assert list(iter_matching_lines(str(path), "звіт", False)) == ["Звіт за квартал"]
+
+    def test_unencodable_keyword_and_empty_file(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_text("plain ascii text\n", encoding="cp1252")
+        assert list(iter_matching_lines(str(path), "договір", False)) == []
+        (tmp_path / "empty.txt").write_bytes(b"")
+        assert list(iter_matching_lines(str(tmp_path / "empty.txt"), "text", False)) == []
+
+    def test_search_text_does_not_print(self, capsys):
+        assert TextSearcher.search_text("one needle", "needle", False) == ["one needle"]
+        assert capsys.readouterr().out == ""
+
+
+class TestProcessors:
+
+    def test_cp1251_files_are_read_and_searched(self, tmp_path):
+        path = tmp_path / "legacy.py"
+        path.write_text("# Звіт\nprint('договір')\n", encoding="cp1251")
+        assert CodeProcessor(str(path)).read() == "# Звіт\nprint('договір')"
+        assert CodeProcessor(str(path)).search("ДОГОВІР", True) == ["print('договір')"]
+        assert TextProcessor(str(path)).read() == "# Звіт\nprint('договір')\n"
+        assert TextProcessor(str(path)).search("звіт") == ["# Звіт"]
@@ -0,0 +1,195 @@
+"""Test the streaming .docx reader used by WordProcessor."""
+
+import struct
+import zipfile
+
+import docx
+import olefile
+
+from app.file_processors.main_file import SearchContext
+from app.file_processors.utils.doc_stream import _SectorStream, iter_doc_blocks
+from app.file_processors.utils.docx_stream import iter_docx_blocks
+from app.file_processors.word_processor import WordProcessor
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+DOCUMENT = f"""<?xml version="1.0" encoding="UTF-8"?>
+<w:document {W}><w:body>
+  <w:p><w:r><w:t>Договір</w:t><w:tab/><w:t xml:space="preserve">№ 12</w:t></w:r></w:p>
+  <w:p><w:r><w:delText>removed</w:delText><w:instrText>PAGE</w:instrText></w:r></w:p>
+  <w:tbl>
+    <w:tr>
+      <w:tc><w:p><w:r><w:t>outer</w:t></w:r></w:p>
+        <w:tbl><w:tr><w:tc><w:p><w:r><w:t>nested</w:t></w:r></w:p></w:tc></w:tr></w:tbl>
+      </w:tc>
+      <w:tc><w:p><w:r><w:t>cell</w:t></w:r><w:r><w:br/><w:t>two</w:t></w:r></w:p></w:tc>
+    </w:tr>
+  </w:tbl>
+  <w:p><w:r><w:t>after</w:t></w:r></w:p>
+</w:body></w:document>
+"""
+
+FOOTNOTES = f"""<?xml version="1.0" encoding="UTF-8"?>
+<w:footnotes {W}>
+  <w:footnote w:type="separator" w:id="-1"><w:p><w:r><w:separator/></w:r></w:p></w:footnote>
+  <w:footnote w:id="1"><w:p><w:r><w:t>See annex</w:t></w:r></w:p></w:footnote>
+</w:footnotes>
+"""
+
+
+def write_docx(path):
+    document = docx.Document()
+    document.add_paragraph("Invoice for   Kyiv office")
+    document.add_paragraph("")
+    table = document.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = "Client"
+    table.cell(0, 1).text = "Total"
+    table.cell(1, 0).text = "Коваль"
+    table.cell(1, 1).text = "120"
+    document.add_paragraph("Signed")
+    section = document.sections[0]
+    section.header.paragraphs[0].text = "Confidential"
+    section.footer.paragraphs[0].text = "Page footer"
+    document.save(path)
+    return str(path)
+
+
+def compound_file(streams):
+    """
+    Build an OLE compound file (version 3, 512-byte sectors) holding the given
+    streams, each padded to 4096 bytes so that no mini stream is needed.
+    """
+    sector, end, free = 512, 0xFFFFFFFE, 0xFFFFFFFF
+    data, fat, entries = b"", [], []
+    for name, content in streams.items():
+        content = content.ljust(max(4096, -(-len(content) // sector) * sector), b"\0")
+        first, count = len(fat), len(content) // sector
+        fat += list(range(first + 1, first + count)) + [end]
+        entries.append((name, 2, first, len(content)))
+        data += content
+    directory = len(fat)
+    fat += [end, 0xFFFFFFFD]
+    fat += [free] * (sector // 4 - len(fat))
+
+    def entry(name, kind, start, size, left=free, child=free):
+        encoded = (name + "\0").encode("utf-16-le") if name else b""
+        return (encoded.ljust(64, b"\0") + struct.pack("<HBB", len(encoded), kind, 1)
+                + struct.pack("<III", left, free, child) + b"\0" * 36 + struct.pack("<IQ", start, size))
+
+    # every stream is a left sibling of the next one, from the shortest name up
+    names = sorted(entries, key=lambda item: (len(item[0]), item[0].upper()))
+    table = entry("Root Entry", 5, end, 0, child=len(names))
+    for number, (name, kind, start, size) in enumerate(names):
+        table += entry(name, kind, start, size, left=number if number else free)
+    table = table.ljust(sector, b"\0")
+
+    header = (bytes.fromhex("D0CF11E0A1B11AE1") + b"\0" * 16 + struct.pack("<HHHHH", 0x3E, 3, 0xFFFE, 9, 6)
+              + b"\0" * 6 + struct.pack("<IIIIIIIII", 0, 1, directory, 0, 4096, end, 0, end, 0)
+              + struct.pack("<I", directory + 1) + struct.pack("<I", free) * 108)
+    return header + data + table + struct.pack(f"<{sector // 4}I", *fat)
+
+
+def write_doc(path, pieces, main, footnotes=0, flags=0x0200):
+    """
+    Write a minimal Word 97 .doc: a FIB, its piece table in the 1Table stream
+    and the text of each (text, is 8-bit) piece from offset 1024 of WordDocument.
+    """
+    word = bytearray(1024)
+    struct.pack_into("<HH", word, 0, 0xA5EC, 0xC1)
+    struct.pack_into("<H", word, 0x0A, flags)
+    struct.pack_into("<H", word, 32, 14)
+    struct.pack_into("<H", word, 62, 22)
+    struct.pack_into("<II", word, 64 + 12, main, footnotes)
+    struct.pack_into("<H", word, 152, 0x5D)
+
+    positions, descriptors = [0], b""
+    for text, compressed in pieces:
+        fc = len(word)
+        word += text.encode("cp1252") if compressed else text.encode("utf-16-le")
+        positions.append(positions[-1] + len(text))
+        descriptors += struct.pack("<HIH", 0, (fc * 2) | 0x40000000 if compressed else fc, 0)
+    plc = struct.pack(f"<{len(positions)}I", *positions) + descriptors
+    clx = b"\x01" + struct.pack("<h", 2) + b"\0\0" + b"\x02" + struct.pack("<I", len(plc)) + plc
+    struct.pack_into("<II", word, 154 + 33 * 8, 16, len(clx))
+
+    path.write_bytes(compound_file({"WordDocument": bytes(word), "1Table": b"\0" * 16 + clx}))
+    return str(path)
+
+
+class TestDocStream:
+
+    def test_pieces_fields_and_stories(self, tmp_path):
+        main = "Invoice \x13 PAGE \\* MERGEFORMAT \x141\x15 total\rRow\x07cell\x07\x07\r"
+        cyrillic = "Договір\x0bпідписано\r\r"
+        footnote = "\x02 See annex\r"
+        path = write_doc(tmp_path / "a.doc", [(main, True), (cyrillic + footnote, False)],
+                         main=len(main) + len(cyrillic), footnotes=len(footnote))
+        assert list(iter_doc_blocks(path)) == [
+            ({"paragraph": 1}, "Invoice 1 total"),
+            ({"paragraph": 2}, "Row\tcell\t\t"),
+            ({"paragraph": 3}, "Договір\nпідписано"),
+            ({"part": "footnotes", "paragraph": 1}, " See annex"),
+        ]
+
+    def test_processor_reads_and_searches(self, tmp_path):
+        text = "Перший рядок\rДругий рядок\r"
+        path = write_doc(tmp_path / "a.doc", [(text, False)], main=len(text))
+        processor = WordProcessor(path)
+        assert processor.read() == "Перший рядок\nДругий рядок"
+        assert processor.search("другий") == ["Другий рядок"]
+        assert list(processor.iter_segments())[1] == ({"paragraph": 2}, "Другий рядок")
+
+    def test_streams_are_read_from_disk_by_sector(self, tmp_path):
+        text = "".join(f"Рядок {number}\r" for number in range(2000))
+        path = write_doc(tmp_path / "a.doc", [(text, False)], main=len(text))
+        with olefile.OleFileIO(path) as ole:
+            expected = ole.openstream("WordDocument").read()
+            stream = _SectorStream(ole, "WordDocument")
+            for position, size in [(0, 10), (500, 600), (len(expected) - 7, 100)]:
+                stream.seek(position)
+                assert stream.read(size) == expected[position:position + size]
+        assert list(iter_doc_blocks(path))[-1] == ({"paragraph": 2000}, "Рядок 1999")
+
+    def test_encrypted_document(self, tmp_path):
+        path = write_doc(tmp_path / "a.doc", [("secret\r", True)], main=7, flags=0x0300)
+        assert WordProcessor(path).read() == "Error processing .doc file: Encrypted documents are not supported"
+
+
+class TestDocxStream:
+
+    def test_blocks_and_locators(self, tmp_path):
+        path = tmp_path / "a.docx"
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("word/document.xml", DOCUMENT)
+            archive.writestr("word/footnotes.xml", FOOTNOTES)
+        assert list(iter_docx_blocks(str(path))) == [
+            ({"paragraph": 1}, "Договір\t№ 12"),
+            ({"table": 1, "row": 1}, "outer nested\tcell\ntwo"),
+            ({"paragraph": 3}, "after"),
+            ({"part": "footnotes", "paragraph": 2}, "See annex"),
+        ]
+
+
+class TestWordProcessor:
+
+    def test_read_includes_tables_headers_and_footers(self, tmp_path):
+        processor = WordProcessor(write_docx(tmp_path / "a.docx"))
+        assert processor.read() == "Invoice for   Kyiv office\nClient\tTotal\nКоваль\t120\nSigned\nConfidential\nPage footer"
+        assert list(processor.iter_segments())[2] == ({"table": 1, "row": 2}, "Коваль\t120")
+        assert list(processor.iter_segments())[-1] == ({"part": "footer1", "paragraph": 1}, "Page footer")
+
+    def test_search(self, tmp_path):
+        path = write_docx(tmp_path / "a.docx")
+        context = SearchContext()
+        context.register_processor("docx", WordProcessor)
+
+        assert context.search_in_file(path, "kyiv", True)["matches"] == ["Invoice for Kyiv office"]
+        assert WordProcessor(path).search("коваль") == ["Коваль 120"]
+        assert WordProcessor(path).search("confid", exact_match=False) == ["Confidential"]
+
+    def test_broken_file(self, tmp_path):
+        path = tmp_path / "a.docx"
+        path.write_bytes(b"not a zip")
+        assert WordProcessor(str(path)).read().startswith("Error processing .docx file")
+        locator, text = list(WordProcessor(str(path)).iter_segments())[0]
+        assert locator == {"error": True} and text.startswith("Error processing .docx file")
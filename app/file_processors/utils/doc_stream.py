@@ -0,0 +1,204 @@
+import re
+import struct
+from typing import Iterator
+
+import olefile
+
+# Stories of a Word 97-2003 document, in character position order, with the
+# index of their length (ccp*) in FibRgLw97. Macro text is not read.
+_STORIES = (("main", 3), ("footnotes", 4), ("headers", 5), ("macros", 6), ("comments", 7), ("endnotes", 8),
+            ("textboxes", 9), ("header textboxes", 10))
+_FIB_FLAGS = 0x0A
+_FIB_RGW = 32
+_CLX_PAIR = 33  # fcClx/lcbClx in FibRgFcLcb97
+_COMPRESSED = 0x40000000
+_CHUNK_CHARS = 1 << 15
+
+# Word control characters: cell marks become tabs, line and page breaks are
+# kept, anchors for pictures, footnotes and comments are dropped.
+_CONTROL = str.maketrans({"\x07": "\t", "\x0b": "\n", "\x0c": "\r", "\x1e": "-", "\x1f": None, "\x00": None,
+                          "\x01": None, "\x02": None, "\x05": None, "\x08": None})
+_FIELD_MARKS = re.compile("([\x13\x14\x15])")
+
+
+def _u16(data: bytes, offset: int) -> int:
+    return struct.unpack_from("<H", data, offset)[0]
+
+
+def _u32(data: bytes, offset: int) -> int:
+    return struct.unpack_from("<I", data, offset)[0]
+
+
+class _SectorStream:
+    """
+    Read-only, seekable view of a stream in an OLE compound file that reads
+    its sectors from disk on demand. `olefile.OleFileIO.openstream` copies
+    the whole stream into memory, which for the WordDocument stream of a
+    large document is most of the file.
+    """
+
+    def __init__(self, ole: olefile.OleFileIO, name: str):
+        entry = ole.direntries[ole._find(name)]
+        self.ole, self.size, self.position = ole, entry.size, 0
+        self.sectors = []
+        sector = entry.isectStart
+        count = -(-entry.size // ole.sectorsize)
+        while sector != olefile.ENDOFCHAIN and len(self.sectors) < count:
+            if sector >= len(ole.fat):
+                raise ValueError(f"Broken sector chain in the {name} stream")
+            self.sectors.append(sector)
+            sector = ole.fat[sector]
+        if len(self.sectors) < count:
+            raise ValueError(f"The {name} stream is truncated")
+
+    def seek(self, position: int) -> None:
+        self.position = position
+
+    def read(self, size: int) -> bytes:
+        size = max(0, min(size, self.size - self.position))
+        sector_size = self.ole.sectorsize
+        data = bytearray()
+        while len(data) < size:
+            index, offset = divmod(self.position + len(data), sector_size)
+            # the header takes the place of sector -1
+            self.ole.fp.seek((self.sectors[index] + 1) * sector_size + offset)
+            data += self.ole.fp.read(min(sector_size - offset, size - len(data)))
+        self.position += size
+        return bytes(data)
+
+
+def _open_stream(ole: olefile.OleFileIO, name: str):
+    """
+    Open a stream for seeking and reading; streams kept in the mini stream
+    are below the 4 KiB cutoff and are loaded by olefile.
+    """
+    if ole.get_size(name) < ole.minisectorcutoff:
+        return ole.openstream(name)
+    return _SectorStream(ole, name)
+
+
+def read_fib(word: bytes) -> tuple[str, list[int], int, int]:
+    """
+    Read the parts of the File Information Block needed to find the text.
+    :param word: Start of the WordDocument stream.
+    :return: (table stream name, story lengths (ccp*), fcClx, lcbClx).
+    """
+    if len(word) < _FIB_RGW + 2 or _u16(word, 0) != 0xA5EC:
+        raise ValueError("Not a Word document")
+    if _u16(word, 2) < 0xC1:
+        raise ValueError("Word 95 and older documents are not supported")
+    flags = _u16(word, _FIB_FLAGS)
+    if flags & 0x0100:
+        raise ValueError("Encrypted documents are not supported")
+    table = "1Table" if flags & 0x0200 else "0Table"
+
+    offset = _FIB_RGW
+    offset += 2 + _u16(word, offset) * 2      # csw, fibRgW
+    cslw = _u16(word, offset)
+    lengths = [_u32(word, offset + 2 + 4 * index) for _, index in _STORIES if index < cslw]
+    offset += 2 + cslw * 4                    # cslw, fibRgLw
+    if _u16(word, offset) <= _CLX_PAIR:
+        raise ValueError("The document has no piece table")
+    fc_clx, lcb_clx = struct.unpack_from("<II", word, offset + 2 + _CLX_PAIR * 8)
+    return table, lengths, fc_clx, lcb_clx
+
+
+def read_pieces(clx: bytes) -> list[tuple[int, int, int, bool]]:
+    """
+    Read the piece table from the CLX, skipping its property modifiers (Prc).
+    :param clx: The CLX structure from the table stream.
+    :return: (first character position, last + 1, byte offset in WordDocument,
+             is 8-bit) per piece.
+    """
+    offset = 0
+    while offset < len(clx) and clx[offset] == 0x01:
+        offset += 3 + struct.unpack_from("<h", clx, offset + 1)[0]
+    if offset + 5 > len(clx) or clx[offset] != 0x02:
+        raise ValueError("Invalid piece table")
+    size = _u32(clx, offset + 1)
+    plc = clx[offset + 5:offset + 5 + size]
+    count = (len(plc) - 4) // 12
+    positions = struct.unpack_from(f"<{count + 1}I", plc, 0)
+    pieces = []
+    for number in range(count):
+        fc = _u32(plc, 4 * (count + 1) + 8 * number + 2)
+        compressed = bool(fc & _COMPRESSED)
+        fc &= ~_COMPRESSED & 0xFFFFFFFF
+        pieces.append((positions[number], positions[number + 1], fc // 2 if compressed else fc, compressed))
+    return pieces
+
+
+def _iter_chunks(word, pieces: list[tuple[int, int, int, bool]], start: int, stop: int) -> Iterator[str]:
+    """
+    Yield the characters between two character positions, decoding at most
+    `_CHUNK_CHARS` characters at a time.
+    """
+    for first, last, fc, compressed in pieces:
+        width = 1 if compressed else 2
+        position, end = max(first, start), min(last, stop)
+        while position < end:
+            count = min(end - position, _CHUNK_CHARS)
+            word.seek(fc + (position - first) * width)
+            data = word.read(count * width)
+            yield data.decode("cp1252", errors="replace") if compressed else data.decode("utf-16-le", errors="replace")
+            position += count
+
+
+def _strip_fields(chunk: str, fields: list[bool]) -> str:
+    """
+    Drop field codes (between the field begin and separator marks) and keep
+    field results; `fields` holds, per open field, whether its code is being read.
+    """
+    kept = []
+    for token in _FIELD_MARKS.split(chunk):
+        if token == "\x13":
+            fields.append(True)
+        elif token == "\x14":
+            if fields:
+                fields[-1] = False
+        elif token == "\x15":
+            if fields:
+                fields.pop()
+        elif not any(fields):
+            kept.append(token)
+    return "".join(kept)
+
+
+def iter_doc_blocks(file_path: str) -> Iterator[tuple[dict, str]]:
+    """
+    Stream the text of a Word 97-2003 .doc using its piece table, so only
+    text runs are read and not the formatting and binary data around them.
+    Streams are read sector by sector from disk, so memory use does not grow
+    with the size of the document.
+    The main text comes first, then footnotes, headers, comments, endnotes
+    and text boxes. Empty paragraphs are skipped but still counted.
+    :param file_path: Path to the .doc file.
+    :return: Iterator of (locator, text) pairs; locators are {"paragraph": n},
+             with a "part" key (e.g. "footnotes") outside of the main text.
+    """
+    with olefile.OleFileIO(file_path) as ole:
+        if not ole.exists("WordDocument"):
+            raise ValueError("No WordDocument stream")
+        word = _open_stream(ole, "WordDocument")
+        table, lengths, fc_clx, lcb_clx = read_fib(word.read(4096))
+        if not ole.exists(table):
+            raise ValueError(f"No {table} stream")
+        clx_stream = _open_stream(ole, table)
+        clx_stream.seek(fc_clx)
+        pieces = read_pieces(clx_stream.read(lcb_clx))
+
+        start = 0
+        for (part, _), length in zip(_STORIES, lengths):
+            stop = start + length
+            if part != "macros":
+                locator = {} if part == "main" else {"part": part}
+                paragraphs, pending, fields = 0, "", []
+                for chunk in _iter_chunks(word, pieces, start, stop):
+                    *complete, pending = (pending + _strip_fields(chunk, fields).translate(_CONTROL)).split("\r")
+                    for text in complete:
+                        paragraphs += 1
+                        if text.strip():
+                            yield {**locator, "paragraph": paragraphs}, text
+                if pending.strip():
+                    yield {**locator, "paragraph": paragraphs + 1}, pending
+            start = stop
@@ -0,0 +1,112 @@
+import re
+import zipfile
+from typing import Iterator
+
+from lxml import etree
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# Parts of a .docx holding text, read after the body in this order
+_EXTRA_PARTS = re.compile(r"word/(header|footer)(\d*)\.xml|word/(footnotes|endnotes)\.xml")
+_PART_ORDER = {"header": 0, "footer": 1, "footnotes": 2, "endnotes": 3}
+
+
+def paragraph_text(paragraph) -> str:
+    """
+    Return the text of a `w:p` element, with tabs and line breaks kept.
+    Deleted revisions and field codes are not part of it.
+    """
+    parts = []
+    for element in paragraph.iter(f"{_W}t", f"{_W}tab", f"{_W}br", f"{_W}cr", f"{_W}noBreakHyphen"):
+        if element.tag == f"{_W}t":
+            parts.append(element.text or "")
+        elif element.tag == f"{_W}tab":
+            parts.append("\t")
+        elif element.tag == f"{_W}noBreakHyphen":
+            parts.append("-")
+        else:
+            parts.append("\n")
+    return "".join(parts)
+
+
+def _row_text(row) -> str:
+    """Return the text of a `w:tr` element, its cells separated by tabs."""
+    cells = []
+    for cell in row.iterchildren(f"{_W}tc"):
+        cells.append(" ".join(text for text in map(paragraph_text, cell.iter(f"{_W}p")) if text.strip()))
+    return "\t".join(cells)
+
+
+def _drop(element):
+    """Free a processed element and the already processed siblings before it."""
+    element.clear()
+    parent = element.getparent()
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+
+
+def _iter_part(stream) -> Iterator[tuple[str, str]]:
+    """
+    Stream the blocks of one XML part: ("paragraph", text) for paragraphs and
+    ("row", text) for the rows of top-level tables (nested tables are part of
+    their cell's text).
+    """
+    tables = 0
+    for event, element in etree.iterparse(stream, events=("start", "end"), huge_tree=True):
+        tag = element.tag
+        if event == "start":
+            if tag == f"{_W}tbl":
+                tables += 1
+            continue
+        if tag == f"{_W}p" and tables == 0:
+            yield "paragraph", paragraph_text(element)
+            _drop(element)
+        elif tag == f"{_W}tr" and tables == 1:
+            yield "row", _row_text(element)
+            _drop(element)
+        elif tag == f"{_W}tbl":
+            tables -= 1
+            if tables == 0:
+                _drop(element)
+
+
+def iter_docx_blocks(file_path: str) -> Iterator[tuple[dict, str]]:
+    """
+    Stream the text of a .docx straight from its XML, without building a document model.
+    The body comes first, then headers, footers, footnotes and endnotes.
+    Empty paragraphs are skipped but still counted.
+    :param file_path: Path to the .docx file.
+    :return: Iterator of (locator, text) pairs; locators are {"paragraph": n}
+             or {"table": t, "row": r} in the body, with a "part" key (e.g.
+             "header1", "footnotes") outside of it.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        names = set(archive.namelist())
+        extra = []
+        for name in names:
+            match = _EXTRA_PARTS.fullmatch(name)
+            if match:
+                kind = match.group(1) or match.group(3)
+                extra.append((_PART_ORDER[kind], int(match.group(2) or 0), name))
+        parts = ["word/document.xml"] + [name for *_, name in sorted(extra)]
+
+        for name in parts:
+            if name not in names:
+                continue
+            part = {} if name == "word/document.xml" else {"part": name[len("word/"):-len(".xml")]}
+            paragraphs = tables = rows = 0
+            in_table = False
+            with archive.open(name) as stream:
+                for kind, text in _iter_part(stream):
+                    if kind == "paragraph":
+                        paragraphs += 1
+                        in_table = False
+                        locator = {**part, "paragraph": paragraphs}
+                    else:
+                        if not in_table:
+                            tables, rows, in_table = tables + 1, 0, True
+                        rows += 1
+                        locator = {**part, "table": tables, "row": rows}
+                    if text.strip():
+                        yield locator, text
@@ -0,0 +1,177 @@
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional, Union
+
+import pyzstd
+
+
+def file_digest(file_path: Union[str, Path], chunk_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 of a file without loading it into memory.
+    :param file_path: Path to the file.
+    :param chunk_size: Number of bytes read per step.
+    :return: Hex digest of the file content.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """
+    On-disk cache of extracted text, keyed by file content and processor version.
+
+    Entries are zstd-compressed files laid out as ``<dir>/<ab>/<key>.zst``.
+    Reading an entry bumps its mtime, and once the cache grows past `max_bytes`
+    the least recently used entries are removed until it is back under the low
+    watermark. Writes go through a temporary file and an atomic rename, so
+    several workers can share one directory.
+    """
+
+    SUFFIX = ".zst"
+
+    def __init__(self, directory: Union[str, Path], max_bytes: int, level: int = 3,
+                 low_watermark: float = 0.9):
+        """
+        Initialize the cache.
+        :param directory: Directory holding the cache entries (created if missing).
+        :param max_bytes: Upper bound for the compressed size of all entries.
+        :param level: zstd compression level.
+        :param low_watermark: Fraction of `max_bytes` to shrink to when evicting.
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.level = level
+        self.low_watermark = low_watermark
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        """Drop the lock and the size estimate when sent to another process."""
+        state = self.__dict__.copy()
+        state["_lock"] = None
+        state["_size"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(content_hash: str, processor: str, version: str) -> str:
+        """
+        Build the cache key for a file.
+        :param content_hash: Digest of the file content (see `file_digest`).
+        :param processor: Name of the processor (usually the file extension).
+        :param version: Version of the processor's extraction logic.
+        :return: Hex key identifying the cache entry.
+        """
+        raw = f"{content_hash}:{processor}:{version}".encode()
+        return hashlib.sha256(raw).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}{self.SUFFIX}"
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Return the cached text for `key`, or None on a miss.
+        :param key: Key built with `make_key`.
+        """
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # mark as recently used
+        except OSError:
+            return None
+        try:
+            return pyzstd.decompress(data).decode('utf-8')
+        except (pyzstd.ZstdError, UnicodeDecodeError):
+            self._remove(path)
+            return None
+
+    def put(self, key: str, text: str) -> None:
+        """
+        Store `text` under `key`, evicting old entries if the cache is full.
+        :param key: Key built with `make_key`.
+        :param text: Extracted text to store.
+        """
+        path = self._path(key)
+        data = pyzstd.compress(text.encode('utf-8'), self.level)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        previous = path.stat().st_size if path.exists() else 0
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(data)
+            os.replace(tmp_name, path)
+        except OSError:
+            self._remove(Path(tmp_name))
+            raise
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def size(self) -> int:
+        """Return the total compressed size of the cache in bytes."""
+        with self._lock:
+            self._size = self._scan_size()
+            return self._size
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        with self._lock:
+            for path in self._entries():
+                self._remove(path)
+            self._size = 0
+
+    def _entries(self):
+        if not self.directory.exists():
+            return []
+        return list(self.directory.glob(f"*/*{self.SUFFIX}"))
+
+    def _scan_size(self) -> int:
+        total = 0
+        for path in self._entries():
+            try:
+                total += path.stat().st_size
+            except OSError:
+                continue
+        return total
+
+    def _evict(self) -> None:
+        """Remove least recently used entries down to the low watermark."""
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * self.low_watermark
+        for _, size, path in entries:
+            if total <= target:
+                break
+            self._remove(path)
+            total -= size
+        self._size = total
+
+    @staticmethod
+    def _remove(path: Path) -> None:
+        try:
+            path.unlink()
+        except OSError:
+            pass
@@ -0,0 +1,93 @@
+import math
+from typing import Optional
+
+import numpy as np
+from PIL import Image, ImageOps
+
+# Resolution text is recognized at; scans above it are scaled down to it.
+TARGET_DPI = 300
+# Images without DPI information (photos) are scaled down to this many pixels.
+MAX_PIXELS = 12_000_000
+# Side of the tiles very large images are cut into. EasyOCR's detector shrinks
+# anything bigger than its 2560 px canvas, which makes small text unreadable.
+TILE_SIZE = 2560
+TILE_OVERLAP = 128
+# Images whose most detailed region has fewer strong edges than this share of
+# pixels are treated as having no text at all.
+MIN_EDGE_DENSITY = 0.002
+
+
+def load_image(image_path: str) -> tuple[Image.Image, Optional[tuple]]:
+    """
+    Open an image upright (EXIF orientation applied) and in grayscale.
+    :param image_path: Path to the image file.
+    :return: Grayscale PIL image and its (x, y) DPI, if the file records one.
+    """
+    with Image.open(image_path) as image:
+        dpi = image.info.get("dpi")
+        return ImageOps.exif_transpose(image).convert("L"), dpi
+
+
+def downscale(image: Image.Image, dpi=None, target_dpi: int = TARGET_DPI,
+              max_pixels: int = MAX_PIXELS) -> Image.Image:
+    """
+    Scale an image down to the resolution OCR needs; never scales up.
+    :param image: PIL image.
+    :param dpi: (x, y) resolution of the image, if known.
+    :param target_dpi: Resolution to scale scans down to.
+    :param max_pixels: Pixel budget for images without a resolution.
+    :return: The scaled image, or `image` itself if it is small enough.
+    """
+    scale = 1.0
+    if dpi and dpi[0] and float(dpi[0]) > target_dpi:
+        scale = target_dpi / float(dpi[0])
+    elif image.width * image.height > max_pixels:
+        scale = math.sqrt(max_pixels / (image.width * image.height))
+    if scale >= 1.0:
+        return image
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return image.resize(size, Image.Resampling.LANCZOS)
+
+
+def edge_density(image: np.ndarray, blocks: int = 8, side: int = 1024, threshold: float = 0.12) -> float:
+    """
+    Estimate how likely an image is to contain text, from its strong edges.
+    The image is reduced to at most `side` pixels, and the share of pixels
+    with a brightness step above `threshold` is measured in each cell of a
+    `blocks` x `blocks` grid; the densest cell is returned, so a small sign in
+    a large photo still counts.
+    :param image: Grayscale image as a numpy array.
+    :return: Share of edge pixels in the densest cell, from 0 to 1.
+    """
+    thumbnail = Image.fromarray(image)
+    thumbnail.thumbnail((side, side))
+    pixels = np.asarray(thumbnail, dtype=np.float32) / 255
+    if pixels.shape[0] < 2 or pixels.shape[1] < 2:
+        return 0.0
+    steps = np.maximum(np.abs(np.diff(pixels, axis=1))[:-1, :], np.abs(np.diff(pixels, axis=0))[:, :-1])
+    edges = steps > threshold
+    rows = np.array_split(np.arange(edges.shape[0]), min(blocks, edges.shape[0]))
+    columns = np.array_split(np.arange(edges.shape[1]), min(blocks, edges.shape[1]))
+    return max(float(edges[row[0]:row[-1] + 1, column[0]:column[-1] + 1].mean())
+               for row in rows for column in columns)
+
+
+def tile(image: np.ndarray, size: int = TILE_SIZE, overlap: int = TILE_OVERLAP) -> list[np.ndarray]:
+    """
+    Cut an image into overlapping tiles of at most `size` pixels a side.
+    Tiles overlap by `overlap` pixels so a line crossing a border is whole in
+    one of them. Images that fit are returned as the only tile.
+    :param image: Image as a numpy array.
+    :return: Tiles in reading order (rows top to bottom, left to right).
+    """
+    height, width = image.shape[:2]
+    if height <= size and width <= size:
+        return [image]
+    step = size - overlap
+
+    def starts(length: int) -> list[int]:
+        if length <= size:
+            return [0]
+        return list(range(0, length - size, step)) + [length - size]
+
+    return [image[top:top + size, left:left + size] for top in starts(height) for left in starts(width)]
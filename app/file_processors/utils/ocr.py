@@ -0,0 +1,380 @@
+import contextlib
+import multiprocessing
+import multiprocessing.pool
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Iterable, Optional
+
+import numpy as np
+
+# Languages recognized when a processor does not ask for others: the Cyrillic
+# alphabets in our documents plus English.
+DEFAULT_LANGUAGES = ("ru", "rs_cyrillic", "be", "bg", "uk", "mn", "en")
+# Languages read by EasyOCR's Cyrillic model; every other one we use is Latin.
+CYRILLIC_LANGUAGES = frozenset({"ru", "rs_cyrillic", "be", "bg", "uk", "mn", "abq", "ady", "ava", "che",
+                                "dar", "inh", "lbe", "lez", "tab", "tjk"})
+# Text boxes recognized by the script detection pass of an image
+SAMPLE_BOXES = 8
+
+# easyocr.Reader per language set (and whether it has a detector), loaded once per process
+_readers: dict[tuple, object] = {}
+_readers_lock = threading.Lock()
+# one recognition at a time per process, torch already uses every core
+_ocr_lock = threading.Lock()
+
+# Pool of OCR processes started by `start_ocr_pool`, and the process owning it
+_pool: Optional[multiprocessing.pool.Pool] = None
+_pool_pid: Optional[int] = None
+_pool_size = 0
+
+# Images per batch and how long (seconds) `recognize` waits for more images to
+# fill one, see `configure_batching`. A batch size of 1 disables batching.
+_batch_size = 1
+_batch_wait = 0.05
+# Whether the languages of each image are narrowed down, see `configure_language_detection`
+_detect_languages = True
+_batcher: Optional["OCRBatcher"] = None
+_batcher_lock = threading.Lock()
+
+
+def _key(languages: Iterable[str]) -> tuple[str, ...]:
+    return tuple(sorted(set(languages)))
+
+
+def get_reader(languages: Iterable[str] = DEFAULT_LANGUAGES, detector: bool = True):
+    """
+    Return the EasyOCR reader for a language set, loading it on first use.
+    Loading a reader takes seconds and hundreds of MB of model weights, so every
+    process keeps one per language set instead of one per image. easyocr (and
+    torch) are only imported once OCR is actually needed.
+    :param languages: EasyOCR language codes.
+    :param detector: Whether the reader needs its own text detector. Readers
+                     that only recognize boxes found by another one skip it.
+    :return: The shared `easyocr.Reader`.
+    """
+    key = (_key(languages), detector)
+    reader = _readers.get(key) or (None if detector else _readers.get((key[0], True)))
+    if reader is not None:
+        return reader
+    with _readers_lock:
+        if key not in _readers:
+            import easyocr
+
+            # Suppress the EasyOCR GPU warning message by redirecting stderr
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stderr(devnull):
+                _readers[key] = easyocr.Reader(list(key[0]), gpu=False, detector=detector, verbose=False)
+        return _readers[key]
+
+
+def probe_languages(languages: Iterable[str]) -> tuple[str, ...]:
+    """
+    Return the languages of the reader that detects text and samples its script.
+    When both scripts are configured that is one Cyrillic language plus one
+    Latin one, enough to tell them apart; otherwise the languages themselves.
+    :param languages: Languages configured for the image.
+    """
+    languages = _key(languages)
+    cyrillic = [language for language in languages if language in CYRILLIC_LANGUAGES]
+    latin = [language for language in languages if language not in CYRILLIC_LANGUAGES]
+    if not cyrillic or not latin:
+        return languages
+    return _key(["ru" if "ru" in cyrillic else cyrillic[0], "en" if "en" in latin else latin[0]])
+
+
+def select_languages(languages: Iterable[str], sample: str) -> tuple[str, ...]:
+    """
+    Narrow the configured languages down to the scripts found in a text sample.
+    :param languages: Languages configured for the image.
+    :param sample: Text recognized from a few boxes of the image.
+    :return: Only the Cyrillic or only the Latin languages if the sample is
+             (almost) all in one script, otherwise all of `languages`.
+    """
+    languages = _key(languages)
+    cyrillic = sum(1 for char in sample if '\u0400' <= char <= '\u04ff')
+    latin = sum(1 for char in sample if char.isascii() and char.isalpha())
+    if cyrillic + latin == 0:
+        return languages
+    if latin <= (cyrillic + latin) * 0.1:
+        chosen = [language for language in languages if language in CYRILLIC_LANGUAGES]
+    elif cyrillic <= (cyrillic + latin) * 0.1:
+        chosen = [language for language in languages if language not in CYRILLIC_LANGUAGES]
+    else:
+        return languages
+    return tuple(chosen) or languages
+
+
+class FolderLanguages:
+    """
+    OCR languages per folder: files get the languages of the deepest
+    configured folder containing them, or the default ones.
+    Plain data, so processors holding it can be sent to the OCR pool.
+    """
+
+    def __init__(self, folders: dict[str, Iterable[str]], default: Iterable[str] = DEFAULT_LANGUAGES):
+        """
+        :param folders: Language codes per folder path.
+        :param default: Language codes of files outside every folder.
+        """
+        self.folders = {os.path.normpath(folder): tuple(languages) for folder, languages in folders.items()}
+        self.default = tuple(default)
+
+    def __call__(self, file_path: str) -> tuple[str, ...]:
+        """
+        Return the language codes configured for a file.
+        """
+        folder = os.path.dirname(os.path.normpath(file_path))
+        while True:
+            if folder in self.folders:
+                return self.folders[folder]
+            parent = os.path.dirname(folder)
+            if parent == folder:
+                return self.default
+            folder = parent
+
+    def language_sets(self) -> set[tuple[str, ...]]:
+        """
+        Return every configured language set.
+        """
+        return {self.default, *self.folders.values()}
+
+
+def preload_readers(language_sets: Iterable[Iterable[str]]):
+    """
+    Load the readers of the given language sets into this process.
+    :param language_sets: Language sets that will be used for OCR.
+    """
+    for languages in language_sets:
+        get_reader(probe_languages(languages) if _detect_languages else languages)
+
+
+def _recognize_many(images: list[np.ndarray], languages: tuple[str, ...], batch_size: int = 1,
+                    detect_languages: bool = False) -> list[list[str]]:
+    """
+    Run OCR on several images in this process and return the lines of each.
+    Images of the same size go through the text detector together, and the
+    detected text boxes are recognized `batch_size` at a time. With
+    `detect_languages`, a few boxes of each image are read first and only the
+    languages of the script found there are used for the rest.
+    """
+    from easyocr.utils import reformat_input, reformat_input_batched
+
+    probe = probe_languages(languages) if detect_languages else _key(languages)
+    detector = get_reader(probe)
+    lines: list[list[str]] = [[] for _ in images]
+    by_shape: dict[tuple, list[int]] = {}
+    for number, image in enumerate(images):
+        by_shape.setdefault(image.shape, []).append(number)
+
+    with _ocr_lock:
+        for numbers in by_shape.values():
+            if len(numbers) == 1:
+                colour, greys = reformat_input(images[numbers[0]])
+                greys = [greys]
+            else:
+                colour, greys = reformat_input_batched([images[number] for number in numbers])
+            horizontal_lists, free_lists = detector.detect(colour, reformat=False)
+
+            for number, grey, horizontal, free in zip(numbers, greys, horizontal_lists, free_lists):
+                chosen = probe
+                if detect_languages and probe != _key(languages):
+                    sample = detector.recognize(grey, horizontal[:SAMPLE_BOXES], free[:SAMPLE_BOXES],
+                                                batch_size=batch_size, detail=0, reformat=False)
+                    chosen = _key(select_languages(languages, " ".join(sample)))
+                reader = detector if chosen == probe else get_reader(chosen, detector=False)
+                texts = reader.recognize(grey, horizontal, free, batch_size=batch_size, detail=0, reformat=False)
+                lines[number] = [text for text in texts if text]
+    return lines
+
+
+def _recognize(image: np.ndarray, languages: tuple[str, ...], batch_size: int = 1,
+               detect_languages: bool = False) -> list[str]:
+    """
+    Run OCR on one image in this process and return the recognized lines.
+    """
+    return _recognize_many([image], languages, batch_size, detect_languages)[0]
+
+
+def _own_pool() -> Optional[multiprocessing.pool.Pool]:
+    # a forked child inherits the pool object but cannot use it
+    return _pool if _pool is not None and _pool_pid == os.getpid() else None
+
+
+def recognize_batch(images: list[np.ndarray], languages: Iterable[str] = DEFAULT_LANGUAGES) -> list[list[str]]:
+    """
+    Recognize the text lines of several images at once.
+    On the OCR pool the images are split into one chunk per process, so every
+    process (and core) has work; otherwise they are recognized here in
+    batches. Results are in the order of `images`.
+    :param images: Images as numpy arrays.
+    :param languages: EasyOCR language codes.
+    :return: Recognized lines of each image.
+    """
+    languages = tuple(languages)
+    if not images:
+        return []
+    pool = _own_pool()
+    if pool is None:
+        return _recognize_many(images, languages, _batch_size, _detect_languages)
+
+    chunk = -(-len(images) // max(1, _pool_size))
+    chunks = [images[start:start + chunk] for start in range(0, len(images), chunk)]
+    results = pool.starmap(_recognize_many, [(part, languages, _batch_size, _detect_languages) for part in chunks])
+    return [lines for part in results for lines in part]
+
+
+class OCRBatcher:
+    """
+    Collects the images that concurrent callers want recognized into batches.
+
+    Indexing jobs run in several threads and each OCRs its own image; the
+    batcher holds those requests for up to `wait` seconds or until `size` are
+    queued, then recognizes them together with `recognize_batch` and hands
+    every caller its own result.
+    """
+
+    def __init__(self, size: int, wait: float):
+        """
+        :param size: Maximum number of images per batch.
+        :param wait: Seconds to wait for a batch to fill up.
+        """
+        self.size = size
+        self.wait = wait
+        self.pid = os.getpid()
+        self._requests: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="ocr-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, image: np.ndarray, languages: tuple[str, ...]) -> list[str]:
+        """
+        Queue an image and wait for its recognized lines.
+        """
+        future: Future = Future()
+        self._requests.put((image, languages, future))
+        return future.result()
+
+    def stop(self):
+        """
+        Recognize the images already queued, then stop the batching thread and wait for it.
+        """
+        self._requests.put(None)
+        self._thread.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            request = self._requests.get()
+            if request is None:
+                return
+            batch = [request]
+            deadline = time.monotonic() + self.wait
+            while len(batch) < self.size:
+                try:
+                    request = self._requests.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+
+            by_languages: dict[tuple[str, ...], list[tuple[np.ndarray, Future]]] = {}
+            for image, languages, future in batch:
+                by_languages.setdefault(languages, []).append((image, future))
+            for languages, requests in by_languages.items():
+                try:
+                    results = recognize_batch([image for image, _ in requests], languages)
+                except Exception as e:
+                    for _, future in requests:
+                        future.set_exception(e)
+                    continue
+                for (_, future), lines in zip(requests, results):
+                    future.set_result(lines)
+
+
+def configure_batching(size: int, wait: float = 0.05):
+    """
+    Set how `recognize` batches images; a size of 1 recognizes each image on its own.
+    :param size: Maximum images per batch, also the recognizer's batch size for text boxes.
+    :param wait: Seconds a batch waits for more images.
+    """
+    global _batch_size, _batch_wait, _batcher
+    with _batcher_lock:
+        _batch_size, _batch_wait = max(1, size), wait
+        previous, _batcher = _batcher, None
+    # a batcher inherited from a parent process has no thread here
+    if previous is not None and previous.pid == os.getpid():
+        previous.stop()
+
+
+def configure_language_detection(enabled: bool):
+    """
+    Turn the per-image narrowing of the OCR languages (see `select_languages`) on or off.
+    """
+    global _detect_languages
+    _detect_languages = enabled
+
+
+def recognize(image: np.ndarray, languages: Iterable[str] = DEFAULT_LANGUAGES) -> list[str]:
+    """
+    Recognize the text lines of an image.
+    With batching configured the image is recognized together with those of
+    other threads; it runs on the OCR pool if this process started one,
+    otherwise in the calling process with its cached reader.
+    :param image: Image as a numpy array.
+    :param languages: EasyOCR language codes.
+    :return: Recognized lines, in reading order.
+    """
+    global _batcher
+    languages = tuple(languages)
+    if _batch_size > 1:
+        with _batcher_lock:
+            if _batcher is None or _batcher.pid != os.getpid():
+                _batcher = OCRBatcher(_batch_size, _batch_wait)
+            batcher = _batcher
+        return batcher.submit(image, languages)
+    pool = _own_pool()
+    if pool is not None:
+        return pool.apply(_recognize, (image, languages, 1, _detect_languages))
+    return _recognize(image, languages, 1, _detect_languages)
+
+
+def _init_ocr_worker(language_sets: list[tuple[str, ...]], detect_languages: bool):
+    """
+    Load the readers of an OCR pool process before it takes any image.
+    """
+    configure_language_detection(detect_languages)
+    preload_readers(language_sets)
+
+
+def start_ocr_pool(workers: int, language_sets: Iterable[Iterable[str]] = (DEFAULT_LANGUAGES,)):
+    """
+    Start a pool of OCR processes with their readers already loaded.
+    Every later `recognize` call of this process is sent to the pool, so
+    several images are recognized in parallel while the caller's threads only
+    wait. Processes are spawned rather than forked, torch does not survive a
+    fork of a process that already used it.
+    :param workers: Number of OCR processes.
+    :param language_sets: Language sets to preload in every process.
+    """
+    global _pool, _pool_pid, _pool_size
+    if _own_pool() is not None or workers < 1:
+        return
+    context = multiprocessing.get_context("spawn")
+    _pool = context.Pool(workers, initializer=_init_ocr_worker,
+                         initargs=([tuple(languages) for languages in language_sets], _detect_languages))
+    _pool_pid, _pool_size = os.getpid(), workers
+
+
+def stop_ocr_pool():
+    """
+    Stop the OCR pool of this process, if it started one.
+    """
+    global _pool, _pool_pid, _pool_size
+    if _own_pool() is not None:
+        _pool.close()
+        _pool.join()
+    _pool = _pool_pid = None
+    _pool_size = 0
@@ -0,0 +1,220 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+import numpy as np
+from PIL import Image
+
+# Side of the dHash grid: a 16x16 grid gives 256 bits, enough to tell apart
+# pages that only differ in their text
+HASH_SIZE = 16
+# Hashes at most this many bits apart are treated as the same image. Re-saved,
+# re-compressed or resized copies of a scan stay well below it.
+MAX_DISTANCE = 10
+# Entries kept in the SQLite file and in the trees of each process
+MAX_ENTRIES = 50_000
+
+
+def dhash(image: np.ndarray, size: int = HASH_SIZE) -> int:
+    """
+    Compute the difference hash of an image.
+    The image is shrunk to `size` rows of `size + 1` grey cells, and every bit
+    tells whether a cell is brighter than its right neighbour. Scaling,
+    re-compression and small brightness changes leave most bits unchanged.
+    :param image: Greyscale image as a numpy array.
+    :param size: Rows (and bits per row) of the hash.
+    :return: Hash as a `size * size` bit integer.
+    """
+    small = Image.fromarray(np.asarray(image, dtype=np.uint8)).convert("L")
+    cells = np.asarray(small.resize((size + 1, size), Image.Resampling.BOX), dtype=np.int16)
+    bits = (cells[:, 1:] > cells[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(first: int, second: int) -> int:
+    """
+    Return the number of bits two hashes differ in.
+    """
+    return bin(first ^ second).count("1")
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree of hashes under the Hamming distance.
+
+    Every child sits under the edge labelled with its distance to the parent,
+    so by the triangle inequality a search within `radius` only descends into
+    edges between `distance - radius` and `distance + radius`; a near-match
+    lookup visits a small part of the tree instead of every hash.
+    """
+
+    def __init__(self):
+        # node: [hash, value, {distance: child node}]
+        self._root: Optional[list] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, image_hash: int, value):
+        """
+        Add a hash with its value; an identical hash replaces the earlier value.
+        """
+        if self._root is None:
+            self._root = [image_hash, value, {}]
+            self._size = 1
+            return
+        node = self._root
+        while True:
+            distance = hamming(image_hash, node[0])
+            if distance == 0:
+                node[1] = value
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [image_hash, value, {}]
+                self._size += 1
+                return
+            node = child
+
+    def search(self, image_hash: int, radius: int) -> Iterator[tuple[int, object]]:
+        """
+        Yield (distance, value) of every hash within `radius` bits of `image_hash`.
+        """
+        if self._root is None:
+            return
+        pending = [self._root]
+        while pending:
+            node = pending.pop()
+            distance = hamming(image_hash, node[0])
+            if distance <= radius:
+                yield distance, node[1]
+            for edge, child in node[2].items():
+                if distance - radius <= edge <= distance + radius:
+                    pending.append(child)
+
+    def nearest(self, image_hash: int, radius: int) -> Optional[object]:
+        """
+        Return the value of the closest hash within `radius` bits, or None.
+        """
+        best = min(self.search(image_hash, radius), key=lambda match: match[0], default=None)
+        return None if best is None else best[1]
+
+
+class OCRCache:
+    """
+    OCR results of images, found again for near-identical copies of an image.
+
+    Entries are kept in a SQLite file shared by every worker process, keyed
+    by the image's `dhash` and a namespace (processor version, languages and
+    aspect ratio). Each process indexes the hashes of the file in one `BKTree`
+    per namespace, picking up rows added by other processes before every
+    lookup; the trees only hold row ids, and the text of a hit is read from
+    the file. At most `max_entries` entries are kept: older rows are deleted
+    from the file, and a process whose trees grow past the limit reloads them
+    with the newest half.
+    """
+
+    def __init__(self, path: Union[str, Path], max_distance: int = MAX_DISTANCE, max_entries: int = MAX_ENTRIES):
+        """
+        Initialize the cache.
+        :param path: SQLite file holding the entries (created if missing).
+        :param max_distance: Largest Hamming distance between the hashes of two
+                             images sharing a result.
+        :param max_entries: Largest number of entries kept.
+        """
+        self.path = Path(path)
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self._trees: dict[str, BKTree] = {}
+        self._size = 0
+        self._last_row = 0
+        self._connection: Optional[sqlite3.Connection] = None
+        self._connection_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        """Drop the lock, the connection and the loaded trees when sent to another process."""
+        state = self.__dict__.copy()
+        state["_lock"] = None
+        state["_connection"] = state["_connection_pid"] = None
+        state["_trees"] = {}
+        state["_size"] = state["_last_row"] = 0
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def namespace(image: np.ndarray, version: str, languages: tuple[str, ...]) -> str:
+        """
+        Build the namespace of an image: only results of the same extraction
+        version and languages are shared, and only between images of about the
+        same shape.
+        """
+        height, width = image.shape[:2]
+        return f"{version}:{','.join(sorted(languages))}:{width / max(height, 1):.1f}"
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return the connection of this process, opening it (and creating the table) on first use."""
+        if self._connection is None or self._connection_pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS ocr (id INTEGER PRIMARY KEY, namespace TEXT, hash TEXT, text TEXT)"
+            )
+            self._connection, self._connection_pid = connection, os.getpid()
+        return self._connection
+
+    def _add(self, rows):
+        for row_id, namespace, image_hash in rows:
+            self._trees.setdefault(namespace, BKTree()).add(int(image_hash, 16), row_id)
+            self._size += 1
+            self._last_row = max(self._last_row, row_id)
+
+    def _refresh(self):
+        """Index the entries added since the last lookup, by any process."""
+        connection = self._connect()
+        self._add(connection.execute(
+            "SELECT id, namespace, hash FROM ocr WHERE id > ? ORDER BY id", (self._last_row,)
+        ).fetchall())
+        if self._size > self.max_entries:
+            self._trees, self._size = {}, 0
+            self._add(connection.execute(
+                "SELECT id, namespace, hash FROM ocr ORDER BY id DESC LIMIT ?", (self.max_entries // 2,)
+            ).fetchall())
+
+    def get(self, image_hash: int, namespace: str) -> Optional[str]:
+        """
+        Return the text of the closest cached image, or None on a miss.
+        :param image_hash: `dhash` of the image.
+        :param namespace: Namespace built with `namespace`.
+        """
+        with self._lock:
+            self._refresh()
+            tree = self._trees.get(namespace)
+            row_id = None if tree is None else tree.nearest(image_hash, self.max_distance)
+            if row_id is None:
+                return None
+            row = self._connect().execute("SELECT text FROM ocr WHERE id = ?", (row_id,)).fetchone()
+            return None if row is None else row[0]  # deleted by another process meanwhile
+
+    def put(self, image_hash: int, namespace: str, text: str):
+        """
+        Store the text recognized on an image, deleting the oldest entries
+        beyond `max_entries`.
+        :param image_hash: `dhash` of the image.
+        :param namespace: Namespace built with `namespace`.
+        :param text: Recognized text.
+        """
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                row_id = connection.execute(
+                    "INSERT INTO ocr (namespace, hash, text) VALUES (?, ?, ?)",
+                    (namespace, format(image_hash, "x"), text),
+                ).lastrowid
+                connection.execute("DELETE FROM ocr WHERE id <= ?", (row_id - self.max_entries,))
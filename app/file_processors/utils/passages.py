@@ -0,0 +1,78 @@
+from typing import Iterable, Iterator
+
+# A segment is a piece of extracted text plus where it came from in the file,
+# e.g. ({"page": 3}, "...") for a PDF or ({"sheet": "Q1"}, "...") for Excel.
+Segment = tuple[dict, str]
+
+
+def _windows(text: str, size: int, overlap: int) -> Iterator[str]:
+    """
+    Split a long text into windows of at most `size` characters.
+    Consecutive windows share `overlap` characters and are cut at whitespace
+    when there is some in the second half of the window.
+    """
+    if len(text) <= size:
+        yield text
+        return
+
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            cut = text.rfind(' ', start + size // 2, end)
+            if cut != -1:
+                end = cut
+        yield text[start:end].strip()
+        if end >= len(text):
+            return
+        start = max(end - overlap, start + 1)
+
+
+def split_passages(segments: Iterable[Segment], size: int = 2000, overlap: int = 200) -> Iterator[dict]:
+    """
+    Group extracted segments into overlapping passages of bounded size.
+
+    Small segments (paragraphs, rows) are merged until a passage is full;
+    segments longer than `size` are split into windows. Each passage starts with
+    the last `overlap` characters of the previous one, so a phrase that crosses
+    a boundary is still found.
+
+    :param segments: (locator, text) pairs in document order.
+    :param size: Maximum passage length in characters.
+    :param overlap: Characters repeated from the end of the previous passage.
+    :return: Iterator of dicts with `text`, `locator` (where the passage starts)
+             and `locator_end` (where it ends, if different).
+    """
+    buffer: list[Segment] = []
+    length = 0
+    fresh = False  # does the buffer hold anything beyond the carried overlap?
+
+    def emit() -> dict:
+        passage = {
+            "text": "\n".join(text for _, text in buffer),
+            "locator": buffer[0][0],
+        }
+        if buffer[-1][0] != buffer[0][0]:
+            passage["locator_end"] = buffer[-1][0]
+        return passage
+
+    for locator, text in segments:
+        text = text.strip() if text else ""
+        if not text:
+            continue
+        for number, piece in enumerate(_windows(text, size, overlap)):
+            if fresh and length + len(piece) + 1 > size:
+                yield emit()
+                last_locator, last_text = buffer[-1]
+                # windows of one long segment already overlap each other
+                tail = last_text[-overlap:] if overlap and number == 0 else ""
+                buffer = [(last_locator, tail)] if tail else []
+                length = len(tail)
+                fresh = False
+            buffer.append((locator, piece))
+            length += len(piece) + 1
+            fresh = True
+
+    if fresh:
+        yield emit()
+
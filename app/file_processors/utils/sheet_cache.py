@@ -0,0 +1,271 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Union
+
+import numpy as np
+
+from .spreadsheet import cell_text, iter_rows
+
+
+class Column:
+    """
+    One spreadsheet column in columnar form.
+
+    Every distinct cell text is stored once in `dictionary` and cells hold
+    its index in `codes` (-1 for an empty cell); `numbers` holds the numeric
+    value of each cell (NaN if it has none). Searches test each distinct
+    text once and then select matching cells with array operations.
+    """
+
+    def __init__(self, codes: np.ndarray, dictionary: np.ndarray, numbers: np.ndarray):
+        self.codes = codes
+        self.dictionary = dictionary
+        self.numbers = numbers
+
+    @classmethod
+    def build(cls, values: list) -> "Column":
+        """
+        Convert the cell values of a column (None for empty cells).
+        """
+        index: dict[str, int] = {}
+        codes = np.full(len(values), -1, dtype=np.int32)
+        numbers = np.full(len(values), np.nan)
+        for position, value in enumerate(values):
+            text = cell_text(value)
+            if text == "":
+                continue
+            codes[position] = index.setdefault(text, len(index))
+            if isinstance(value, bool):
+                continue
+            try:
+                numbers[position] = float(value if not isinstance(value, str) else value.replace(",", "."))
+            except (TypeError, ValueError):
+                pass
+        dictionary = np.array(list(index), dtype=str) if index else np.array([], dtype="<U1")
+        return cls(codes, dictionary, numbers)
+
+    def where_text(self, matches: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+        """
+        Return a mask of the cells whose text matches.
+        :param matches: Takes the dictionary and returns a boolean mask over it.
+        """
+        if len(self.dictionary) == 0:
+            return np.zeros(len(self.codes), dtype=bool)
+        hits = np.append(matches(self.dictionary), False)  # code -1 selects the trailing False
+        return hits[self.codes]
+
+    def where_between(self, low: Optional[float], high: Optional[float]) -> np.ndarray:
+        """
+        Return a mask of the numeric cells between `low` and `high` (inclusive).
+        """
+        mask = ~np.isnan(self.numbers)
+        if low is not None:
+            mask &= self.numbers >= low
+        if high is not None:
+            mask &= self.numbers <= high
+        return mask
+
+    def text(self, position: int) -> str:
+        code = self.codes[position]
+        return "" if code < 0 else str(self.dictionary[code])
+
+
+class Sheet:
+    """
+    A spreadsheet sheet in columnar form: its row numbers and columns.
+    """
+
+    def __init__(self, name: Optional[str], rows: np.ndarray, columns: list[Column]):
+        self.name = name
+        self.rows = rows
+        self.columns = columns
+
+    def header(self) -> list[str]:
+        """Return the texts of the first row, used to find columns by name."""
+        return [column.text(0) if len(self.rows) else "" for column in self.columns]
+
+
+def build_sheets(file_path: str) -> list[Sheet]:
+    """
+    Read a spreadsheet once (see `iter_rows`) and convert every sheet to columns.
+    """
+    sheets: list[Sheet] = []
+    current, rows, cells = object(), [], []
+
+    def finish():
+        if rows:
+            width = max(len(values) for values in cells)
+            columns = [Column.build([values[number] if number < len(values) else None for values in cells])
+                       for number in range(width)]
+            sheets.append(Sheet(current, np.array(rows, dtype=np.int64), columns))
+
+    for sheet, number, values in iter_rows(file_path):
+        if sheet != current:
+            finish()
+            current, rows, cells = sheet, [], []
+        rows.append(number)
+        cells.append(values)
+    finish()
+    return sheets
+
+
+class SheetCache:
+    """
+    On-disk columnar cache of spreadsheets for repeated structured queries.
+
+    Each file is converted once into NumPy arrays (see `Column`) stored as
+    ``<dir>/<key>.npz`` next to the size and mtime of the file it was built
+    from; a changed file is converted again on its next query. The last
+    `memory_items` files queried stay loaded in memory.
+    """
+
+    def __init__(self, directory: Union[str, Path], memory_items: int = 8):
+        """
+        Initialize the cache.
+        :param directory: Directory holding the converted files (created if missing).
+        :param memory_items: Number of converted files kept in memory.
+        """
+        self.directory = Path(directory)
+        self.memory_items = memory_items
+        self._loaded: OrderedDict[str, tuple[tuple[int, int], list[Sheet]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        """Drop the lock and the loaded files when sent to another process."""
+        state = self.__dict__.copy()
+        state["_lock"] = None
+        state["_loaded"] = OrderedDict()
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _path(self, file_path: str) -> Path:
+        key = hashlib.sha256(os.path.abspath(file_path).encode()).hexdigest()
+        return self.directory / f"{key}.npz"
+
+    def sheets(self, file_path: str) -> list[Sheet]:
+        """
+        Return the sheets of a spreadsheet in columnar form, converting it if needed.
+        :param file_path: Path to the spreadsheet.
+        """
+        stat = os.stat(file_path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            loaded = self._loaded.get(file_path)
+            if loaded is not None and loaded[0] == version:
+                self._loaded.move_to_end(file_path)
+                return loaded[1]
+
+        sheets = self._load(file_path, version)
+        if sheets is None:
+            sheets = build_sheets(file_path)
+            self._save(file_path, version, sheets)
+        with self._lock:
+            self._loaded[file_path] = (version, sheets)
+            self._loaded.move_to_end(file_path)
+            while len(self._loaded) > self.memory_items:
+                self._loaded.popitem(last=False)
+        return sheets
+
+    def _load(self, file_path: str, version: tuple[int, int]) -> Optional[list[Sheet]]:
+        try:
+            with np.load(self._path(file_path), allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                if tuple(meta["version"]) != version:
+                    return None
+                sheets = []
+                for number, (name, width) in enumerate(meta["sheets"]):
+                    columns = [Column(data[f"{number}.{column}.codes"], data[f"{number}.{column}.dictionary"],
+                                      data[f"{number}.{column}.numbers"]) for column in range(width)]
+                    sheets.append(Sheet(name, data[f"{number}.rows"], columns))
+                return sheets
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def _save(self, file_path: str, version: tuple[int, int], sheets: list[Sheet]):
+        arrays = {"meta": np.array(json.dumps({
+            "file": os.path.abspath(file_path),
+            "version": list(version),
+            "sheets": [[sheet.name, len(sheet.columns)] for sheet in sheets],
+        }))}
+        for number, sheet in enumerate(sheets):
+            arrays[f"{number}.rows"] = sheet.rows
+            for position, column in enumerate(sheet.columns):
+                arrays[f"{number}.{position}.codes"] = column.codes
+                arrays[f"{number}.{position}.dictionary"] = column.dictionary
+                arrays[f"{number}.{position}.numbers"] = column.numbers
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                np.savez(tmp, **arrays)
+            os.replace(tmp_name, self._path(file_path))
+        except OSError:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+
+    def find(self, file_path: str, **conditions) -> Iterator[tuple[Optional[str], int, int, str]]:
+        """
+        Find the cells of a cached spreadsheet matching a condition (see `find_cells`).
+        :param file_path: Path to the spreadsheet.
+        """
+        return find_cells(self.sheets(file_path), **conditions)
+
+
+def find_cells(sheets: list[Sheet], equals: Optional[str] = None, contains: Optional[str] = None,
+               matches: Optional[Callable[[str], bool]] = None, between: Optional[tuple] = None,
+               column: Union[int, str, None] = None) -> Iterator[tuple[Optional[str], int, int, str]]:
+    """
+    Find the cells matching a condition, in row order.
+    Text conditions ignore case; with several conditions a cell must meet all of them.
+    :param sheets: Sheets returned by `build_sheets` or `SheetCache.sheets`.
+    :param equals: Cell text equal to this.
+    :param contains: Cell text containing this.
+    :param matches: Cell text for which this function is true, tested once per distinct text.
+    :param between: (low, high) numeric range, inclusive; either bound may be None.
+    :param column: Only search this column, by 0-based index or by its first-row text.
+    :return: Iterator of (sheet name, row number, 0-based column, cell text).
+    """
+    conditions: list[Callable[[Column], np.ndarray]] = []
+    if equals is not None:
+        wanted = equals.strip().lower()
+        conditions.append(lambda col: col.where_text(lambda texts: np.char.lower(texts) == wanted))
+    if contains is not None:
+        needle = contains.strip().lower()
+        conditions.append(lambda col: col.where_text(lambda texts: np.char.find(np.char.lower(texts), needle) >= 0))
+    if matches is not None:
+        conditions.append(lambda col: col.where_text(
+            lambda texts: np.fromiter((matches(str(text)) for text in texts), dtype=bool, count=len(texts))))
+    if between is not None:
+        conditions.append(lambda col: col.where_between(*between))
+    if not conditions:
+        raise ValueError("No search condition given")
+
+    for sheet in sheets:
+        if isinstance(column, str):
+            header = [text.strip().lower() for text in sheet.header()]
+            positions = [number for number, text in enumerate(header) if text == column.strip().lower()]
+        elif column is not None:
+            positions = [column] if 0 <= column < len(sheet.columns) else []
+        else:
+            positions = range(len(sheet.columns))
+
+        hits = []
+        for position in positions:
+            col = sheet.columns[position]
+            mask = conditions[0](col)
+            for condition in conditions[1:]:
+                mask &= condition(col)
+            hits.extend((row, position) for row in np.flatnonzero(mask))
+        for row, position in sorted(hits):
+            yield sheet.name, int(sheet.rows[row]), position, sheet.columns[position].text(row)
@@ -0,0 +1,148 @@
+import csv
+import os
+import zipfile
+from typing import Iterator, Optional
+
+import openpyxl
+from lxml import etree
+
+from .text_stream import detect_encoding
+
+# A spreadsheet row: sheet name (None for CSV), 1-based row number, cell values
+Row = tuple[Optional[str], int, list]
+
+# Extensions `iter_rows` can read
+SPREADSHEET_EXTENSIONS = ("xlsx", "xlsm", "xls", "csv", "ods")
+
+# Cells and rows an .ods file may repeat (usually to pad a sheet out to its
+# full size); repeats beyond these are dropped
+MAX_REPEATED_CELLS = 1024
+MAX_REPEATED_ROWS = 1024
+
+_TABLE = "{urn:oasis:names:tc:opendocument:xmlns:table:1.0}"
+_TEXT = "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}"
+
+
+def _trimmed(values) -> list:
+    """Return the values of a row without its trailing empty cells."""
+    values = list(values)
+    while values and (values[-1] is None or values[-1] == ""):
+        values.pop()
+    return values
+
+
+def _xlsx_rows(file_path: str) -> Iterator[Row]:
+    """
+    Stream the rows of an .xlsx/.xlsm workbook.
+    Read-only mode parses the sheet XML as it goes instead of building every
+    cell object, so memory does not grow with the sheet.
+    """
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            for number, values in enumerate(sheet.iter_rows(values_only=True), start=1):
+                values = _trimmed(values)
+                if values:
+                    yield sheet.title, number, values
+    finally:
+        # read-only workbooks keep the file open until closed
+        workbook.close()
+
+
+def _xls_rows(file_path: str) -> Iterator[Row]:
+    """
+    Read the rows of a legacy .xls workbook with xlrd, imported on first use.
+    """
+    try:
+        import xlrd
+    except ModuleNotFoundError as exc:
+        raise ValueError("Reading .xls files needs the xlrd package") from exc
+
+    workbook = xlrd.open_workbook(file_path, on_demand=True)
+    try:
+        for index in range(workbook.nsheets):
+            sheet = workbook.sheet_by_index(index)
+            for number, row in enumerate(sheet.get_rows(), start=1):
+                values = _trimmed(cell.value for cell in row)
+                if values:
+                    yield sheet.name, number, values
+            workbook.unload_sheet(index)
+    finally:
+        workbook.release_resources()
+
+
+def _csv_rows(file_path: str) -> Iterator[Row]:
+    """
+    Stream the rows of a CSV file, guessing its delimiter from the first lines.
+    The encoding (UTF-8/16, cp1251, ...) is detected like for text files, see
+    `detect_encoding`.
+    """
+    with open(file_path, newline='', encoding=detect_encoding(file_path), errors='replace') as file:
+        sample = file.read(64 * 1024)
+        file.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+        for number, values in enumerate(csv.reader(file, dialect), start=1):
+            values = _trimmed(values)
+            if values:
+                yield None, number, values
+
+
+def _ods_cell_text(cell) -> str:
+    return " ".join("".join(paragraph.itertext()) for paragraph in cell.iter(f"{_TEXT}p"))
+
+
+def _ods_rows(file_path: str) -> Iterator[Row]:
+    """
+    Stream the rows of an OpenDocument spreadsheet from its content.xml.
+    Rows are dropped from the parsed tree once read, so memory stays bounded.
+    """
+    with zipfile.ZipFile(file_path) as archive, archive.open("content.xml") as content:
+        sheet, number = None, 0
+        for event, element in etree.iterparse(content, events=("start", "end")):
+            if event == "start":
+                if element.tag == f"{_TABLE}table":
+                    sheet, number = element.get(f"{_TABLE}name"), 0
+                continue
+            if element.tag != f"{_TABLE}table-row":
+                continue
+
+            values = []
+            for cell in element:
+                if cell.tag in (f"{_TABLE}table-cell", f"{_TABLE}covered-table-cell"):
+                    repeat = int(cell.get(f"{_TABLE}number-columns-repeated", "1"))
+                    values.extend([_ods_cell_text(cell)] * min(repeat, MAX_REPEATED_CELLS))
+            values = _trimmed(values)
+            repeat = int(element.get(f"{_TABLE}number-rows-repeated", "1"))
+            if values:
+                for offset in range(1, min(repeat, MAX_REPEATED_ROWS) + 1):
+                    yield sheet, number + offset, values
+            number += repeat
+
+            element.clear()
+            parent = element.getparent()
+            while element.getprevious() is not None:
+                del parent[0]
+
+
+def iter_rows(file_path: str) -> Iterator[Row]:
+    """
+    Stream the non-empty rows of a spreadsheet, whatever its format.
+    Trailing empty cells are dropped; empty rows are skipped but still counted,
+    so row numbers match what a spreadsheet application shows.
+    :param file_path: Path to an .xlsx, .xlsm, .xls, .csv or .ods file.
+    :return: Iterator of (sheet name, 1-based row number, cell values);
+             the sheet name is None for CSV files.
+    """
+    ext = os.path.splitext(file_path)[1].lower().lstrip('.')
+    readers = {"xlsx": _xlsx_rows, "xlsm": _xlsx_rows, "xls": _xls_rows, "csv": _csv_rows, "ods": _ods_rows}
+    if ext not in readers:
+        raise ValueError(f"Unsupported spreadsheet format: .{ext}")
+    return readers[ext](file_path)
+
+
+def cell_text(value) -> str:
+    """Return the text of a cell value, an empty string for an empty cell."""
+    return "" if value is None else str(value)
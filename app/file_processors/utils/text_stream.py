@@ -0,0 +1,126 @@
+import codecs
+import mmap
+import os
+import re
+from functools import lru_cache
+from typing import Iterator
+
+from ..base_processor import TextSearcher
+
+SAMPLE_BYTES = 1024 * 1024
+
+_BOMS = ((codecs.BOM_UTF32_LE, "utf-32"), (codecs.BOM_UTF32_BE, "utf-32"), (codecs.BOM_UTF8, "utf-8-sig"),
+         (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+# Single-byte encodings tried when a file is not UTF-8, most common first
+_CYRILLIC = ("cp1251", "koi8-u", "cp1125")
+_LOWER_CYRILLIC = re.compile("[а-яіїєґё]")
+
+
+def _sniff(sample: bytes) -> str:
+    """
+    Guess the encoding of the start of a file: a BOM, then strict UTF-8, then
+    the Cyrillic code page giving the most lowercase Cyrillic letters (body
+    text is mostly lowercase, and the code pages put lowercase letters at
+    different byte values), then cp1252.
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+    try:
+        # not final: the sample may end in the middle of a character
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    scores = {encoding: len(_LOWER_CYRILLIC.findall(sample.decode(encoding, errors="replace")))
+              for encoding in _CYRILLIC}
+    best = max(_CYRILLIC, key=scores.get)
+    return best if scores[best] else "cp1252"
+
+
+@lru_cache(maxsize=1024)
+def _detect(path: str, mtime_ns: int, size: int) -> str:
+    with open(path, 'rb') as file:
+        return _sniff(file.read(SAMPLE_BYTES))
+
+
+def detect_encoding(file_path: str) -> str:
+    """
+    Detect the encoding of a text file from its first `SAMPLE_BYTES` bytes.
+    The result is cached until the file's size or modification time changes.
+    :param file_path: Path to the file.
+    :return: A codec name for `open` and `bytes.decode`.
+    """
+    stat = os.stat(file_path)
+    return _detect(os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+
+
+def read_text(file_path: str) -> str:
+    """
+    Read a whole text file in its detected encoding; undecodable bytes are replaced.
+    :param file_path: Path to the file.
+    """
+    with open(file_path, 'r', encoding=detect_encoding(file_path), errors='replace') as file:
+        return file.read()
+
+
+def _keyword_pattern(keyword: str, encoding: str) -> re.Pattern:
+    """
+    Compile a bytes pattern finding `keyword` in `encoding` regardless of
+    case, by allowing both the lower and upper case bytes of each character.
+    :raises UnicodeEncodeError: If the keyword cannot be written in `encoding`.
+    """
+    parts = []
+    for char in keyword:
+        variants = {char.encode(encoding)}
+        for other in {char.lower(), char.upper()}:
+            if len(other) == 1:
+                try:
+                    variants.add(other.encode(encoding))
+                except UnicodeEncodeError:
+                    pass
+        parts.append(b"(?:" + b"|".join(re.escape(variant) for variant in sorted(variants)) + b")")
+    return re.compile(b"".join(parts))
+
+
+def iter_matching_lines(file_path: str, keyword: str, exact_match: bool) -> Iterator[str]:
+    """
+    Yield the lines of a text file containing a keyword, as `TextSearcher.iter_matches` does.
+
+    For UTF-8 and single-byte encodings the file is memory-mapped and the
+    encoded keyword is searched in the raw bytes; only the lines around a hit
+    are decoded, so large files are never loaded into Python strings. Other
+    encodings (UTF-16/32) are read line by line.
+    :param file_path: Path to the file.
+    :param keyword: Keyword to search for.
+    :param exact_match: Whether to match whole words only.
+    :return: Iterator of matching lines, whitespace collapsed.
+    """
+    encoding = detect_encoding(file_path)
+    scan = "utf-8" if encoding == "utf-8-sig" else encoding
+    if not keyword.strip() or "\n".encode(scan) != b"\n" or len("a".encode(scan)) != 1:
+        with open(file_path, 'r', encoding=encoding, errors='replace') as file:
+            yield from TextSearcher.iter_matches(file, keyword, exact_match)
+        return
+    try:
+        pattern = _keyword_pattern(keyword.strip(), scan)
+    except UnicodeEncodeError:
+        return  # the file cannot contain the keyword
+    if os.path.getsize(file_path) == 0:
+        return
+
+    with open(file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        position = 0
+        while True:
+            hit = pattern.search(data, position)
+            if hit is None:
+                return
+            start = data.rfind(b"\n", 0, hit.start()) + 1
+            end = data.find(b"\n", hit.end())
+            if end < 0:
+                end = len(data)
+            line = data[start:end].decode(scan, errors='replace')
+            if start == 0:
+                line = line.lstrip("\ufeff")
+            yield from TextSearcher.iter_matches([line], keyword, exact_match)
+            position = end + 1
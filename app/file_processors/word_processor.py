@@ -1,15 +1,21 @@
 import os
+from typing import Iterator
+
 from app.file_processors.base_processor import FileProcessor, TextSearcher
-from docx import Document
-import zipfile
-import olefile
+from app.file_processors.utils.doc_stream import iter_doc_blocks
+from app.file_processors.utils.docx_stream import iter_docx_blocks
 
 class WordProcessor(FileProcessor):
     """
     Processor for Word files to perform text searches.
     Supports both .docx and .doc formats.
+    A .docx is streamed from its XML (see `utils.docx_stream`) and a .doc from
+    its piece table (see `utils.doc_stream`), including tables, headers,
+    footers and footnotes.
     """
 
+    version = "3"
+
     def __init__(self, file_path: str):
         """
         Initialize the Word processor with the file path.
@@ -50,51 +56,44 @@ class WordProcessor(FileProcessor):
         """
         return file_path.endswith('.doc')
 
+    def iter_docx(self) -> Iterator[tuple[dict, str]]:
+        """
+        Stream the paragraphs and table rows of a .docx file in one pass over its XML.
+        :return: Iterator of (locator, text) pairs, see `iter_docx_blocks`.
+        """
+        return iter_docx_blocks(self.file_path)
+
     def _search_docx(self, keyword: str, exact_match: bool) -> list[str]:
         """
-        Search within a .docx file using python-docx.
+        Search within a .docx file, paragraph by paragraph, as it is streamed.
         :param keyword: The keyword to search for.
         :param exact_match: Whether to search for exact matches (True) or partial matches (False).
-        :return: A list of lines containing the keyword.
+        :return: A list of paragraphs (or table rows) containing the keyword.
         """
         try:
-            doc = Document(self.file_path)
-            results = []
-            for para in doc.paragraphs:
-                # Clean and append the paragraph text
-                results.append(' '.join(para.text.split()))  # Remove multiple spaces
-            return TextSearcher.search_text("\n".join(results), keyword, exact_match)
+            return list(TextSearcher.iter_matches((text for _, text in self.iter_docx()), keyword, exact_match))
         except Exception as e:
             return [f"Error processing .docx file: {str(e)}"]
 
+    def iter_doc(self) -> Iterator[tuple[dict, str]]:
+        """
+        Stream the paragraphs of a .doc file from its piece table.
+        :return: Iterator of (locator, text) pairs, see `iter_doc_blocks`.
+        """
+        return iter_doc_blocks(self.file_path)
+
     def _search_doc(self, keyword: str, exact_match: bool) -> list[str]:
         """
-        Search within a .doc file using the olefile library to extract text.
+        Search within a .doc file, paragraph by paragraph, as it is streamed.
         :param keyword: The keyword to search for.
         :param exact_match: Whether to search for exact matches (True) or partial matches (False).
-        :return: A list of lines containing the keyword.
+        :return: A list of paragraphs containing the keyword.
         """
         try:
-            ole = olefile.OleFileIO(self.file_path)
-            if ole.exists('WordDocument'):
-                doc_stream = ole.openstream('WordDocument')
-                text = self._extract_text_from_doc(doc_stream)
-                return TextSearcher.search_text(text, keyword, exact_match)
-            else:
-                return ["Error: Unable to extract text from .doc file"]
+            return list(TextSearcher.iter_matches((text for _, text in self.iter_doc()), keyword, exact_match))
         except Exception as e:
             return [f"Error processing .doc file: {str(e)}"]
 
-    def _extract_text_from_doc(self, doc_stream) -> str:
-        """
-        Extract text from a .doc file stream using olefile.
-        :param doc_stream: The .doc file stream.
-        :return: The extracted text from the .doc file.
-        """
-        # Extract raw text from the WordDocument stream (this is basic, you may need additional parsing)
-        raw_data = doc_stream.read()
-        return raw_data.decode('utf-16', errors='ignore')  # Basic decoding; refine if necessary
-
     def read(self) -> str:
         """
         Read the entire content of the Word document and return it as a single string.
@@ -117,11 +116,7 @@ class WordProcessor(FileProcessor):
         :return: The text content of the .docx file.
         """
         try:
-            doc = Document(self.file_path)
-            full_text = ""
-            for para in doc.paragraphs:
-                full_text += para.text + "\n"
-            return full_text.strip()
+            return "\n".join(text for _, text in self.iter_docx()).strip()
         except Exception as e:
             return f"Error processing .docx file: {str(e)}"
 
@@ -131,11 +126,26 @@ class WordProcessor(FileProcessor):
         :return: The text content of the .doc file.
         """
         try:
-            ole = olefile.OleFileIO(self.file_path)
-            if ole.exists('WordDocument'):
-                doc_stream = ole.openstream('WordDocument')
-                return self._extract_text_from_doc(doc_stream)
-            else:
-                return "Error: Unable to extract text from .doc file"
+            return "\n".join(text for _, text in self.iter_doc()).strip()
         except Exception as e:
             return f"Error processing .doc file: {str(e)}"
+
+    def iter_segments(self) -> Iterator[tuple[dict, str]]:
+        """
+        Yield each paragraph (and, for .docx, table row) with its locator,
+        see `iter_docx_blocks` and `iter_doc_blocks`.
+        :return: Iterator of (locator, text) pairs.
+        """
+        if self.is_docx(self.file_path):
+            blocks, kind = self.iter_docx, ".docx"
+        elif self.is_doc(self.file_path):
+            blocks, kind = self.iter_doc, ".doc"
+        else:
+            blocks, kind = None, None
+        if blocks is None or not os.path.exists(self.file_path):
+            yield from super().iter_segments()
+            return
+        try:
+            yield from blocks()
+        except Exception as e:
+            yield {"error": True}, f"Error processing {kind} file: {str(e)}"
@@ -1,5 +1,6 @@
 """Main file for the FastAPI Template."""
 
+import asyncio
 import sys
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
@@ -20,6 +21,10 @@ from app.config.settings import get_settings
 from app.database.db import async_session, Base
 from app.api import config_error
 from app.api.routes import api_router
+from app.api.utils.elastic import close_client
+from app.api.utils.search_backend import prepare_search_index
+from app.file_processors.main_file import stop_search_pool
+from app.file_processors.pdf_processor import stop_page_pool
 from app.api.config_error import not_found_handler, forbidden_handler, internal_server_error_handler
 
 BLIND_USER_ERROR = 66
@@ -43,7 +48,10 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[Any, None]:
     """Lifespan function Replaces the previous startup/shutdown functions.
 
     Currently we only ensure that the database is available and configured
-    properly. We disconnect from the database immediately after.
+    properly. We disconnect from the database immediately after. The search
+    index template and index are then set up in the background (see
+    `search_setup_on_startup`), and on shutdown the shared Elasticsearch
+    client is closed and the process pools of direct searches are stopped.
     """
     try:
         async with async_session() as session:
@@ -59,8 +67,16 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[Any, None]:
         app.routes.clear()
         app.include_router(config_error.router)
 
+    setup = None
+    if settings.search_setup_on_startup:
+        setup = asyncio.create_task(prepare_search_index())
+
     yield
-    # we would normally put any cleanup code here, but we don't have any at the
+    if setup is not None and not setup.done():
+        setup.cancel()
+    await close_client()
+    await asyncio.to_thread(stop_search_pool)
+    await asyncio.to_thread(stop_page_pool)
 
 # DATABASE_URL = (
 #         "postgresql://"
@@ -68,7 +84,6 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[Any, None]:
 #         f"{get_settings().db_address}:{get_settings().db_port}/"
 #         f"{get_settings().db_name}"
 #     )
-#     # moment so we just yield.
 #
 # Base.metadata.create_all(bind=create_engine(DATABASE_URL, echo=False))
 app = FastAPI(
@@ -0,0 +1,373 @@
+"""Define the durable indexing queue and the worker that drains it.
+
+Jobs live in the ``index_jobs`` Postgres table. Workers claim them with
+``SELECT ... FOR UPDATE SKIP LOCKED`` so any number of worker processes can
+share one queue without handing the same job out twice. A claimed job is
+leased until ``locked_until``; if its worker dies the lease expires and the job
+is picked up again.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Optional
+
+from sqlalchemy import and_, delete, func, or_, select, update
+
+from app.api.utils.index_metrics import get_index_metrics
+from app.config.settings import get_settings
+from app.database.db import async_session
+from app.models.enums import JobAction, JobPriority, JobStatus
+from app.models.index_job import IndexJob
+
+if TYPE_CHECKING:  # pragma: no cover
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+class IndexQueue:
+    """Class to manage the durable indexing queue."""
+
+    @staticmethod
+    async def enqueue(
+        file_path: str,
+        session: AsyncSession,
+        action: JobAction = JobAction.index,
+        priority: JobPriority = JobPriority.interactive,
+    ) -> IndexJob:
+        """Add a job to the queue, merging it with an identical pending one.
+
+        If the same file already has a pending job for the same action, that
+        job is reused and only promoted if the new priority is higher.
+        """
+        result = await session.execute(
+            select(IndexJob).where(
+                IndexJob.file_path == file_path,
+                IndexJob.action == action,
+                IndexJob.status == JobStatus.pending,
+            )
+        )
+        job = result.scalars().first()
+        if job:
+            job.priority = min(job.priority, int(priority))
+            return job
+
+        job = IndexJob(
+            file_path=file_path,
+            action=action,
+            priority=int(priority),
+            status=JobStatus.pending,
+        )
+        session.add(job)
+        await session.flush()
+        return job
+
+    @staticmethod
+    async def move_prefix(
+        old_path: str, new_path: str, session: AsyncSession
+    ) -> int:
+        """Re-point pending jobs for a moved file or folder at its new path."""
+        result = await session.execute(
+            update(IndexJob)
+            .where(
+                IndexJob.status == JobStatus.pending,
+                or_(
+                    IndexJob.file_path == old_path,
+                    IndexJob.file_path.startswith(old_path + "/", autoescape=True),
+                ),
+            )
+            .values(
+                file_path=func.concat(
+                    new_path, func.substr(IndexJob.file_path, len(old_path) + 1)
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount or 0
+
+    @staticmethod
+    async def claim(session: AsyncSession) -> Optional[IndexJob]:
+        """Lease the next runnable job, or return None if there is none.
+
+        Pending jobs whose retry delay has elapsed are eligible, as are running
+        jobs whose lease expired because their worker went away. A job whose
+        worker crashed or hung never reaches `fail`, so an expired lease with
+        no attempts left dead-letters the job instead of leasing it again.
+        """
+        settings = get_settings()
+        now = datetime.now(timezone.utc)
+        while True:
+            result = await session.execute(
+                select(IndexJob)
+                .where(
+                    or_(
+                        and_(
+                            IndexJob.status == JobStatus.pending,
+                            IndexJob.run_after <= now,
+                        ),
+                        and_(
+                            IndexJob.status == JobStatus.running,
+                            IndexJob.locked_until < now,
+                        ),
+                    )
+                )
+                .order_by(IndexJob.priority, IndexJob.run_after, IndexJob.id)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )
+            job = result.scalars().first()
+            if not job:
+                return None
+            if (
+                job.status != JobStatus.running
+                or job.attempts < settings.index_queue_max_attempts
+            ):
+                break
+
+            job.status = JobStatus.dead
+            job.locked_until = None
+            job.last_error = (
+                f"Lease expired after {job.attempts} attempts, "
+                "the worker crashed or hung"
+            )
+            await session.flush()
+            logger.warning("Dead-lettered %r: %s", job, job.last_error)
+
+        job.status = JobStatus.running
+        job.attempts += 1
+        job.locked_until = now + timedelta(
+            seconds=settings.index_queue_visibility_timeout
+        )
+        return job
+
+    @staticmethod
+    async def complete(job_id: int, session: AsyncSession) -> None:
+        """Remove a finished job from the queue."""
+        await session.execute(delete(IndexJob).where(IndexJob.id == job_id))
+
+    @staticmethod
+    def retry_delay(attempts: int) -> float:
+        """Return the exponential back-off delay after `attempts` failures."""
+        settings = get_settings()
+        delay = settings.index_queue_retry_base_seconds * 2 ** (attempts - 1)
+        return min(delay, settings.index_queue_retry_max_seconds)
+
+    @staticmethod
+    async def fail(job_id: int, error: str, session: AsyncSession) -> JobStatus:
+        """Record a failed attempt, scheduling a retry or dead-lettering it."""
+        job = await session.get(IndexJob, job_id)
+        if not job:
+            return JobStatus.dead
+
+        job.last_error = error[:4000]
+        job.locked_until = None
+        if job.attempts >= get_settings().index_queue_max_attempts:
+            job.status = JobStatus.dead
+        else:
+            job.status = JobStatus.pending
+            job.run_after = datetime.now(timezone.utc) + timedelta(
+                seconds=IndexQueue.retry_delay(job.attempts)
+            )
+        return job.status
+
+    @staticmethod
+    async def requeue_dead(session: AsyncSession) -> int:
+        """Move every dead-lettered job back to pending with a fresh budget."""
+        result = await session.execute(
+            update(IndexJob)
+            .where(IndexJob.status == JobStatus.dead)
+            .values(
+                status=JobStatus.pending,
+                attempts=0,
+                run_after=datetime.now(timezone.utc),
+            )
+        )
+        return result.rowcount or 0
+
+    @staticmethod
+    async def stats(session: AsyncSession) -> dict[str, Any]:
+        """Return queue depth per status and priority, and the current lag.
+
+        Lag is the age of the oldest job that is ready to run but has not been
+        picked up yet.
+        """
+        now = datetime.now(timezone.utc)
+
+        by_status = {status.value: 0 for status in JobStatus}
+        result = await session.execute(
+            select(IndexJob.status, func.count()).group_by(IndexJob.status)
+        )
+        for status, count in result.all():
+            by_status[status.value] = count
+
+        by_priority = {priority.name: 0 for priority in JobPriority}
+        result = await session.execute(
+            select(IndexJob.priority, func.count())
+            .where(IndexJob.status == JobStatus.pending)
+            .group_by(IndexJob.priority)
+        )
+        for priority, count in result.all():
+            try:
+                by_priority[JobPriority(priority).name] += count
+            except ValueError:
+                by_priority[str(priority)] = count
+
+        oldest = await session.scalar(
+            select(func.min(IndexJob.created_at)).where(
+                IndexJob.status == JobStatus.pending,
+                IndexJob.run_after <= now,
+            )
+        )
+        ready = await session.scalar(
+            select(func.count()).where(
+                IndexJob.status == JobStatus.pending,
+                IndexJob.run_after <= now,
+            )
+        )
+
+        return {
+            "depth": by_status,
+            "pending_by_priority": by_priority,
+            "ready": ready or 0,
+            "oldest_ready_at": oldest,
+            "lag_seconds": (now - oldest).total_seconds() if oldest else 0.0,
+        }
+
+
+class IndexWorker:
+    """Drain the indexing queue with a fixed number of concurrent slots."""
+
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+    ) -> None:
+        """Set up the worker, defaulting to the values in `Settings`."""
+        settings = get_settings()
+        self.concurrency = concurrency or settings.index_queue_concurrency
+        self.poll_interval = poll_interval or settings.index_queue_poll_interval
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        """Ask every slot to exit after its current job."""
+        self._stopping.set()
+
+    async def run(self) -> None:
+        """Run until `stop` is called."""
+        await self.prepare()
+        flusher = asyncio.ensure_future(self._flush_metrics())
+        try:
+            await asyncio.gather(
+                *(self._slot(number) for number in range(self.concurrency))
+            )
+        finally:
+            flusher.cancel()
+            self.flush_metrics()
+            await self.shutdown()
+
+    @staticmethod
+    async def shutdown() -> None:
+        """Stop the OCR processes started for this worker's jobs."""
+        # imported here so the queue itself does not pull in every processor
+        from app.file_processors.utils.ocr import stop_ocr_pool
+
+        await asyncio.to_thread(stop_ocr_pool)
+
+    def flush_metrics(self) -> None:
+        """Publish this worker's metrics for the API's metrics endpoints."""
+        settings = get_settings()
+        try:
+            get_index_metrics().flush(settings.index_metrics_dir, settings.index_metrics_retention)
+        except OSError as exc:
+            logger.warning("Could not write the indexing metrics: %s", exc)
+
+    async def _flush_metrics(self) -> None:
+        """Flush the metrics every `index_metrics_flush_interval` seconds."""
+        interval = get_settings().index_metrics_flush_interval
+        while not self._stopping.is_set():
+            await asyncio.to_thread(self.flush_metrics)
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def prepare(self) -> None:
+        """Make sure the search index and OCR models are ready before the first job runs."""
+        from app.api.utils.search_backend import (
+            prepare_ocr,
+            prepare_search_index,
+        )
+
+        await prepare_search_index()
+        await prepare_ocr()
+
+    async def run_once(self) -> bool:
+        """Claim and process a single job, returning False if none was ready."""
+        async with async_session() as session, session.begin():
+            job = await IndexQueue.claim(session)
+            if not job:
+                return False
+            job_id, file_path, action = job.id, job.file_path, job.action
+            ready_at = max(job.created_at, job.run_after)
+
+        metrics = get_index_metrics()
+        waited = (datetime.now(timezone.utc) - ready_at).total_seconds()
+        metrics.observe("queue_wait", max(waited, 0.0), action.value)
+        try:
+            await self.process(file_path, action)
+        except Exception as exc:  # noqa: BLE001
+            metrics.record_error("job", type(exc).__name__)
+            async with async_session() as session, session.begin():
+                status = await IndexQueue.fail(job_id, str(exc), session)
+            logger.warning(
+                "Index job %s (%s %s) failed, now %s: %s",
+                job_id,
+                action.value,
+                file_path,
+                status.value,
+                exc,
+            )
+        else:
+            async with async_session() as session, session.begin():
+                await IndexQueue.complete(job_id, session)
+        return True
+
+    async def process(self, file_path: str, action: JobAction) -> None:
+        """Apply a single job to the search index."""
+        # imported here so the queue itself does not pull in every processor
+        from app.api.utils.search_backend import get_search_backend
+        from app.managers.search import SearchManager
+
+        if action == JobAction.index and not os.path.isfile(file_path):
+            # moved or deleted since it was queued, the move/delete already
+            # updated the index
+            logger.info("Skipping %s, the file no longer exists", file_path)
+            return
+
+        es = get_search_backend()
+        if action == JobAction.delete:
+            await es.delete_file_index(file_path)
+        else:
+            await es.index_file(file_path)
+        await SearchManager.invalidate(file_path)
+        SearchManager.invalidate_after_refresh(file_path)
+
+    async def _slot(self, number: int) -> None:
+        """Keep claiming jobs, sleeping for `poll_interval` when idle."""
+        while not self._stopping.is_set():
+            try:
+                worked = await self.run_once()
+            except Exception:  # noqa: BLE001
+                logger.exception("Index worker slot %s crashed", number)
+                worked = False
+            if not worked:
+                try:
+                    await asyncio.wait_for(
+                        self._stopping.wait(), timeout=self.poll_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
@@ -0,0 +1,393 @@
+"""Define the full-text search over the indexed files.
+
+Every document in the index is one passage of a file (see
+``split_passages``), so a hit is the best matching passage together with the
+file it belongs to and where in that file it sits. The passages live in the
+search backend selected in `Settings` (see ``get_search_backend``); this
+manager holds what the backends share: path translation, page cursors and
+the response shape.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional
+
+from fastapi import HTTPException, status
+
+from app.api.utils.do_file import bucket_path
+from app.api.utils.search_cache import SearchCache, get_search_cache
+from app.config.settings import get_settings
+
+if TYPE_CHECKING:  # pragma: no cover
+    from collections.abc import AsyncIterator, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class SearchManager:
+    """Class to run searches and shape their results."""
+
+    HIGHLIGHT_TAGS = ("<mark>", "</mark>")
+    # seconds between progress events of a streamed direct search
+    PROGRESS_INTERVAL = 0.25
+    # seconds between polls of a background index task, and the longest wait
+    TASK_POLL_INTERVAL = 1.0
+    TASK_POLL_TIMEOUT = 3600.0
+    # seconds until an indexed change shows in searches: the default index
+    # refresh interval, with a margin
+    REFRESH_DELAY = 2.0
+    # pending delayed invalidations, referenced until they finish
+    _watchers: set[asyncio.Task] = set()
+
+    @staticmethod
+    def to_system_path(url_path: str) -> str:
+        """Translate a folder as seen by the API into the path stored in the index."""
+        return str(bucket_path / Path("." + url_path))
+
+    @staticmethod
+    def to_url_path(system_path: str) -> str:
+        """Translate an indexed path back into the path seen by the API."""
+        try:
+            relative = Path(system_path).relative_to(bucket_path)
+        except ValueError:
+            return system_path
+        return "/" if relative == Path(".") else "/" + relative.as_posix()
+
+    @staticmethod
+    def normalize_types(file_types: list[str]) -> list[str]:
+        """Turn ".PDF" style extensions into the form stored in the index."""
+        return [file_type.lower().lstrip(".") for file_type in file_types]
+
+    @staticmethod
+    def encode_cursor(sort_values: list[Any]) -> str:
+        """Turn the sort values of the last hit into an opaque page cursor."""
+        raw = json.dumps(sort_values, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    @staticmethod
+    def decode_cursor(
+        cursor: str, types: Optional[tuple[Any, ...]] = None
+    ) -> list[Any]:
+        """Reverse `encode_cursor`, rejecting anything that is not a cursor.
+
+        `types`, if given, holds one type (or tuple of types, as for
+        `isinstance`) per sort value the backend encodes, so a cursor of the
+        wrong shape is a client error and never reaches the search engine.
+        """
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, TypeError) as exc:
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST, "Invalid cursor"
+            ) from exc
+        if not isinstance(values, list):
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid cursor")
+        if types is not None and (
+            len(values) != len(types)
+            or not all(
+                isinstance(value, kind) and not isinstance(value, bool)
+                for value, kind in zip(values, types)
+            )
+        ):
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid cursor")
+        return values
+
+    @staticmethod
+    def make_hit(
+        passage: dict[str, Any], score: float, highlights: list[str]
+    ) -> dict[str, Any]:
+        """Shape a stored passage into a `SearchHit`."""
+        return {
+            "path": SearchManager.to_url_path(passage["file_path"]),
+            "name": passage["file_name"],
+            "type": passage["file_type"],
+            "score": score,
+            "passage": passage.get("passage", 0),
+            "locator": passage.get("locator") or {},
+            "locator_end": passage.get("locator_end"),
+            "highlights": highlights,
+        }
+
+    @staticmethod
+    def make_response(
+        took_ms: int,
+        total_passages: int,
+        total_files: int,
+        results: list[dict[str, Any]],
+        file_types: list[tuple[str, int, int]],
+        folders: list[tuple[str, int, int]],
+        next_cursor: Optional[str],
+    ) -> dict[str, Any]:
+        """Shape a page of hits and (key, passages, files) facets into a `SearchResponse`."""
+
+        def buckets(rows, to_key=lambda key: key) -> list[dict[str, Any]]:
+            return [
+                {"key": to_key(key), "passages": passages, "files": files}
+                for key, passages, files in rows
+            ]
+
+        return {
+            "took_ms": took_ms,
+            "total_passages": total_passages,
+            "total_files": total_files,
+            "results": results,
+            "facets": {
+                "file_types": buckets(file_types),
+                "folders": buckets(folders, SearchManager.to_url_path),
+            },
+            "next_cursor": next_cursor,
+        }
+
+    @staticmethod
+    async def search(
+        query: str,
+        folder: Optional[str] = None,
+        file_types: Optional[list[str]] = None,
+        size: int = 20,
+        cursor: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """Run a search on the configured backend, or serve it from the cache."""
+        # imported here, the backends themselves depend on this manager
+        from app.api.utils.search_backend import get_search_backend
+
+        cache = get_search_cache()
+        key = SearchCache.make_key(
+            get_settings().search_backend, query, folder, file_types, size, cursor
+        )
+        if cache is not None:
+            try:
+                cached = await cache.get(key)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Search cache unavailable: %s", exc)
+                cached = None
+            if cached is not None:
+                return {**cached, "cached": True}
+
+        backend = get_search_backend()
+        try:
+            response = await backend.search(
+                query, folder, file_types, size, cursor
+            )
+        finally:
+            await backend.close()
+
+        if cache is not None:
+            try:
+                await cache.put(key, folder, response)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Search cache unavailable: %s", exc)
+        return response
+
+    @staticmethod
+    async def invalidate(path: str) -> None:
+        """Drop cached searches whose results a change at `path` could affect.
+
+        Called whenever files are uploaded, moved, deleted or (re)indexed.
+        `path` is the file or folder as stored on disk. Cache failures are
+        logged and never fail the operation that triggered them.
+        """
+        cache = get_search_cache()
+        if cache is None:
+            return
+        try:
+            await cache.invalidate(SearchManager.to_url_path(path))
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Search cache not invalidated for %s: %s", path, exc)
+
+    @staticmethod
+    def invalidate_after_task(task_id: Optional[str], *paths: str) -> None:
+        """Invalidate `paths` again once the index task `task_id` has finished.
+
+        Moves and folder deletes run as Elasticsearch tasks, and a search made
+        while one is running still sees the old paths and would put them back
+        in the cache. The task is polled in the background, and the paths are
+        invalidated when it completes, fails or `TASK_POLL_TIMEOUT` passes.
+        Does nothing if `task_id` is None (the change is already complete).
+        """
+        if task_id is None:
+            return
+        SearchManager._watch(SearchManager._invalidate_when_done(task_id, paths))
+
+    @staticmethod
+    def invalidate_after_refresh(*paths: str) -> None:
+        """Invalidate `paths` again once the index has refreshed.
+
+        Indexing and deleting single files do not force a refresh, so for up
+        to `REFRESH_DELAY` seconds searches may still see the old passages.
+        """
+        SearchManager._watch(SearchManager._invalidate_later(paths))
+
+    @staticmethod
+    def _watch(coroutine: Awaitable[None]) -> None:
+        watcher = asyncio.ensure_future(coroutine)
+        SearchManager._watchers.add(watcher)
+        watcher.add_done_callback(SearchManager._watchers.discard)
+
+    @staticmethod
+    async def _invalidate_later(paths: tuple[str, ...]) -> None:
+        await asyncio.sleep(SearchManager.REFRESH_DELAY)
+        for path in paths:
+            await SearchManager.invalidate(path)
+
+    @staticmethod
+    async def _invalidate_when_done(task_id: str, paths: tuple[str, ...]) -> None:
+        # imported here, the backends themselves depend on this manager
+        from app.api.utils.search_backend import get_search_backend
+
+        deadline = time.monotonic() + SearchManager.TASK_POLL_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                task = await get_search_backend().get_task(task_id)
+            except HTTPException as exc:
+                logger.warning("Index task %s not followed: %s", task_id, exc.detail)
+                break
+            if task.get("completed"):
+                break
+            await asyncio.sleep(SearchManager.TASK_POLL_INTERVAL)
+        for path in paths:
+            await SearchManager.invalidate(path)
+
+    @staticmethod
+    def grep_root(folder: str) -> Path:
+        """Resolve a folder for a direct search, refusing paths outside the storage root."""
+        root = Path(SearchManager.to_system_path(folder)).resolve()
+        if not root.is_relative_to(bucket_path.resolve()) or not root.is_dir():
+            raise HTTPException(status.HTTP_404_NOT_FOUND, "Folder not found")
+        return root
+
+    @staticmethod
+    async def stream_grep(
+        root: Path,
+        keyword: str,
+        exact_match: bool,
+        limit: int,
+        timeout: float,
+        cancel: Optional[threading.Event] = None,
+        max_hits: Optional[int] = None,
+    ) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+        """Search the files under `root` directly, yielding events as they happen.
+
+        Events are ``("start", {"total"})`` once, then ``("result", hit)`` for
+        every matching file and ``("progress", counts)`` at most every
+        ``PROGRESS_INTERVAL`` seconds, and finally ``("done", summary)``. The
+        files are searched by `SearchContext.search_in_folder` in a worker
+        thread; setting `cancel`, or closing the generator, stops it. Each
+        file is read only until `max_hits` lines matched.
+        """
+        # imported here, the backends themselves depend on this manager
+        from app.api.utils.search_backend import build_search_context
+
+        context = build_search_context()
+        cancel = cancel or threading.Event()
+        loop = asyncio.get_running_loop()
+        found: asyncio.Queue = asyncio.Queue()
+        started = time.monotonic()
+        files = await asyncio.to_thread(context.search_candidates, str(root), True)
+
+        def publish(item: Any) -> None:
+            try:
+                loop.call_soon_threadsafe(found.put_nowait, item)
+            except RuntimeError:  # the event loop is gone
+                cancel.set()
+
+        def run() -> None:
+            try:
+                for result in context.search_in_folder(
+                    str(root),
+                    keyword,
+                    exact_match=exact_match,
+                    limit=limit,
+                    timeout=timeout,
+                    workers=get_settings().grep_workers,
+                    cancel=cancel,
+                    files=files,
+                    max_hits=max_hits,
+                ):
+                    publish(result)
+            finally:
+                publish(None)
+
+        def counts() -> dict[str, Any]:
+            return {
+                "searched": searched,
+                "matched": matched,
+                "total": len(files),
+                "elapsed_ms": int((time.monotonic() - started) * 1000),
+            }
+
+        searched = matched = 0
+        last_progress = 0.0
+        worker = asyncio.ensure_future(asyncio.to_thread(run))
+        try:
+            yield "start", {"total": len(files)}
+            while (result := await found.get()) is not None:
+                searched += 1
+                if result.get("matches"):
+                    matched += 1
+                    yield "result", {
+                        "path": SearchManager.to_url_path(result["file_path"]),
+                        "name": result["file_name"],
+                        "type": result["file_type"],
+                        "matches": result["matches"],
+                        "pages": result.get("pages"),
+                    }
+                if time.monotonic() - last_progress >= SearchManager.PROGRESS_INTERVAL:
+                    last_progress = time.monotonic()
+                    yield "progress", counts()
+            await worker
+            yield "done", {
+                **counts(),
+                "truncated": searched < len(files),
+            }
+        finally:
+            cancel.set()
+
+    @staticmethod
+    async def grep(
+        root: Path,
+        keyword: str,
+        exact_match: bool,
+        limit: int,
+        timeout: float,
+        is_disconnected: Callable[[], Awaitable[bool]],
+        max_hits: Optional[int] = None,
+    ) -> dict[str, Any]:
+        """Search the files under `root` directly and return all matches at once.
+
+        `is_disconnected` is polled while the search runs, and the search is
+        cancelled as soon as the client has gone away.
+        """
+        cancel = threading.Event()
+
+        async def watch() -> None:
+            while not cancel.is_set():
+                if await is_disconnected():
+                    cancel.set()
+                await asyncio.sleep(0.5)
+
+        watcher = asyncio.ensure_future(watch())
+        results: list[dict[str, Any]] = []
+        summary: dict[str, Any] = {}
+        try:
+            async for event, data in SearchManager.stream_grep(
+                root, keyword, exact_match, limit, timeout, cancel, max_hits
+            ):
+                if event == "result":
+                    results.append(data)
+                elif event == "done":
+                    summary = data
+        finally:
+            watcher.cancel()
+
+        return {
+            "results": results,
+            "searched": summary.get("searched", 0),
+            "truncated": summary.get("truncated", True),
+        }
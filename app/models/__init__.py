@@ -1,2 +1,3 @@
 """Define all the database models for the application."""
-from app.models.user import User
\ No newline at end of file
+from app.models.index_job import IndexJob
+from app.models.user import User
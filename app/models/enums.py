@@ -1,10 +1,29 @@
 # pylint: disable=invalid-name
 """Define Enums for this project."""
 
-from enum import Enum
+from enum import Enum, IntEnum
 
 
 class RoleType(Enum):
     """Contains the different Role types Users can have."""
     user = "user"
     admin = "admin"
+
+
+class JobStatus(Enum):
+    """Lifecycle states of a queued indexing job."""
+    pending = "pending"
+    running = "running"
+    dead = "dead"
+
+
+class JobAction(Enum):
+    """What an indexing job should do with its file."""
+    index = "index"
+    delete = "delete"
+
+
+class JobPriority(IntEnum):
+    """Queue priorities, lower values are served first."""
+    interactive = 0
+    backfill = 100
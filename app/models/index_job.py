@@ -0,0 +1,52 @@
+"""Define the IndexJob model backing the durable indexing queue."""
+
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import DateTime, Enum, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.db import Base
+from app.models.enums import JobAction, JobPriority, JobStatus
+
+
+def utcnow() -> datetime:
+    """Return the current time as an aware UTC datetime."""
+    return datetime.now(timezone.utc)
+
+
+class IndexJob(Base):
+    """Define the IndexJob model.
+
+    Each row is one pending (or dead-lettered) unit of indexing work. Finished
+    jobs are deleted, so the table size tracks the backlog.
+    """
+
+    __tablename__ = "index_jobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    file_path: Mapped[str] = mapped_column(String(4096), index=True)
+    action: Mapped[JobAction] = mapped_column(
+        Enum(JobAction), nullable=False, default=JobAction.index
+    )
+    priority: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=JobPriority.interactive
+    )
+    status: Mapped[JobStatus] = mapped_column(
+        Enum(JobStatus), nullable=False, default=JobStatus.pending, index=True
+    )
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=utcnow
+    )
+    run_after: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=utcnow, index=True
+    )
+    locked_until: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+    def __repr__(self) -> str:
+        """Define the model representation."""
+        return f'IndexJob({self.id}, {self.action.value} "{self.file_path}")'
@@ -0,0 +1,116 @@
+"""Define Response schemas for the indexing pipeline."""
+
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class QueueStatusResponse(BaseModel):
+    """
+    Response model for the indexing queue status
+
+    Attributes:
+        depth: Number of jobs per status (pending, running, dead)
+        pending_by_priority: Pending jobs per priority class
+        ready: Pending jobs whose retry delay has elapsed
+        oldest_ready_at: Creation time of the oldest ready job
+        lag_seconds: How long the oldest ready job has been waiting
+    """
+    depth: dict[str, int]
+    pending_by_priority: dict[str, int]
+    ready: int
+    oldest_ready_at: Optional[datetime] = None
+    lag_seconds: float
+
+
+class IndexTaskResponse(BaseModel):
+    """
+    Response model for file operations that update the index in the background
+
+    Attributes:
+        task_id: Elasticsearch task updating the index, None if it could not be started
+    """
+    task_id: Optional[str] = None
+
+
+class IndexTaskStatusResponse(BaseModel):
+    """
+    Response model for the progress of a background index update
+
+    Attributes:
+        task_id: Elasticsearch task id
+        completed: Whether the task has finished
+        total: Number of documents the task has to process
+        updated: Documents rewritten so far (moves)
+        deleted: Documents removed so far (deletes)
+        failures: Number of documents that could not be processed
+    """
+    task_id: str
+    completed: bool
+    total: int
+    updated: int
+    deleted: int
+    failures: int
+
+
+class StageTiming(BaseModel):
+    """
+    Response model for the timings of one indexing stage
+
+    Attributes:
+        stage: queue_wait, cache_lookup (hashing and extraction cache lookup), extract or bulk
+        label: File type for cache_lookup/extract, job action for queue_wait, backend for bulk
+        count: Number of times the stage ran
+        total_seconds: Total time spent in the stage
+        avg_seconds: Average time per run
+        max_seconds: Longest run
+    """
+    stage: str
+    label: str
+    count: int
+    total_seconds: float
+    avg_seconds: float
+    max_seconds: float
+
+
+class ErrorCount(BaseModel):
+    """
+    Response model for the failures of one kind
+
+    Attributes:
+        stage: Where the failures happened (extract, index, delete, job)
+        type: Exception class name, or <type>_processor for extraction errors
+        count: Number of failures
+    """
+    stage: str
+    type: str
+    count: int
+
+
+class IndexMetricsResponse(BaseModel):
+    """
+    Response model for the indexing metrics summary
+
+    Attributes:
+        processes: Number of processes whose metrics are included
+        files: Files indexed since those processes started
+        bytes: Size of those files
+        passages: Passage documents written
+        bytes_per_second: Bytes indexed per second over the recent window
+        passages_per_second: Passages indexed per second over the recent window
+        window_seconds: Length of the recent window
+        stages: Timings per stage and label
+        errors: Failure counts per stage and type
+        queue: Backlog of the indexing queue
+    """
+    processes: int
+    files: int
+    bytes: int
+    passages: int
+    bytes_per_second: float
+    passages_per_second: float
+    window_seconds: float
+    stages: list[StageTiming]
+    errors: list[ErrorCount]
+    queue: QueueStatusResponse
@@ -0,0 +1,109 @@
+"""Define Response schemas for full-text search."""
+
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class SearchHit(BaseModel):
+    """
+    Response model for one matching passage
+
+    Attributes:
+        path: Path of the file, relative to the storage root
+        name: File name
+        type: File extension
+        score: Relevance score of the passage
+        passage: Number of the passage within the file
+        locator: Where the passage starts in the file (page, sheet, slide...)
+        locator_end: Where the passage ends, if it spans several locations
+        highlights: Matching fragments with the terms wrapped in <mark>
+    """
+    path: str
+    name: str
+    type: str
+    score: float
+    passage: int
+    locator: dict
+    locator_end: Optional[dict] = None
+    highlights: list[str]
+
+
+class FacetBucket(BaseModel):
+    """
+    Response model for one facet value
+
+    Attributes:
+        key: File type or folder
+        passages: Matching passages with this value
+        files: Matching files with this value (approximate for large counts)
+    """
+    key: str
+    passages: int
+    files: int
+
+
+class SearchFacets(BaseModel):
+    """
+    Response model for the facet counts of a search
+
+    Attributes:
+        file_types: Counts per file extension
+        folders: Counts per parent folder
+    """
+    file_types: list[FacetBucket]
+    folders: list[FacetBucket]
+
+
+class SearchResponse(BaseModel):
+    """
+    Response model for a page of search results
+
+    Attributes:
+        took_ms: Time Elasticsearch spent on the query
+        total_passages: Number of matching passages
+        total_files: Number of files with at least one matching passage
+        results: Matching passages, best first
+        facets: Counts by file type and folder over all matches
+        next_cursor: Pass as `cursor` to get the next page, None on the last page
+        cached: Whether the response was served from the search cache
+    """
+    took_ms: int
+    total_passages: int
+    total_files: int
+    results: list[SearchHit]
+    facets: SearchFacets
+    next_cursor: Optional[str] = None
+    cached: bool = False
+
+
+class GrepHit(BaseModel):
+    """
+    Response model for one file matching a direct filesystem search
+
+    Attributes:
+        path: Path of the file, relative to the storage root
+        name: File name
+        type: File extension
+        matches: Lines containing the keyword
+        pages: Page of each matching line, for paged documents such as PDFs
+    """
+    path: str
+    name: str
+    type: str
+    matches: list[str]
+    pages: Optional[list[int]] = None
+
+
+class GrepResponse(BaseModel):
+    """
+    Response model for a direct filesystem search
+
+    Attributes:
+        results: Files with matches, in the order they were found
+        searched: Number of files searched
+        truncated: Whether the search stopped at the limit or the timeout
+    """
+    results: list[GrepHit]
+    searched: int
+    truncated: bool
@@ -0,0 +1,117 @@
+"""Test the indexing metrics."""
+
+import os
+import time
+
+import pytest
+
+from app.api.utils.index_metrics import (
+    IndexMetrics,
+    load_snapshots,
+    summarize,
+    to_prometheus,
+)
+
+QUEUE = {
+    "depth": {"pending": 3, "running": 1, "dead": 0},
+    "pending_by_priority": {},
+    "ready": 2,
+    "lag_seconds": 4.5,
+}
+
+
+@pytest.mark.unit
+class TestIndexMetrics:
+    """Test the IndexMetrics class and the summary helpers."""
+
+    def test_observe_keeps_count_total_and_max(self) -> None:
+        """Ensure stage durations are aggregated per label."""
+        metrics = IndexMetrics()
+        metrics.observe("extract", 1.0, "pdf")
+        metrics.observe("extract", 3.0, "pdf")
+        metrics.observe("extract", 0.5, "txt")
+
+        stages = summarize([metrics.snapshot()])["stages"]
+        pdf = next(stat for stat in stages if stat["label"] == "pdf")
+        assert (pdf["count"], pdf["total_seconds"]) == (2, 4.0)
+        assert (pdf["avg_seconds"], pdf["max_seconds"]) == (2.0, 3.0)
+
+    def test_timed_counts_only_time_inside_the_iterator(self) -> None:
+        """Ensure the consumer's time between items is not counted."""
+        metrics = IndexMetrics()
+        for _ in metrics.timed(range(3), "extract", "txt"):
+            time.sleep(0.05)
+
+        (stat,) = summarize([metrics.snapshot()])["stages"]
+        assert stat["count"] == 1
+        assert stat["total_seconds"] < 0.05  # noqa: PLR2004
+
+    def test_summary_merges_processes(self) -> None:
+        """Ensure totals, throughput and errors add up across processes."""
+        first, second = IndexMetrics(window=10), IndexMetrics(window=10)
+        first.record_file(1000, 4)
+        second.record_file(3000, 6)
+        first.record_error("index", "ConnectionError")
+        second.record_error("index", "ConnectionError")
+
+        summary = summarize([first.snapshot(), second.snapshot()])
+        assert summary["processes"] == 2  # noqa: PLR2004
+        assert summary["files"] == 2  # noqa: PLR2004
+        assert summary["bytes"] == 4000  # noqa: PLR2004
+        assert summary["passages"] == 10  # noqa: PLR2004
+        assert summary["bytes_per_second"] == 400  # noqa: PLR2004
+        assert summary["passages_per_second"] == 1  # noqa: PLR2004
+        assert summary["errors"] == [
+            {"stage": "index", "type": "ConnectionError", "count": 2}
+        ]
+
+    def test_stages_follow_pipeline_order(self) -> None:
+        """Ensure stages are listed in the order files go through them."""
+        metrics = IndexMetrics()
+        for stage in ("bulk", "extract", "queue_wait", "cache_lookup"):
+            metrics.observe(stage, 0.1)
+
+        summary = summarize([metrics.snapshot()])
+        stages = [stat["stage"] for stat in summary["stages"]]
+        assert stages == ["queue_wait", "cache_lookup", "extract", "bulk"]
+
+    def test_flush_and_load(self, tmp_path) -> None:
+        """Ensure flushed snapshots are loaded until they go stale."""
+        metrics = IndexMetrics()
+        metrics.record_file(10, 1)
+        metrics.flush(tmp_path)
+
+        (snapshot,) = load_snapshots(tmp_path, stale_after=60)
+        assert snapshot["files"] == 1
+        assert load_snapshots(tmp_path, stale_after=-1) == []
+        assert load_snapshots(tmp_path / "missing", stale_after=60) == []
+
+    def test_flush_prunes_old_snapshots(self, tmp_path) -> None:
+        """Ensure snapshots of exited processes are deleted after the retention."""
+        old = tmp_path / "host-1.json"
+        old.write_text("{}", encoding="utf-8")
+        os.utime(old, (time.time() - 7200, time.time() - 7200))
+        recent = tmp_path / "host-2.json"
+        recent.write_text("{}", encoding="utf-8")
+
+        IndexMetrics().flush(tmp_path, retention=3600)
+
+        assert not old.exists()
+        assert recent.exists()
+        assert len(list(tmp_path.glob("*.json"))) == 2  # noqa: PLR2004
+
+    def test_prometheus_format(self) -> None:
+        """Ensure the metrics render in the Prometheus text format."""
+        metrics = IndexMetrics()
+        metrics.observe("extract", 2.0, "pdf")
+        metrics.record_error("extract", 'say "hi"')
+
+        text = to_prometheus(summarize([metrics.snapshot()]), QUEUE)
+        assert (
+            'index_stage_seconds_sum{stage="extract",file_type="pdf"} 2.0'
+            in text
+        )
+        assert 'index_errors_total{stage="extract",type="say \\"hi\\""} 1' in text
+        assert 'index_queue_jobs{status="pending"} 3' in text
+        assert "index_queue_lag_seconds 4.5" in text
+        assert text.endswith("\n")
@@ -0,0 +1,172 @@
+"""Test the IndexQueue manager."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.config.settings import get_settings
+from app.managers.index_queue import IndexQueue
+from app.models.enums import JobAction, JobPriority, JobStatus
+from app.models.index_job import IndexJob
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestIndexQueue:
+    """Test the IndexQueue class."""
+
+    async def test_enqueue_merges_pending_duplicates(self, test_db) -> None:
+        """Ensure the same pending file is only queued once."""
+        first = await IndexQueue.enqueue(
+            "/data/a.txt", test_db, priority=JobPriority.backfill
+        )
+        second = await IndexQueue.enqueue(
+            "/data/a.txt", test_db, priority=JobPriority.interactive
+        )
+
+        assert first.id == second.id
+        assert second.priority == JobPriority.interactive
+
+    async def test_claim_serves_interactive_before_backfill(
+        self, test_db
+    ) -> None:
+        """Ensure interactive jobs are claimed ahead of older backfills."""
+        await IndexQueue.enqueue(
+            "/data/old.txt", test_db, priority=JobPriority.backfill
+        )
+        await IndexQueue.enqueue(
+            "/data/new.txt", test_db, priority=JobPriority.interactive
+        )
+
+        job = await IndexQueue.claim(test_db)
+
+        assert job.file_path == "/data/new.txt"
+        assert job.status == JobStatus.running
+        assert job.attempts == 1
+        assert job.locked_until is not None
+
+    async def test_claim_skips_delayed_jobs(self, test_db) -> None:
+        """Ensure jobs waiting for a retry are not claimed early."""
+        job = await IndexQueue.enqueue("/data/a.txt", test_db)
+        job.run_after = datetime.now(timezone.utc) + timedelta(hours=1)
+        await test_db.flush()
+
+        assert await IndexQueue.claim(test_db) is None
+
+    async def test_claim_reclaims_expired_lease(self, test_db) -> None:
+        """Ensure a job abandoned by a dead worker is picked up again."""
+        job = await IndexQueue.enqueue("/data/a.txt", test_db)
+        job.status = JobStatus.running
+        job.locked_until = datetime.now(timezone.utc) - timedelta(seconds=1)
+        await test_db.flush()
+
+        claimed = await IndexQueue.claim(test_db)
+
+        assert claimed.id == job.id
+
+    async def test_claim_dead_letters_exhausted_expired_lease(
+        self, test_db, mocker
+    ) -> None:
+        """Ensure a job that keeps killing its worker is not leased forever."""
+        mocker.patch(
+            "app.managers.index_queue.get_settings",
+            return_value=get_settings().model_copy(
+                update={"index_queue_max_attempts": 2}
+            ),
+        )
+        stuck = await IndexQueue.enqueue("/data/stuck.txt", test_db)
+        stuck.status = JobStatus.running
+        stuck.attempts = 2
+        stuck.locked_until = datetime.now(timezone.utc) - timedelta(seconds=1)
+        other = await IndexQueue.enqueue(
+            "/data/other.txt", test_db, priority=JobPriority.backfill
+        )
+        await test_db.flush()
+
+        claimed = await IndexQueue.claim(test_db)
+
+        assert claimed.id == other.id
+        assert stuck.status == JobStatus.dead
+        assert stuck.attempts == 2
+        assert "Lease expired" in stuck.last_error
+        assert await IndexQueue.claim(test_db) is None
+
+    async def test_fail_retries_then_dead_letters(
+        self, test_db, mocker
+    ) -> None:
+        """Ensure failures back off and finally dead-letter the job."""
+        mocker.patch(
+            "app.managers.index_queue.get_settings",
+            return_value=get_settings().model_copy(
+                update={"index_queue_max_attempts": 2}
+            ),
+        )
+        job = await IndexQueue.enqueue("/data/a.txt", test_db)
+
+        job.attempts = 1
+        status = await IndexQueue.fail(job.id, "boom", test_db)
+        assert status == JobStatus.pending
+        assert job.last_error == "boom"
+
+        job.attempts = 2
+        status = await IndexQueue.fail(job.id, "boom", test_db)
+        assert status == JobStatus.dead
+
+    async def test_complete_removes_job(self, test_db) -> None:
+        """Ensure finished jobs leave the table."""
+        job = await IndexQueue.enqueue(
+            "/data/a.txt", test_db, action=JobAction.delete
+        )
+        await IndexQueue.complete(job.id, test_db)
+
+        assert await test_db.get(IndexJob, job.id) is None
+
+    async def test_move_prefix_rewrites_pending_subtree(self, test_db) -> None:
+        """Ensure queued jobs follow a moved folder, but not its siblings."""
+        inside = await IndexQueue.enqueue("/data/a/x.txt", test_db)
+        sibling = await IndexQueue.enqueue("/data/ab/y.txt", test_db)
+
+        moved = await IndexQueue.move_prefix("/data/a", "/data/b", test_db)
+        await test_db.refresh(inside)
+        await test_db.refresh(sibling)
+
+        assert moved == 1
+        assert inside.file_path == "/data/b/x.txt"
+        assert sibling.file_path == "/data/ab/y.txt"
+
+    async def test_stats_reports_depth_and_lag(self, test_db) -> None:
+        """Ensure the stats count jobs and measure the oldest ready one."""
+        job = await IndexQueue.enqueue("/data/a.txt", test_db)
+        job.created_at = datetime.now(timezone.utc) - timedelta(minutes=5)
+        await IndexQueue.enqueue(
+            "/data/b.txt", test_db, priority=JobPriority.backfill
+        )
+        await test_db.flush()
+
+        stats = await IndexQueue.stats(test_db)
+
+        assert stats["depth"]["pending"] == 2
+        assert stats["pending_by_priority"] == {
+            "interactive": 1,
+            "backfill": 1,
+        }
+        assert stats["ready"] == 2
+        assert stats["lag_seconds"] >= 300
+
+
+@pytest.mark.unit
+def test_retry_delay_is_exponential_and_capped(mocker) -> None:
+    """Ensure the back-off doubles and respects the maximum."""
+    mocker.patch(
+        "app.managers.index_queue.get_settings",
+        return_value=get_settings().model_copy(
+            update={
+                "index_queue_retry_base_seconds": 10,
+                "index_queue_retry_max_seconds": 60,
+            }
+        ),
+    )
+
+    assert IndexQueue.retry_delay(1) == 10
+    assert IndexQueue.retry_delay(3) == 40
+    assert IndexQueue.retry_delay(10) == 60
@@ -1,5 +1,7 @@
 """Tests for the 'lifespan' function in the main module."""
 
+import asyncio
+
 import pytest
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
@@ -83,3 +85,12 @@ class TestLifespan:
             isinstance(route, APIRoute) and route.name == "catch_all"
             for route in app.routes
         )
+
+    async def test_lifespan_prepares_search_index(self, mocker) -> None:
+        """Ensure the search index is set up in the background on startup."""
+        app = FastAPI()
+        mocker.patch(self.mock_session)
+        prepare = mocker.patch("app.main.prepare_search_index")
+        async with lifespan(app):
+            await asyncio.sleep(0)
+        prepare.assert_awaited_once()
@@ -0,0 +1,91 @@
+"""Test the search result cache."""
+
+import pytest
+
+from app.api.utils.search_cache import SearchCache, affects, normalize_folder
+from app.managers.search import SearchManager
+
+
+@pytest.mark.unit
+class TestSearchCacheHelpers:
+    """Test key building and prefix matching."""
+
+    def test_equivalent_searches_share_a_key(self) -> None:
+        """Ensure case, whitespace, slashes and type order do not matter."""
+        first = SearchCache.make_key("es", "Invoice  March", "/docs/", ["PDF", "docx"], 20, None)
+        second = SearchCache.make_key("es", "invoice march", "docs", [".docx", "pdf"], 20, None)
+
+        assert first == second
+        assert first != SearchCache.make_key("es", "invoice march", "/docs", ["pdf"], 20, None)
+
+    def test_normalize_folder(self) -> None:
+        """Ensure the root is empty and other folders have one leading slash."""
+        assert normalize_folder(None) == normalize_folder("/") == ""
+        assert normalize_folder("a/b/") == "/a/b"
+
+    def test_affects(self) -> None:
+        """Ensure changes inside, above and below a folder are relevant, siblings are not."""
+        assert affects("", "/x.txt")
+        assert affects("/docs", "/docs/a.txt")
+        assert affects("/docs/2024", "/docs")
+        assert not affects("/docs", "/docsx/a.txt")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestSearchCache:
+    """Test the in-process SearchCache."""
+
+    async def test_round_trip_and_lru(self) -> None:
+        """Ensure entries are returned and the least recently used is evicted."""
+        cache = SearchCache(max_entries=2, ttl=60)
+        await cache.put("a", None, {"n": 1})
+        await cache.put("b", None, {"n": 2})
+        assert await cache.get("a") == {"n": 1}
+        await cache.put("c", None, {"n": 3})
+
+        assert await cache.get("b") is None
+        assert await cache.get("a") == {"n": 1}
+
+    async def test_entries_expire(self) -> None:
+        """Ensure an entry is gone after its TTL."""
+        cache = SearchCache(max_entries=10, ttl=0)
+        await cache.put("a", None, {"n": 1})
+
+        assert await cache.get("a") is None
+
+    async def test_invalidate_by_prefix(self) -> None:
+        """Ensure only searches covering the changed path are dropped."""
+        cache = SearchCache(max_entries=10, ttl=60)
+        await cache.put("root", "/", {})
+        await cache.put("docs", "/docs", {})
+        await cache.put("other", "/other", {})
+
+        await cache.invalidate("/docs/a.txt")
+
+        assert await cache.get("root") is None
+        assert await cache.get("docs") is None
+        assert await cache.get("other") == {}
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_search_is_served_from_cache(mocker) -> None:
+    """Ensure a repeated search does not reach the backend until invalidated."""
+    cache = SearchCache(max_entries=10, ttl=60)
+    mocker.patch("app.managers.search.get_search_cache", return_value=cache)
+    backend = mocker.MagicMock()
+    backend.search = mocker.AsyncMock(return_value={"results": []})
+    backend.close = mocker.AsyncMock()
+    mocker.patch(
+        "app.api.utils.search_backend.get_search_backend", return_value=backend
+    )
+
+    first = await SearchManager.search("invoice", folder="/docs")
+    second = await SearchManager.search("Invoice", folder="/docs/")
+    await SearchManager.invalidate(SearchManager.to_system_path("/docs/a.txt"))
+    await SearchManager.search("invoice", folder="/docs")
+
+    assert "cached" not in first
+    assert second["cached"] is True
+    assert backend.search.await_count == 2
@@ -0,0 +1,395 @@
+"""Test the SearchManager helpers and the Elasticsearch search body."""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.utils.do_file import bucket_path
+from app.config.settings import get_settings
+from app.api.utils.elastic import (
+    FILES_READ,
+    FILES_WRITE,
+    ElasticsearchService,
+    files_template,
+    next_index_name,
+    reconcile_generations,
+    swap_alias_actions,
+)
+from app.managers.search import SearchManager
+
+
+@pytest.mark.unit
+class TestSearchManager:
+    """Test the SearchManager class."""
+
+    def test_build_query_applies_filters(self) -> None:
+        """Ensure folder and type filters run in filter context."""
+        body = ElasticsearchService.build_search_body(
+            "invoice", folder="/docs/2024", file_types=[".PDF", "docx"]
+        )
+
+        filters = body["query"]["bool"]["filter"]
+        assert {
+            "term": {"file_path.tree": str(bucket_path / "docs" / "2024")}
+        } in filters
+        assert {"terms": {"file_type": ["pdf", "docx"]}} in filters
+        assert "search_after" not in body
+
+    def test_build_query_root_folder_is_not_a_filter(self) -> None:
+        """Ensure searching from the root does not add a path filter."""
+        body = ElasticsearchService.build_search_body("invoice", folder="/")
+
+        assert body["query"]["bool"]["filter"] == []
+
+    def test_build_query_searches_language_fields(self) -> None:
+        """Ensure the stemmed content sub-fields are queried too."""
+        body = ElasticsearchService.build_search_body("invoice")
+
+        fields = body["query"]["bool"]["must"][0]["simple_query_string"]["fields"]
+        assert {"content", "content.uk", "content.ru", "content.en"} <= set(fields)
+
+    def test_template_mappings(self) -> None:
+        """Ensure the template maps paths exactly and content without a keyword."""
+        template = files_template()
+        properties = template["template"]["mappings"]["properties"]
+
+        assert template["template"]["mappings"]["dynamic"] is False
+        assert properties["file_path"]["type"] == "keyword"
+        assert properties["content"]["index_options"] == "offsets"
+        assert set(properties["content"]["fields"]) == {"uk", "ru", "en"}
+
+    def test_template_uses_ukrainian_plugin_when_enabled(self, mocker) -> None:
+        """Ensure the plugin analyzer replaces the stop-word fallback."""
+        settings = get_settings().model_copy(
+            update={"elastic_ukrainian_plugin": True}
+        )
+        mocker.patch("app.api.utils.elastic.get_settings", return_value=settings)
+
+        analysis = files_template()["template"]["settings"]["analysis"]
+        assert analysis["analyzer"]["uk_analyzer"] == {"type": "ukrainian"}
+
+    def test_cursor_round_trip(self) -> None:
+        """Ensure a cursor turns back into the sort values of the last hit."""
+        cursor = SearchManager.encode_cursor([1.25, "abc-3"])
+        body = ElasticsearchService.build_search_body("invoice", cursor=cursor)
+
+        assert body["search_after"] == [1.25, "abc-3"]
+
+    def test_invalid_cursor_is_rejected(self) -> None:
+        """Ensure a tampered cursor is a client error."""
+        with pytest.raises(HTTPException) as exc:
+            SearchManager.decode_cursor("not a cursor", (str,))
+
+        assert exc.value.status_code == 400
+
+    @pytest.mark.parametrize(
+        "values", [{"a": 1}, [1], [1.5, "a", 2], ["a", {}], [1.5, 3], [True, "a"]]
+    )
+    def test_cursor_of_the_wrong_shape_is_rejected(self, values) -> None:
+        """Ensure only the sort values the backend encodes are accepted."""
+        cursor = SearchManager.encode_cursor(values)
+
+        with pytest.raises(HTTPException) as exc:
+            ElasticsearchService.build_search_body("invoice", cursor=cursor)
+
+        assert exc.value.status_code == 400
+
+    def test_parse_response(self) -> None:
+        """Ensure hits, facets and the next cursor are extracted."""
+        path = str(bucket_path / "docs" / "a.pdf")
+        response = {
+            "took": 7,
+            "hits": {
+                "total": {"value": 2},
+                "hits": [
+                    {
+                        "_score": 3.5,
+                        "_source": {
+                            "file_path": path,
+                            "file_name": "a.pdf",
+                            "file_type": "pdf",
+                            "passage": 4,
+                            "locator": {"page": 2},
+                        },
+                        "highlight": {"content": ["an <mark>invoice</mark>"]},
+                        "sort": [3.5, "g-4"],
+                    }
+                ],
+            },
+            "aggregations": {
+                "files": {"value": 1},
+                "file_types": {
+                    "buckets": [
+                        {"key": "pdf", "doc_count": 2, "files": {"value": 1}}
+                    ]
+                },
+                "folders": {
+                    "buckets": [
+                        {
+                            "key": str(bucket_path / "docs"),
+                            "doc_count": 2,
+                            "files": {"value": 1},
+                        }
+                    ]
+                },
+            },
+        }
+
+        result = ElasticsearchService.parse_search_response(response, size=1)
+
+        assert result["took_ms"] == 7
+        assert result["total_files"] == 1
+        assert result["results"][0]["path"] == "/docs/a.pdf"
+        assert result["results"][0]["locator"] == {"page": 2}
+        assert result["results"][0]["highlights"] == ["an <mark>invoice</mark>"]
+        assert result["facets"]["folders"][0]["key"] == "/docs"
+        assert SearchManager.decode_cursor(result["next_cursor"]) == [3.5, "g-4"]
+
+    def test_parse_response_last_page_has_no_cursor(self) -> None:
+        """Ensure a short page ends the pagination."""
+        response = {"hits": {"total": {"value": 0}, "hits": []}}
+
+        result = ElasticsearchService.parse_search_response(response, size=20)
+
+        assert result["results"] == []
+        assert result["next_cursor"] is None
+
+
+@pytest.mark.unit
+class TestIndexVersions:
+    """Test the naming and alias swap of the files index versions."""
+
+    def test_next_index_name(self) -> None:
+        """Ensure versions are numbered, ignoring unrelated indices."""
+        assert next_index_name([]) == "files_v1"
+        assert (
+            next_index_name(["files_v2", "files_v10", "files_index"])
+            == "files_v11"
+        )
+
+    def test_swap_moves_both_aliases(self) -> None:
+        """Ensure the swap adds the new index and unaliases the old one."""
+        actions = swap_alias_actions(
+            "files_v2", ["files_v1"], ["files_v1", "files_v2"]
+        )
+
+        assert actions == [
+            {"add": {"index": "files_v2", "alias": FILES_READ}},
+            {"remove": {"index": "files_v1", "alias": FILES_READ}},
+            {"remove": {"index": "files_v1", "alias": FILES_WRITE}},
+        ]
+
+    def test_swap_can_delete_old_index(self) -> None:
+        """Ensure the old index is dropped in the same atomic update."""
+        actions = swap_alias_actions(
+            "files_v2", ["files_index"], ["files_index"], delete_old=True
+        )
+
+        assert actions == [
+            {"add": {"index": "files_v2", "alias": FILES_READ}},
+            {"remove_index": {"index": "files_index"}},
+        ]
+
+
+class FakeIndices:
+    """The live and the new files index as path -> {generation: indexed_at}."""
+
+    def __init__(self, live):
+        self.live = {path: dict(generations) for path, generations in live.items()}
+        self.new = {}
+        self.clock = 100.0
+
+    def load(self, path, generation):
+        """Write passages the way the reindex loader does, into the new index only."""
+        self.clock += 1
+        self.new.setdefault(path, {})[generation] = self.clock
+
+    def index(self, path, generation):
+        """Index a file the way the worker does, through FILES_WRITE."""
+        self.clock += 1
+        for index in (self.live, self.new):
+            index[path] = {generation: self.clock}
+
+    def delete(self, path):
+        for index in (self.live, self.new):
+            index.pop(path, None)
+
+    def move(self, old, new):
+        for index in (self.live, self.new):
+            if old in index:
+                index[new] = index.pop(old)
+
+    def reconcile(self, on_disk, from_index=False):
+        drop, copy = reconcile_generations(self.new, self.live, on_disk.__contains__, from_index)
+        for path, generation in drop:
+            del self.new[path][generation]
+            if not self.new[path]:
+                del self.new[path]
+        for path, generation in copy:
+            self.new.setdefault(path, {})[generation] = self.live[path][generation]
+        return self.new
+
+
+@pytest.mark.unit
+class TestReconcile:
+    """Test that a rebuilt index ends up matching the changes made while it was filled."""
+
+    LIVE = {"/a.txt": {"g1": 1.0}, "/b.txt": {"g2": 2.0}, "/c.txt": {"g3": 3.0}, "/d.txt": {"g4": 4.0}}
+
+    def test_worker_changes_during_a_load(self) -> None:
+        """Ensure a write, delete and move racing the loader are not undone."""
+        indices = FakeIndices(self.LIVE)
+        indices.load("/a.txt", "l1")
+        indices.index("/b.txt", "w2")  # the worker reindexes b...
+        indices.load("/b.txt", "l2")   # ...before the loader reaches it
+        indices.delete("/c.txt")       # c is deleted while the loader reads it
+        indices.load("/c.txt", "l3")
+        indices.move("/d.txt", "/e.txt")  # d moves before the loader gets to it
+        indices.index("/f.txt", "w5")  # a file added after the path list was taken
+
+        assert indices.reconcile({"/a.txt", "/b.txt", "/e.txt", "/f.txt"}) == {
+            "/a.txt": {"l1": 101.0},
+            "/b.txt": {"w2": 102.0},
+            "/e.txt": {"g4": 4.0},
+            "/f.txt": {"w5": 105.0},
+        }
+
+    def test_worker_changes_during_a_copy(self) -> None:
+        """Ensure passages copied after the worker replaced, deleted or moved them are dropped."""
+        indices = FakeIndices(self.LIVE)
+        indices.load("/a.txt", "g1")
+        indices.index("/b.txt", "w2")
+        indices.load("/b.txt", "g2")   # the copy brings back the old generation
+        indices.delete("/c.txt")
+        indices.load("/c.txt", "g3")   # and the deleted file
+        indices.move("/d.txt", "/e.txt")
+        indices.load("/d.txt", "g4")   # and the path from before the move
+
+        assert indices.reconcile({"/a.txt", "/b.txt", "/e.txt"}, from_index=True) == {
+            "/a.txt": {"g1": 101.0},
+            "/b.txt": {"w2": 102.0},
+            "/e.txt": {"g4": 4.0},
+        }
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestGrep:
+    """Test the direct filesystem search of SearchManager."""
+
+    @pytest.fixture
+    def root(self, tmp_path, monkeypatch):
+        """Point the storage root at a folder with a few text files."""
+        monkeypatch.setattr("app.managers.search.bucket_path", tmp_path)
+        monkeypatch.setattr(
+            "app.managers.search.get_settings",
+            lambda: get_settings().model_copy(update={"grep_workers": 1}),
+        )
+        (tmp_path / "docs").mkdir()
+        (tmp_path / "docs" / "a.txt").write_text("a needle", encoding="utf-8")
+        (tmp_path / "docs" / "b.txt").write_text("only hay", encoding="utf-8")
+        (tmp_path / "c.txt").write_text("another needle", encoding="utf-8")
+        return tmp_path
+
+    async def test_stream_events(self, root) -> None:
+        """Ensure the stream starts with a total, sends matches and a summary."""
+        events = [
+            event
+            async for event in SearchManager.stream_grep(
+                root, "needle", False, limit=10, timeout=10
+            )
+        ]
+
+        assert events[0] == ("start", {"total": 3})
+        results = [data["path"] for event, data in events if event == "result"]
+        assert sorted(results) == ["/c.txt", "/docs/a.txt"]
+        event, summary = events[-1]
+        assert event == "done"
+        assert summary["searched"] == 3
+        assert summary["matched"] == 2
+        assert summary["truncated"] is False
+
+    async def test_stream_stops_at_limit(self, root) -> None:
+        """Ensure the summary reports a search cut short by the limit."""
+        events = [
+            event
+            async for event in SearchManager.stream_grep(
+                root, "needle", False, limit=1, timeout=10
+            )
+        ]
+
+        assert sum(event == "result" for event, _ in events) == 1
+        assert events[-1][1]["truncated"] is True
+
+    async def test_grep_collects_results(self, root) -> None:
+        """Ensure the non-streaming search returns the matches of a folder."""
+
+        async def connected() -> bool:
+            return False
+
+        result = await SearchManager.grep(
+            SearchManager.grep_root("/docs"), "needle", False, 10, 10, connected
+        )
+
+        assert [hit["path"] for hit in result["results"]] == ["/docs/a.txt"]
+        assert result["searched"] == 2
+
+    async def test_grep_root_stays_inside_storage(self, root) -> None:
+        """Ensure a folder outside the storage root is not searched."""
+        with pytest.raises(HTTPException) as exc:
+            SearchManager.grep_root("/../..")
+
+        assert exc.value.status_code == 404
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestInvalidateAfterTask:
+    """Test that cached searches are dropped once an index task finished."""
+
+    async def test_invalidates_when_the_task_completes(self, monkeypatch) -> None:
+        """Ensure the paths are invalidated only after the task completed."""
+        polls = []
+        invalidated = []
+
+        class Backend:
+            async def get_task(self, task_id):
+                polls.append(task_id)
+                return {"task_id": task_id, "completed": len(polls) == 3}
+
+        async def invalidate(path):
+            invalidated.append((len(polls), path))
+
+        monkeypatch.setattr(
+            "app.api.utils.search_backend.get_search_backend", Backend
+        )
+        monkeypatch.setattr(SearchManager, "invalidate", invalidate)
+        monkeypatch.setattr(SearchManager, "TASK_POLL_INTERVAL", 0)
+
+        SearchManager.invalidate_after_task("node:1", "/a", "/b")
+        await asyncio.gather(*SearchManager._watchers)
+
+        assert polls == ["node:1"] * 3
+        assert invalidated == [(3, "/a"), (3, "/b")]
+
+    async def test_finished_changes_are_not_followed(self) -> None:
+        """Ensure nothing is polled without a task id."""
+        SearchManager.invalidate_after_task(None, "/a")
+
+        assert not SearchManager._watchers
+
+    async def test_invalidates_again_after_the_refresh(self, monkeypatch) -> None:
+        """Ensure indexed files are invalidated again once searches see them."""
+        invalidated = []
+
+        async def invalidate(path):
+            invalidated.append(path)
+
+        monkeypatch.setattr(SearchManager, "invalidate", invalidate)
+        monkeypatch.setattr(SearchManager, "REFRESH_DELAY", 0)
+
+        SearchManager.invalidate_after_refresh("/a.txt")
+        await asyncio.gather(*SearchManager._watchers)
+
+        assert invalidated == ["/a.txt"]
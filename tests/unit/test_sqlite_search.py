@@ -0,0 +1,139 @@
+"""Test the embedded SQLite FTS5 search backend."""
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.utils.sqlite_search import SQLiteSearchBackend, to_match_query
+from app.managers.search import SearchManager
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    """Return a backend whose storage root and database live in tmp_path."""
+    monkeypatch.setattr("app.managers.search.bucket_path", tmp_path / "files")
+    (tmp_path / "files" / "docs").mkdir(parents=True)
+    backend = SQLiteSearchBackend(tmp_path / "search.db")
+    backend.context.cache = None
+    return backend
+
+
+async def add_file(backend, path, text):
+    """Write a text file and index it."""
+    path.write_text(text, encoding="utf-8")
+    await backend.index_file(str(path))
+
+
+@pytest.mark.unit
+class TestToMatchQuery:
+    """Test the translation of user queries into FTS5 syntax."""
+
+    def test_terms_phrases_prefixes_and_exclusions(self) -> None:
+        """Ensure every supported operator is translated."""
+        assert (
+            to_match_query('invoice "due date" inv* -draft')
+            == '"invoice" AND "due date" AND "inv"* NOT "draft"'
+        )
+
+    def test_syntax_is_neutralised(self) -> None:
+        """Ensure FTS5 operators typed by the user are searched as text."""
+        assert to_match_query('NEAR(a b) OR "x') == '"NEAR a" AND "b" AND "OR" AND "x"'
+
+    def test_only_exclusions_is_empty(self) -> None:
+        """Ensure a query with nothing to match returns None."""
+        assert to_match_query("-draft") is None
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestSQLiteSearchBackend:
+    """Test the SQLiteSearchBackend class."""
+
+    async def test_search_ranks_and_highlights(self, backend, tmp_path) -> None:
+        """Ensure matches come back with BM25 order, snippets and facets."""
+        root = tmp_path / "files"
+        await add_file(backend, root / "docs" / "a.txt", "invoice invoice for March")
+        await add_file(backend, root / "b.txt", "an invoice and a receipt")
+        await add_file(backend, root / "c.txt", "nothing to see here")
+
+        result = await backend.search("invoice")
+
+        assert result["total_files"] == 2
+        assert result["results"][0]["path"] == "/docs/a.txt"
+        assert "<mark>invoice</mark>" in result["results"][0]["highlights"][0]
+        assert {b["key"] for b in result["facets"]["folders"]} == {"/", "/docs"}
+
+    async def test_prefix_and_cyrillic(self, backend, tmp_path) -> None:
+        """Ensure prefix queries match and Cyrillic is case-folded."""
+        await add_file(backend, tmp_path / "files" / "u.txt", "Рахунок за березень")
+
+        assert (await backend.search("рахун*"))["total_files"] == 1
+
+    async def test_filters(self, backend, tmp_path) -> None:
+        """Ensure folder and type filters narrow the results."""
+        root = tmp_path / "files"
+        await add_file(backend, root / "docs" / "a.txt", "report")
+        await add_file(backend, root / "docsx.txt", "report")
+
+        in_folder = await backend.search("report", folder="/docs")
+        by_type = await backend.search("report", file_types=["pdf"])
+
+        assert [hit["path"] for hit in in_folder["results"]] == ["/docs/a.txt"]
+        assert by_type["results"] == []
+
+    async def test_pagination(self, backend, tmp_path) -> None:
+        """Ensure cursors walk through every hit exactly once."""
+        for number in range(5):
+            await add_file(backend, tmp_path / "files" / f"{number}.txt", "page")
+
+        seen, cursor = [], None
+        while True:
+            page = await backend.search("page", size=2, cursor=cursor)
+            seen += [hit["path"] for hit in page["results"]]
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+
+        assert sorted(seen) == [f"/{number}.txt" for number in range(5)]
+
+    @pytest.mark.parametrize("values", [[1.5], [1.5, 2, 3], [1.5, "a"], ["a", 2]])
+    async def test_cursor_of_the_wrong_shape_is_rejected(self, backend, tmp_path, values) -> None:
+        """Ensure a malformed cursor is a client error, not an SQLite error."""
+        await add_file(backend, tmp_path / "files" / "a.txt", "page")
+
+        with pytest.raises(HTTPException) as exc:
+            await backend.search("page", cursor=SearchManager.encode_cursor(values))
+
+        assert exc.value.status_code == 400
+
+    async def test_reindex_replaces_passages(self, backend, tmp_path) -> None:
+        """Ensure indexing a file again drops its old content."""
+        path = tmp_path / "files" / "a.txt"
+        await add_file(backend, path, "old words")
+        await add_file(backend, path, "new words")
+
+        assert (await backend.search("old"))["total_passages"] == 0
+        assert (await backend.search("new"))["total_passages"] == 1
+
+    async def test_move_and_delete_path(self, backend, tmp_path) -> None:
+        """Ensure moves rewrite paths and deletes remove a whole subtree."""
+        root = tmp_path / "files"
+        await add_file(backend, root / "docs" / "a.txt", "moved")
+        await add_file(backend, root / "docs.txt", "sibling")
+
+        await backend.move_path(str(root / "docs"), str(root / "archive"))
+        moved = await backend.search("moved")
+        assert moved["results"][0]["path"] == "/archive/a.txt"
+
+        await backend.delete_path(str(root / "archive"))
+        assert await backend.indexed_paths() == {str(root / "docs.txt")}
+
+    async def test_rename_updates_the_file_type(self, backend, tmp_path) -> None:
+        """Ensure a rename changing the extension moves the file to the new type filter."""
+        root = tmp_path / "files"
+        await add_file(backend, root / "notes.txt", "renamed")
+
+        await backend.move_path(str(root / "notes.txt"), str(root / "notes.MD"))
+
+        assert (await backend.search("renamed", file_types=["txt"]))["total_passages"] == 0
+        hit = (await backend.search("renamed", file_types=["md"]))["results"][0]
+        assert hit["type"] == "md"